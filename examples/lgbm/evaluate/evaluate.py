@@ -1,41 +1,33 @@
 import glob
-import lightgbm as lgb
-import numpy as np
-from sklearn.metrics import accuracy_score, roc_auc_score
-import pathlib, json
-
+import os
 
+# streaming_metrics is shipped next to the entry point by the Metrics step
+from streaming_metrics import BinaryClassificationState, finalize, get_shard_seed, iter_aligned_chunks
 
 if __name__=='__main__':
-    
-    print('Loading data . . . .')
-    y_test= np.load(glob.glob('{}/*.npy'.format('/opt/ml/processing/input/online_shoppers_intention_ytest'))[0]) 
-    # y_pred= glob.glob('{}/*.out'.format('/opt/ml/processing/input'))[0]
-    text_file= open(glob.glob('{}/*.out'.format('/opt/ml/processing/input/lgbm-Transform-test'))[0], "r")
-    y_pred= np.array([float(i) for i in text_file.read()[1:-1].split(',')])
 
-    print('\ny_pred shape: \n{}\n'.format(y_pred.shape))
-    print('\ny_test shape: \n{}\n'.format(y_test.shape))
- 
+    chunk_rows = int(os.environ.get('SMP_METRICS_CHUNK_ROWS', '100000'))
+    bootstrap_replicates = int(os.environ.get('SMP_METRICS_BOOTSTRAP_REPLICATES', '100'))
 
-    print('Evaluating model . . . .\n')    
-    acc = accuracy_score(y_test.astype(int), y_pred.astype(int))
-    auc = roc_auc_score(y_test, y_pred)
-    print('Accuracy:  {:.2f}'.format(acc))
-    print('AUC Score: {:.2f}'.format(auc))
-    
-    output_dir = "/opt/ml/processing/output"
-    pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+    label_files = sorted(glob.glob('{}/*.npy'.format('/opt/ml/processing/input/online_shoppers_intention_ytest')))[:1]
+    # chain input of the Transform or ProcessingTransform step, mounted in <step name>-test
+    prediction_files = sorted(glob.glob('/opt/ml/processing/input/*-test/**/*.out', recursive=True))
+    print('Evaluating {} against {} . . . .'.format(prediction_files, label_files))
 
-    report_dict = {
-        "evaluation": {
-            "metrics": {
-                "Accuracy": '{:.2f}'.format(acc), "AUC_Score": '{:.2f}'.format(auc)
-            }
-        }
-    }
+    state = BinaryClassificationState(bootstrap_replicates=bootstrap_replicates, seed=get_shard_seed())
+    for y_test, y_pred in iter_aligned_chunks(label_files, prediction_files, chunk_rows):
+        state.update(y_test, y_pred)
 
-    evaluation_path = f"{output_dir}/model_evaluation_metrics.json"
-    with open(evaluation_path, "w") as f:
-        f.write(json.dumps(report_dict))
+    metrics = state.result()
+    print('Accuracy:  {:.2f}'.format(metrics['accuracy']['value']))
+    print('AUC Score: {:.2f}'.format(metrics['auc']['value']))
 
+    # previous report keys, kept for the readers of the evaluation report
+    finalize(state, '/opt/ml/processing/output', extra_report={
+        'evaluation': {
+            'metrics': {
+                'Accuracy': '{:.2f}'.format(metrics['accuracy']['value']),
+                'AUC_Score': '{:.2f}'.format(metrics['auc']['value']),
+            }
+        }
+    })
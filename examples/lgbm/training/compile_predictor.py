@@ -0,0 +1,146 @@
+"""
+Compile a trained LightGBM model into a faster predictor artifact, saved next to the model file.
+
+- "tl2cgen": a shared library generated with treelite/tl2cgen (online_shoppers_model.so)
+- "numpy": the trees exported as flat arrays for the vectorized NumPy evaluator of
+  transform/docker/tree_predictor.py (online_shoppers_model.npz)
+- "auto": tl2cgen, and no artifact when it cannot be built. The NumPy evaluator is slower than
+  lgb.Booster, so it is never picked automatically
+
+Only numerical splits of binary and regression models are supported. When a model cannot be
+compiled, no artifact is written and the inference handler keeps using lgb.Booster.
+"""
+import argparse
+import os
+
+import lightgbm as lgb
+import numpy as np
+
+MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+SUPPORTED_OBJECTIVES = ["binary", "regression"]
+
+
+class UnsupportedModelError(Exception):
+    """
+    Raised when a model uses a feature the NumPy evaluator does not implement.
+    """
+
+
+def _objective(model_dump):
+    """
+    Return the objective name and the sigmoid coefficient of a dumped model.
+    """
+    parts = model_dump.get("objective", "regression").split()
+    objective = parts[0]
+    sigmoid = 1.0
+    for part in parts[1:]:
+        if part.startswith("sigmoid:"):
+            sigmoid = float(part.split(":")[1])
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise UnsupportedModelError("objective {} is not supported".format(objective))
+    return objective, sigmoid
+
+
+def export_numpy(booster):
+    """
+    Flatten the trees of a booster into arrays. Nodes of all trees share one index space,
+    leaves point to themselves so that a fixed number of traversal steps can be applied.
+    """
+    model_dump = booster.dump_model()
+    objective, sigmoid = _objective(model_dump)
+    if model_dump.get("average_output"):
+        raise UnsupportedModelError("random forest models are not supported")
+
+    nodes = dict(split_feature=[], threshold=[], left_child=[], right_child=[], default_left=[],
+                 missing_type=[], is_leaf=[], leaf_value=[])
+
+    def add_node(node):
+        index = len(nodes["is_leaf"])
+        for values in nodes.values():
+            values.append(0)
+        if "leaf_value" in node:
+            nodes["is_leaf"][index] = True
+            nodes["leaf_value"][index] = node["leaf_value"]
+            nodes["left_child"][index] = index
+            nodes["right_child"][index] = index
+            return index, 0
+        if node["decision_type"] != "<=":
+            raise UnsupportedModelError("categorical splits are not supported")
+        nodes["split_feature"][index] = node["split_feature"]
+        nodes["threshold"][index] = node["threshold"]
+        nodes["default_left"][index] = node["default_left"]
+        nodes["missing_type"][index] = MISSING_TYPES[node["missing_type"]]
+        nodes["left_child"][index], left_depth = add_node(node["left_child"])
+        nodes["right_child"][index], right_depth = add_node(node["right_child"])
+        return index, 1 + max(left_depth, right_depth)
+
+    roots, max_depth = [], 0
+    for tree in model_dump["tree_info"]:
+        root, depth = add_node(tree["tree_structure"])
+        roots.append(root)
+        max_depth = max(max_depth, depth)
+
+    return dict(
+        split_feature=np.array(nodes["split_feature"], dtype=np.int32),
+        threshold=np.array(nodes["threshold"], dtype=np.float64),
+        left_child=np.array(nodes["left_child"], dtype=np.int32),
+        right_child=np.array(nodes["right_child"], dtype=np.int32),
+        default_left=np.array(nodes["default_left"], dtype=bool),
+        missing_type=np.array(nodes["missing_type"], dtype=np.int8),
+        is_leaf=np.array(nodes["is_leaf"], dtype=bool),
+        leaf_value=np.array(nodes["leaf_value"], dtype=np.float64),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=np.array(max_depth),
+        num_features=np.array(booster.num_feature()),
+        objective=np.array(objective),
+        sigmoid=np.array(sigmoid),
+    )
+
+
+def compile_tl2cgen(model_path, library_path):
+    """
+    Generate and build a shared library predictor with treelite and tl2cgen.
+    """
+    import tl2cgen
+    import treelite
+
+    if hasattr(treelite, "frontend") and hasattr(treelite.frontend, "load_lightgbm_model"):
+        model = treelite.frontend.load_lightgbm_model(model_path)
+    else:
+        model = treelite.Model.load(model_path, model_format="lightgbm")
+    tl2cgen.export_lib(model, toolchain="gcc", libpath=library_path,
+                       params={"parallel_comp": os.cpu_count() or 1})
+    return library_path
+
+
+def compile_predictor(model_path, method="auto"):
+    """
+    Compile the model file at model_path, and return the path of the compiled artifact or None.
+    """
+    prefix = os.path.splitext(model_path)[0]
+
+    if method == "tl2cgen":
+        return compile_tl2cgen(model_path, prefix + ".so")
+
+    if method == "auto":
+        try:
+            return compile_tl2cgen(model_path, prefix + ".so")
+        except Exception as e:
+            print("Skipping predictor compilation, the handler uses lgb.Booster: {}".format(e))
+            return None
+
+    try:
+        arrays = export_numpy(lgb.Booster(model_file=model_path))
+    except UnsupportedModelError as e:
+        print("Skipping predictor compilation: {}".format(e))
+        return None
+    np.savez(prefix + ".npz", **arrays)
+    return prefix + ".npz"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model-path', type=str, default='/opt/ml/model/online_shoppers_model.txt')
+    parser.add_argument('--method', type=str, default='auto', choices=['auto', 'tl2cgen', 'numpy'])
+    args = parser.parse_args()
+    print('Compiled predictor: {}'.format(compile_predictor(args.model_path, args.method)))
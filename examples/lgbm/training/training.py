@@ -3,6 +3,23 @@ import glob
 import lightgbm as lgb
 import numpy as np
 import os
+import tarfile
+
+from compile_predictor import compile_predictor
+
+
+def find_init_model(model_channel):
+    """
+    Locate a previously trained model in the warm start "model" channel.
+    The channel holds either a model.tar.gz archive or the uncompressed model files.
+    """
+    if not model_channel or not os.path.isdir(model_channel):
+        return None
+    for archive in glob.glob(os.path.join(model_channel, '*.tar.gz')):
+        with tarfile.open(archive) as tar:
+            tar.extractall(model_channel)
+    candidates = glob.glob(os.path.join(model_channel, '**', 'online_shoppers_model.txt'), recursive=True)
+    return candidates[0] if candidates else None
 
 
 if __name__=='__main__':
@@ -14,6 +31,11 @@ if __name__=='__main__':
     parser.add_argument('--num_leaves', type=int, default=28)
     parser.add_argument('--max_depth', type=int, default=5)
     parser.add_argument('--learning_rate', type=float, default=0.1)
+    parser.add_argument('--model_channel', type=str, default=os.environ.get('SM_CHANNEL_MODEL'))
+    # a sub-directory per variant of a packed training job
+    parser.add_argument('--model_dir', type=str, default=os.environ.get('SM_MODEL_DIR', '/opt/ml/model'))
+    # none, auto, tl2cgen or numpy, see compile_predictor.py
+    parser.add_argument('--compile_predictor', type=str, default='none')
     args = parser.parse_args()
     
     print('Loading training data from {}\n'.format(args.train))
@@ -53,7 +75,16 @@ if __name__=='__main__':
         'verbose': 1
     }
     num_round = 10
-    bst = lgb.train(parameters, train_data, num_round, eval_data)
+    init_model = find_init_model(args.model_channel)
+    if init_model:
+        print('Warm starting from model {}\n'.format(init_model))
+    bst = lgb.train(parameters, train_data, num_round, eval_data, init_model=init_model)
     
     print('Saving model . . . .')
-    bst.save_model('/opt/ml/model/online_shoppers_model.txt')
\ No newline at end of file
+    model_file = os.path.join(args.model_dir, 'online_shoppers_model.txt')
+    bst.save_model(model_file)
+
+    if args.compile_predictor != 'none':
+        print('Compiling predictor . . . .')
+        compiled = compile_predictor(model_file, args.compile_predictor)
+        print('Compiled predictor: {}'.format(compiled))
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Score the test data in a processing job, for the ProcessingTransform step class.
+
+The model artifacts of the training step are mounted in SMP_MODEL_DIR, the input files in
+SMP_INPUT_DIR. Predictions are written to SMP_OUTPUT_DIR as <input file>.out, like a Batch
+Transform job, in the SMP_ACCEPT format: application/x-npy or the text list of predictions.
+The variants of a packed model, listed in SMP_MODEL_VARIANTS, are loaded from
+SMP_MODEL_DIR/<variant> and write their predictions to SMP_OUTPUT_DIR/<variant>.
+"""
+import glob
+import os
+import tarfile
+import tempfile
+
+import lightgbm as lgb
+import numpy as np
+
+NPY_CONTENT_TYPE = "application/x-npy"
+
+
+def load_model(model_dir):
+    for archive in glob.glob(os.path.join(model_dir, '*.tar.gz')):
+        extract_dir = tempfile.mkdtemp()
+        with tarfile.open(archive) as tar:
+            tar.extractall(extract_dir)
+        model_dir = extract_dir
+    model_file = glob.glob(os.path.join(model_dir, '**', 'online_shoppers_model.txt'), recursive=True)[0]
+    print('Loading model {}'.format(model_file))
+    return lgb.Booster(model_file=model_file)
+
+
+def read_records(path):
+    if path.endswith('.npy'):
+        data = np.load(path, mmap_mode='r')
+    else:
+        data = np.loadtxt(path, delimiter=',', ndmin=2)
+    return data.reshape(len(data), -1)
+
+
+def predict(model, data, batch_rows):
+    return np.concatenate([
+        model.predict(np.asarray(data[start:start + batch_rows]))
+        for start in range(0, len(data), batch_rows)
+    ]) if len(data) else np.zeros(0)
+
+
+def write_predictions(path, prediction, accept):
+    with open(path, 'wb') as f:
+        if accept == NPY_CONTENT_TYPE:
+            np.save(f, prediction)
+        else:
+            f.write(str(prediction.tolist()).encode('utf-8'))
+
+
+if __name__ == '__main__':
+    model_dir = os.environ.get('SMP_MODEL_DIR', '/opt/ml/processing/model')
+    input_dir = os.environ.get('SMP_INPUT_DIR', '/opt/ml/processing/input/test')
+    output_dir = os.environ.get('SMP_OUTPUT_DIR', '/opt/ml/processing/output/test')
+    accept = os.environ.get('SMP_ACCEPT', NPY_CONTENT_TYPE)
+    batch_rows = int(os.environ.get('SMP_BATCH_ROWS', '100000'))
+
+    variants = [variant for variant in os.environ.get('SMP_MODEL_VARIANTS', '').split(',') if variant]
+
+    input_files = sorted(
+        path for path in glob.glob(os.path.join(input_dir, '**', '*'), recursive=True) if os.path.isfile(path)
+    )
+    for variant in variants or [None]:
+        model = load_model(os.path.join(model_dir, variant) if variant else model_dir)
+        variant_output_dir = os.path.join(output_dir, variant) if variant else output_dir
+        for input_file in input_files:
+            output_file = os.path.join(variant_output_dir, os.path.relpath(input_file, input_dir) + '.out')
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            prediction = predict(model, read_records(input_file), batch_rows)
+            write_predictions(output_file, prediction, accept)
+            print('{}: {} predictions written to {}'.format(input_file, len(prediction), output_file))
@@ -0,0 +1,97 @@
+"""
+Local latency and throughput benchmark of the model_script.py handler.
+
+Compares scoring the requests of a batch one by one with scoring them in a single handler call.
+
+    python benchmark.py --model-dir <extracted-model-dir> --rows 1,100,1000 --batch-requests 1,4,16
+
+Without --model-dir, a model is trained on random data with NUM_FEATURES features.
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+import lightgbm as lgb
+import numpy as np
+
+import model_script
+
+
+class BenchmarkContext(object):
+    """
+    Minimal model server context for local calls.
+    """
+
+    def __init__(self, model_dir, accept):
+        self.system_properties = {"model_dir": model_dir}
+        self.accept = accept
+
+    def get_request_header(self, idx, key):
+        return self.accept if key.lower() == "accept" else None
+
+    def set_response_content_type(self, idx, value):
+        pass
+
+
+def train_random_model(model_dir, rows=10000):
+    x = np.random.rand(rows, model_script.NUM_FEATURES)
+    y = (x[:, 0] + np.random.rand(rows) > 1).astype(int)
+    booster = lgb.train({"objective": "binary", "verbose": -1}, lgb.Dataset(x, y), num_boost_round=100)
+    booster.save_model(os.path.join(model_dir, "online_shoppers_model.txt"))
+
+
+def encode(rows):
+    buffer = io.BytesIO()
+    np.save(buffer, np.random.rand(rows, model_script.NUM_FEATURES))
+    return {"body": buffer.getvalue()}
+
+
+def run(context, requests, batched, repeats):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call_start = time.perf_counter()
+        if batched:
+            model_script.handle(requests, context)
+        else:
+            for request in requests:
+                model_script.handle([request], context)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--rows", default="1,100,1000,10000", help="Rows per request")
+    parser.add_argument("--batch-requests", default="1,4,16", help="Requests per model server batch")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--accept", default=model_script.NPY_CONTENT_TYPE)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    if model_dir is None:
+        model_dir = tempfile.mkdtemp()
+        train_random_model(model_dir)
+    context = BenchmarkContext(model_dir, args.accept)
+
+    print(f"{'rows':>8} {'requests':>9} {'mode':>10} {'rows/s':>12} {'p50 ms':>9} {'p95 ms':>9}")
+    for rows in [int(value) for value in args.rows.split(",")]:
+        for batch_requests in [int(value) for value in args.batch_requests.split(",")]:
+            requests = [encode(rows) for _ in range(batch_requests)]
+            # warm up, loads the model on the first call
+            model_script.handle(requests, context)
+            for batched in [False, True]:
+                elapsed, latencies = run(context, requests, batched, args.repeats)
+                print(
+                    f"{rows:>8} {batch_requests:>9} {'batched' if batched else 'sequential':>10} "
+                    f"{rows * batch_requests * args.repeats / elapsed:>12.0f} "
+                    f"{np.percentile(latencies, 50) * 1000:>9.2f} {np.percentile(latencies, 95) * 1000:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
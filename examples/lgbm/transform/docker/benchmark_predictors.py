@@ -0,0 +1,83 @@
+"""
+Compare the throughput and predictions of lgb.Booster with the compiled predictors.
+
+    python benchmark_predictors.py --model-path <online_shoppers_model.txt> --rows 1000,100000
+
+Without --model-path, a model is trained on random data with NUM_FEATURES features. The NumPy
+predictor is always exported, the tl2cgen predictor only when treelite and tl2cgen are installed.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import lightgbm as lgb
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "training"))
+from compile_predictor import compile_predictor
+from model_script import NUM_FEATURES
+from tree_predictor import CompiledTreePredictor, NumpyTreePredictor
+
+
+def train_random_model(model_path, rows=10000):
+    x = np.random.rand(rows, NUM_FEATURES)
+    x[np.random.rand(rows, NUM_FEATURES) < 0.05] = np.nan
+    y = (np.nan_to_num(x[:, 0]) + np.random.rand(rows) > 1).astype(int)
+    booster = lgb.train({"objective": "binary", "num_leaves": 28, "max_depth": 5, "verbose": -1},
+                        lgb.Dataset(x, y), num_boost_round=100)
+    booster.save_model(model_path)
+
+
+def time_predict(predictor, data, repeats):
+    predictor.predict(data)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predictor.predict(data)
+    return len(data) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--rows", default="1,100,10000,100000")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    model_path = os.path.join(work_dir, "online_shoppers_model.txt")
+    if args.model_path:
+        shutil.copy(args.model_path, model_path)
+    else:
+        train_random_model(model_path)
+
+    predictors = {"booster": lgb.Booster(model_file=model_path)}
+    numpy_path = compile_predictor(model_path, "numpy")
+    if numpy_path:
+        predictors["numpy"] = NumpyTreePredictor(numpy_path)
+    try:
+        predictors["tl2cgen"] = CompiledTreePredictor(compile_predictor(model_path, "tl2cgen"))
+    except ImportError:
+        print("treelite/tl2cgen are not installed, skipping the tl2cgen predictor")
+
+    check = np.random.rand(10000, NUM_FEATURES)
+    check[np.random.rand(*check.shape) < 0.05] = np.nan
+    reference = predictors["booster"].predict(check)
+    for name, predictor in predictors.items():
+        print(f"{name}: max abs difference with booster {np.abs(predictor.predict(check) - reference).max():.2e}")
+
+    print(f"{'rows':>8} " + " ".join(f"{name + ' rows/s':>16}" for name in predictors))
+    for rows in [int(value) for value in args.rows.split(",")]:
+        data = np.random.rand(rows, NUM_FEATURES)
+        repeats = max(1, args.repeats * 1000 // rows) if rows < 1000 else args.repeats
+        print(f"{rows:>8} " + " ".join(
+            f"{time_predict(predictor, data, repeats):>16.0f}" for predictor in predictors.values()
+        ))
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
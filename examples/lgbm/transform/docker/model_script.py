@@ -1,10 +1,12 @@
-
 from collections import namedtuple
 import glob
+import io
 import json
 import logging
 import os
 import re
+import sys
+import time
 
 import lightgbm as lgb
 import numpy as np
@@ -12,6 +14,54 @@ from sagemaker_inference import content_types, encoder
 
 NUM_FEATURES = 12
 
+NPY_CONTENT_TYPE = "application/x-npy"
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+NPY_MAGIC = b"\x93NUMPY"
+
+# Predictor used by the handler: auto, compiled, numpy or booster. auto uses the tl2cgen library
+# online_shoppers_model.so when it exists and loads, and the Booster model otherwise
+PREDICTOR = os.environ.get("SMP_LGBM_PREDICTOR", "auto")
+
+# Handler metrics are logged at most once per interval, in seconds
+METRICS_INTERVAL = float(os.environ.get("SMP_HANDLER_METRICS_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerMetrics(object):
+    """
+    Aggregate request metrics and log them periodically instead of on every request.
+    """
+
+    def __init__(self, interval=METRICS_INTERVAL):
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.inference_seconds = 0.0
+        self.max_batch_requests = 0
+
+    def record(self, requests, rows, inference_seconds):
+        self.batches += 1
+        self.requests += requests
+        self.rows += rows
+        self.inference_seconds += inference_seconds
+        self.max_batch_requests = max(self.max_batch_requests, requests)
+
+        elapsed = time.time() - self.started
+        if elapsed >= self.interval:
+            logger.info(
+                "batches=%d requests=%d rows=%d rows_per_second=%.0f mean_inference_ms=%.2f max_batch_requests=%d",
+                self.batches, self.requests, self.rows, self.rows / elapsed,
+                1000 * self.inference_seconds / self.batches, self.max_batch_requests,
+            )
+            self.reset()
+
+
 class ModelHandler(object):
     """
     A lightGBM Model handler implementation.
@@ -20,6 +70,7 @@ class ModelHandler(object):
     def __init__(self):
         self.initialized = False
         self.model = None
+        self.metrics = HandlerMetrics()
 
     def initialize(self, context):
         """
@@ -29,21 +80,69 @@ class ModelHandler(object):
         """
         self.initialized = True
         properties = context.system_properties
-        model_dir = properties.get("model_dir") 
-        self.model = lgb.Booster(model_file=os.path.join(model_dir,'online_shoppers_model.txt'))
-       
+        model_dir = properties.get("model_dir")
+        self.model = self.load_predictor(model_dir, PREDICTOR)
+
+    def load_predictor(self, model_dir, predictor):
+        """
+        Load the compiled predictor saved by training/compile_predictor.py, falling back to lgb.Booster
+        :param model_dir: model directory
+        :param predictor: auto, compiled, numpy or booster
+        :return: object with a predict method
+        """
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from tree_predictor import CompiledTreePredictor, NumpyTreePredictor
+
+        candidates = [
+            ('compiled', os.path.join(model_dir, 'online_shoppers_model.so'), CompiledTreePredictor),
+            ('numpy', os.path.join(model_dir, 'online_shoppers_model.npz'), NumpyTreePredictor),
+        ]
+        for name, path, predictor_class in candidates:
+            # the NumPy predictor is slower than lgb.Booster, it is only used when requested
+            if predictor not in ['auto', name] or (predictor == 'auto' and name == 'numpy') \
+                    or not os.path.exists(path):
+                continue
+            try:
+                model = predictor_class(path)
+                logger.info("Loaded %s predictor %s", name, path)
+                return model
+            except Exception as e:
+                logger.warning("Could not load %s predictor %s, falling back: %s", name, path, e)
+
+        logger.info("Loaded lgb.Booster predictor")
+        return lgb.Booster(model_file=os.path.join(model_dir,'online_shoppers_model.txt'))
+
+    def decode(self, payload):
+        """
+        Read the records of one request body without copying it.
+        :param payload: .npy buffer, or raw float64 records after a header line
+        :return: records as a 2D numpy array
+        """
+        if payload.startswith(NPY_MAGIC):
+            buffer = io.BytesIO(payload)
+            version = np.lib.format.read_magic(buffer)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+            data = np.frombuffer(payload, dtype=dtype, count=int(np.prod(shape)), offset=buffer.tell())
+            # column-major arrays are read as the transposed C array, without copying
+            data = data.reshape(shape[::-1]).T if fortran_order else data.reshape(shape)
+        else:
+            payload = payload[payload.find(b'\n')+1:]
+            data = np.frombuffer(payload, dtype=np.float64)
+        return data.reshape((data.size // NUM_FEATURES, NUM_FEATURES))
 
     def preprocess(self, request):
         """
         Transform raw input into model input data.
         :param request: list of raw requests
-        :return: list of preprocessed model input data
-        """        
-        payload = request[0]['body']
-        payload= payload[payload.find(b'\n')+1:]
-        data = np.frombuffer(payload, dtype=np.float64)
-        data = data.reshape((data.size // NUM_FEATURES, NUM_FEATURES))
-        return data
+        :return: records of all requests as one numpy array, and the number of records of each request
+        """
+        batches = [self.decode(bytes(row.get('body') or row.get('data'))) for row in request]
+        sizes = [len(batch) for batch in batches]
+        data = batches[0] if len(batches) == 1 else np.concatenate(batches)
+        return data, sizes
 
     def inference(self, model_input):
         """
@@ -51,29 +150,74 @@ class ModelHandler(object):
         :param model_input: transformed model input data list
         :return: list of inference output in numpy array
         """
-        prediction = self.model.predict(model_input)
-        print('prediction: ', prediction)
-        return prediction
+        return self.model.predict(model_input)
 
-    def postprocess(self, inference_output):
+    def serialize(self, prediction, accept=None):
+        """
+        Serialize the predictions of one request in the requested format
+        :param prediction: predictions as numpy
+        :param accept: response content type. application/x-npy returns a .npy buffer,
+            application/vnd.apache.arrow.stream an Arrow IPC stream (requires pyarrow),
+            anything else the text list of predictions
+        :return: serialized predictions, and their content type
         """
-        Post processing step - converts predictions to str
+        if accept == NPY_CONTENT_TYPE:
+            buffer = io.BytesIO()
+            np.save(buffer, np.ascontiguousarray(prediction, dtype=np.float64))
+            return buffer.getvalue(), NPY_CONTENT_TYPE
+
+        if accept == ARROW_CONTENT_TYPE:
+            import pyarrow as pa
+
+            table = pa.table({"prediction": pa.array(prediction, type=pa.float64())})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes(), ARROW_CONTENT_TYPE
+
+        return str(prediction.tolist()), "application/json"
+
+    def postprocess(self, inference_output, sizes, accepts):
+        """
+        Post processing step - splits the predictions back per request and serializes them
         :param inference_output: predictions as numpy
-        :return: list of inference output as string
+        :param sizes: number of records of each request
+        :param accepts: response content type of each request
+        :return: list of inference output, and list of their content types
+        """
+        predictions = np.split(inference_output, np.cumsum(sizes)[:-1])
+        responses = [self.serialize(prediction, accept) for prediction, accept in zip(predictions, accepts)]
+        return [response for response, _ in responses], [content_type for _, content_type in responses]
+
+    def get_accept(self, context, idx=0):
+        """
+        Read the response content type requested by the client
+        :param context: mms context
+        :param idx: index of the request in the batch
+        :return: the Accept header value, or None
         """
+        if context is None or not hasattr(context, "get_request_header"):
+            return None
+        return context.get_request_header(idx, "Accept") or context.get_request_header(idx, "accept")
 
-        return [str(inference_output.tolist())]
-        
     def handle(self, data, context):
         """
-        Call preprocess, inference and post-process functions
+        Call preprocess, inference and post-process functions. All the requests of a batch
+        are scored with a single predict call.
         :param data: input data
         :param context: mms context
         """
-        
-        model_input = self.preprocess(data)
+        model_input, sizes = self.preprocess(data)
+        start = time.perf_counter()
         model_out = self.inference(model_input)
-        return self.postprocess(model_out)
+        self.metrics.record(len(sizes), len(model_input), time.perf_counter() - start)
+
+        accepts = [self.get_accept(context, idx) for idx in range(len(sizes))]
+        responses, response_content_types = self.postprocess(model_out, sizes, accepts)
+        if context is not None and hasattr(context, "set_response_content_type"):
+            for idx, content_type in enumerate(response_content_types):
+                context.set_response_content_type(idx, content_type)
+        return responses
 
 _service = ModelHandler()
 
@@ -0,0 +1,89 @@
+"""
+Predictors for the artifacts written by training/compile_predictor.py.
+
+NumpyTreePredictor only needs numpy. It matches lgb.Booster predictions but is single-threaded,
+so it is used as a portable fallback rather than for throughput, see benchmark_predictors.py.
+"""
+import os
+
+import numpy as np
+
+# LightGBM treats values with an absolute value below this threshold as zero
+ZERO_THRESHOLD = 1e-35
+MISSING_ZERO = 1
+MISSING_NAN = 2
+
+
+class NumpyTreePredictor(object):
+    """
+    Traverse all the trees for a chunk of rows at once, one tree level per step.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        with np.load(path) as arrays:
+            self.arrays = {key: arrays[key] for key in arrays.files}
+        self.split_feature = self.arrays["split_feature"]
+        self.threshold = self.arrays["threshold"]
+        self.left_child = self.arrays["left_child"]
+        self.right_child = self.arrays["right_child"]
+        self.default_left = self.arrays["default_left"]
+        self.missing_type = self.arrays["missing_type"]
+        self.is_leaf = self.arrays["is_leaf"]
+        self.leaf_value = self.arrays["leaf_value"]
+        self.roots = self.arrays["roots"]
+        self.max_depth = int(self.arrays["max_depth"])
+        self.num_features = int(self.arrays["num_features"])
+        self.objective = str(self.arrays["objective"])
+        self.sigmoid = float(self.arrays["sigmoid"])
+        self.chunk_size = chunk_size
+        # children[2 * node] is the left child and children[2 * node + 1] the right child
+        self.children = np.stack([self.left_child, self.right_child], axis=1).ravel()
+        self.has_zero_missing = bool((self.missing_type[~self.is_leaf] == MISSING_ZERO).any())
+
+    def _raw_score(self, data):
+        num_rows = len(data)
+        flat_data = data.ravel()
+        row_offsets = (np.arange(num_rows) * self.num_features)[:, None]
+        node = np.broadcast_to(self.roots, (num_rows, len(self.roots))).copy()
+        check_missing = self.has_zero_missing or bool(np.isnan(flat_data).any())
+        for _ in range(self.max_depth):
+            value = flat_data[row_offsets + self.split_feature[node]]
+            if not check_missing:
+                go_right = value > self.threshold[node]
+            else:
+                missing_type = self.missing_type[node]
+                is_nan = np.isnan(value)
+                # NaN is handled as zero unless the split has a NaN missing type
+                value = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, value)
+                missing = ((missing_type == MISSING_NAN) & is_nan) | \
+                          ((missing_type == MISSING_ZERO) & (np.abs(value) <= ZERO_THRESHOLD))
+                go_right = np.where(missing, ~self.default_left[node], value > self.threshold[node])
+            node = self.children[node * 2 + go_right]
+        return self.leaf_value[node].sum(axis=1)
+
+    def predict(self, data):
+        data = np.ascontiguousarray(data, dtype=np.float64).reshape(-1, self.num_features)
+        raw = np.concatenate([
+            self._raw_score(data[start:start + self.chunk_size])
+            for start in range(0, len(data), self.chunk_size)
+        ]) if len(data) else np.zeros(0)
+        if self.objective == "binary":
+            return 1.0 / (1.0 + np.exp(-self.sigmoid * raw))
+        return raw
+
+
+class CompiledTreePredictor(object):
+    """
+    Wrap a tl2cgen shared library predictor.
+    """
+
+    def __init__(self, path):
+        import tl2cgen
+
+        self.tl2cgen = tl2cgen
+        nthread = int(os.environ['OMP_NUM_THREADS']) if os.environ.get('OMP_NUM_THREADS') else None
+        self.predictor = tl2cgen.Predictor(path, nthread=nthread)
+
+    def predict(self, data):
+        prediction = self.predictor.predict(self.tl2cgen.DMatrix(np.asarray(data, dtype=np.float64)))
+        return np.asarray(prediction).reshape(len(data))
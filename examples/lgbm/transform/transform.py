@@ -2,6 +2,7 @@ import subprocess
 import sys
 import shlex
 import os
+import multiprocessing
 from retrying import retry
 from subprocess import CalledProcessError
 from sagemaker_inference import model_server
@@ -12,9 +13,13 @@ def _retry_if_error(exception):
 @retry(stop_max_delay=1000 * 50,
        retry_on_exception=_retry_if_error)
 def _start_mms():
-    # by default the number of workers per model is 1, but we can configure it through the
-    # environment variable below if desired.
-    # os.environ['SAGEMAKER_MODEL_SERVER_WORKERS'] = '2'
+    # by default the model server starts 1 worker per model, start one per CPU instead.
+    # SAGEMAKER_MODEL_SERVER_WORKERS set in the transform env still takes precedence.
+    os.environ.setdefault('SAGEMAKER_MODEL_SERVER_WORKERS', str(multiprocessing.cpu_count()))
+    # every worker predicts with OpenMP threads: share the CPUs between the workers instead of
+    # starting one thread per CPU in each of them. OMP_NUM_THREADS set in the env takes precedence.
+    workers = max(1, int(os.environ['SAGEMAKER_MODEL_SERVER_WORKERS']))
+    os.environ.setdefault('OMP_NUM_THREADS', str(max(1, multiprocessing.cpu_count() // workers)))
     model_server.start_model_server(handler_service='/home/model-server/model_script.py:handle')
 
 def main():
@@ -1,10 +1,30 @@
+import argparse
 import os
 
 import pandas as pd
 from joblib import dump
 from sklearn.decomposition import PCA
 
+
+def export_onnx(model, number_of_features, output_path):
+    """Export the fitted sklearn model to ONNX, next to the joblib model."""
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        raise ImportError("--export-onnx requires skl2onnx, add it to requirements.txt")
+    onnx_model = convert_sklearn(model, initial_types=[("input", FloatTensorType([None, number_of_features]))])
+    with open(output_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"ONNX model saved to {output_path}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    # export the fitted model to model.onnx for ONNX Runtime serving, requires skl2onnx
+    parser.add_argument("--export-onnx", type=str, default="false")
+    args, _ = parser.parse_known_args()
+
     # data directories
     channel_path = "/opt/ml/input/data/calhousing-pca-Preprocessing-train"
     print(f'Training data location: {os.listdir(channel_path)}')
@@ -18,4 +38,6 @@ if __name__ == "__main__":
 
     # save model
     dump(pca, os.path.join(os.environ.get("SM_MODEL_DIR"), "pca_model.joblib"))
+    if args.export_onnx.lower() == "true":
+        export_onnx(pca, X.shape[1], os.path.join(os.environ.get("SM_MODEL_DIR"), "model.onnx"))
     print(os.listdir("/opt/ml/model/"))
@@ -1,23 +1,48 @@
+import io
 import json
 import os
 
 import numpy as np
 
-print(f"My location: {os.listdir()}")
-print(f"Dir of /opt/ml: {os.listdir('/opt/ml')}")
-print(f"Dir of /opt/ml/model: {os.listdir('/opt/ml/model')}")
+model_dir = "/opt/ml/model"
 
-print(f"{'-' * 40} Start printing Env Var {'-' * 40}")
-for name, value in os.environ.items():
-    print("{0}: {1}".format(name, value))
-print(f"{'-' * 40} Finish printing Env Var {'-' * 40}")
+NPY_CONTENT_TYPE = "application/x-npy"
 
-model_dir = "/opt/ml/model"
-print("numpy version", np.__version__)
+# TensorFlow Serving REST request format: "instances" (row format, answered with "predictions")
+# or, opt-in, "inputs" (columnar, answered with "outputs"). Clients reading the predictions key
+# of the response keep working with the default
+REQUEST_FORMAT = os.environ.get("SMP_TFS_REQUEST_FORMAT", "instances")
+
+
+def read_csv(buffer):
+    """ Parse a CSV request buffer of numerical values in one vectorized call
+    Args:
+        buffer (bytes): the CSV records, one per line
+    Returns:
+        (np.ndarray): the records as a 2D array
+    """
+    buffer = buffer.strip().replace(b"\r", b"")
+    if not buffer:
+        return np.zeros((0, 0))
+    number_of_columns = buffer.split(b"\n", 1)[0].count(b",") + 1
+    values = np.fromstring(buffer.replace(b"\n", b",").decode("utf-8"), sep=",")
+    return values.reshape(-1, number_of_columns)
 
 
-def read_csv(csv):
-    return np.array([[float(j) for j in i.split(",")] for i in csv.splitlines()])
+def read_npy(buffer):
+    """ Read an application/x-npy request buffer
+    Args:
+        buffer (bytes): the .npy serialized array
+    Returns:
+        (np.ndarray): the records as a 2D array
+    """
+    values = np.load(io.BytesIO(buffer), allow_pickle=False)
+    return values.reshape(len(values), -1)
+
+
+def to_tfs_request(inputs):
+    """ Serialize records into a TensorFlow Serving REST request body """
+    return json.dumps({REQUEST_FORMAT: inputs.tolist()})
 
 
 def input_handler(data, context):
@@ -28,24 +53,15 @@ def input_handler(data, context):
     Returns:
         (dict): a JSON-serializable dict that contains request body and headers
     """
-    print(f"InputHandler, request content type is {context.request_content_type}")
-    print(f"InputHandler, model name is {context.model_name}")
-    print(f"InputHandler, method is {context.method}")
-    print(f"InputHandler, rest_uri is {context.rest_uri}")
-    print(f"InputHandler, custom_attributes is {context.custom_attributes}")
-    print(f"InputHandler, accept_header is {context.accept_header}")
-    print(f"InputHandler, content_length is {context.content_length}")
-
     if context.request_content_type == 'application/json':
         # pass through json (assumes it's correctly formed)
         d = data.read().decode('utf-8')
         return d if len(d) else ''
     if context.request_content_type == 'text/csv':
-        payload = data.read().decode('utf-8')
-        inputs = read_csv(payload)
-        print(inputs[:10])
-        input_data = {'instances': inputs.tolist()}
-        return json.dumps(input_data)
+        return to_tfs_request(read_csv(data.read()))
+    if context.request_content_type == NPY_CONTENT_TYPE:
+        return to_tfs_request(read_npy(data.read()))
+    raise ValueError(f"Unsupported content type {context.request_content_type}")
 
 
 def output_handler(data, context):
@@ -56,7 +72,6 @@ def output_handler(data, context):
     Returns:
         (bytes, string): data to return to client, response content type
     """
-    print(f"OutputHandler, hello world!")
     status_code = data.status_code
     content = data.content
 
@@ -64,9 +79,11 @@ def output_handler(data, context):
         raise ValueError(content.decode('utf-8'))
 
     response_content_type = context.accept_header
-    prediction = data.content
-
-    print(f"Prediction type is {type(prediction)}, {prediction}")
-    print(f"Prediction is {prediction}")
+    if response_content_type == NPY_CONTENT_TYPE:
+        response = json.loads(content)
+        prediction = np.asarray(response.get("outputs", response.get("predictions")), dtype=np.float32)
+        buffer = io.BytesIO()
+        np.save(buffer, prediction)
+        return buffer.getvalue(), response_content_type
 
-    return prediction, response_content_type
+    return content, response_content_type
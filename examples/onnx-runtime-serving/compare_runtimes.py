@@ -0,0 +1,121 @@
+"""
+Check that an exported model.onnx matches its source model, and compare their throughput.
+
+    # sklearn model saved with joblib, e.g. the cal_housing_pca example
+    python compare_runtimes.py --framework sklearn --model pca_model.joblib --onnx model.onnx --features 8
+    # Keras SavedModel, e.g. the tf example
+    python compare_runtimes.py --framework keras --model 1 --onnx model.onnx --features 8
+
+Without --model, a PCA model is fitted on random data and exported with skl2onnx.
+The script exits with an error when the predictions differ by more than --tolerance.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "docker"))
+import ort_handler
+
+
+class LocalContext(object):
+    """
+    Minimal model server context for local ort_handler calls.
+    """
+
+    def __init__(self, model_dir):
+        self.system_properties = {"model_dir": model_dir}
+
+    def get_request_header(self, idx, key):
+        return ort_handler.NPY_CONTENT_TYPE
+
+    def set_response_content_type(self, idx, value):
+        pass
+
+
+def load_source_model(framework, model_path, features):
+    """
+    Return the source model prediction function, and the model.onnx path.
+    """
+    if framework == "sklearn" and model_path is None:
+        from sklearn.decomposition import PCA
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+
+        model = PCA(n_components=min(6, features)).fit(np.random.rand(10000, features))
+        onnx_path = os.path.join(tempfile.mkdtemp(), "model.onnx")
+        with open(onnx_path, "wb") as f:
+            f.write(convert_sklearn(model, initial_types=[("input", FloatTensorType([None, features]))])
+                    .SerializeToString())
+        return model.transform, onnx_path
+
+    if framework == "sklearn":
+        from joblib import load
+
+        model = load(model_path)
+        return (model.transform if hasattr(model, "transform") else model.predict), None
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    return (lambda data: model.predict(data, batch_size=len(data), verbose=0)), None
+
+
+def rows_per_second(function, data, repeats):
+    function(data)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(data)
+    return len(data) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--framework", default="sklearn", choices=["sklearn", "keras"])
+    parser.add_argument("--model", default=None, help="joblib file or SavedModel directory")
+    parser.add_argument("--onnx", default=None, help="exported model.onnx")
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--rows", default="1,100,10000")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    source_predict, onnx_path = load_source_model(args.framework, args.model, args.features)
+    onnx_path = args.onnx or onnx_path
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    handler = ort_handler.OnnxRuntimeHandler()
+    handler.initialize(LocalContext(os.path.dirname(os.path.abspath(onnx_path))))
+
+    def onnx_predict(data):
+        return session.run(None, {input_name: data.astype(np.float32)})[0]
+
+    def handler_predict(data):
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        return handler.handle([{"body": buffer.getvalue()}], LocalContext(None))
+
+    check = np.random.rand(1000, args.features)
+    difference = np.abs(np.asarray(source_predict(check)).reshape(len(check), -1)
+                        - onnx_predict(check).reshape(len(check), -1)).max()
+    print(f"max abs difference between {args.framework} and ONNX Runtime: {difference:.2e}")
+
+    print(f"{'rows':>8} {args.framework + ' rows/s':>16} {'onnxruntime rows/s':>20} {'ort_handler rows/s':>20}")
+    for rows in [int(value) for value in args.rows.split(",")]:
+        data = np.random.rand(rows, args.features)
+        print(f"{rows:>8} {rows_per_second(source_predict, data, args.repeats):>16.0f} "
+              f"{rows_per_second(onnx_predict, data, args.repeats):>20.0f} "
+              f"{rows_per_second(handler_predict, data, args.repeats):>20.0f}")
+
+    if difference > args.tolerance:
+        sys.exit(f"Parity check failed: {difference:.2e} > {args.tolerance:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+
+import subprocess
+import sys
+import shlex
+import os
+import multiprocessing
+from retrying import retry
+from subprocess import CalledProcessError
+from sagemaker_inference import model_server
+
+def _retry_if_error(exception):
+    return isinstance(exception, CalledProcessError or OSError)
+
+@retry(stop_max_delay=1000 * 50,
+       retry_on_exception=_retry_if_error)
+def _start_mms():
+    # by default the model server starts 1 worker per model, start one per CPU instead.
+    # SAGEMAKER_MODEL_SERVER_WORKERS set in the transform env still takes precedence.
+    os.environ.setdefault('SAGEMAKER_MODEL_SERVER_WORKERS', str(multiprocessing.cpu_count()))
+    model_server.start_model_server(handler_service='/home/model-server/ort_handler.py:handle')
+
+def main():
+    if sys.argv[1] == 'serve':
+        _start_mms()
+    else:
+        subprocess.check_call(shlex.split(' '.join(sys.argv[1:])))
+
+    # prevent docker exit
+    subprocess.call(['tail', '-f', '/dev/null'])
+    
+main()
@@ -0,0 +1,123 @@
+import glob
+import io
+import json
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+import onnxruntime as ort
+
+NPY_CONTENT_TYPE = "application/x-npy"
+NPY_MAGIC = b"\x93NUMPY"
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxRuntimeHandler(object):
+    """
+    An ONNX Runtime model handler implementation, serving the model.onnx file of the model directory.
+    """
+
+    def __init__(self):
+        self.initialized = False
+        self.session = None
+        self.input_name = None
+        self.input_type = None
+
+    def initialize(self, context):
+        """
+        Initialize model. This will be called during model loading time
+        :param context: Initial context contains model server system properties.
+        :return: None
+        """
+        model_dir = context.system_properties.get("model_dir")
+        model_files = sorted(glob.glob(os.path.join(model_dir, "**", "*.onnx"), recursive=True))
+        if not model_files:
+            raise ValueError("No .onnx model found in {}".format(model_dir))
+
+        # the model server runs several workers, share the CPUs between them
+        workers = int(os.environ.get("SAGEMAKER_MODEL_SERVER_WORKERS", "1"))
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(os.environ.get(
+            "SMP_ORT_INTRA_OP_THREADS", max(1, multiprocessing.cpu_count() // workers)
+        ))
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_files[0], options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_type = np.float64 if model_input.type == "tensor(double)" else np.float32
+        logger.info("Loaded %s, input %s %s", model_files[0], model_input.name, model_input.type)
+        self.initialized = True
+
+    def decode(self, payload, content_type):
+        """
+        Read the records of one request.
+        :param payload: request body
+        :param content_type: application/x-npy, text/csv or application/json
+        :return: records as a 2D numpy array
+        """
+        if content_type == NPY_CONTENT_TYPE or payload.startswith(NPY_MAGIC):
+            data = np.load(io.BytesIO(payload), allow_pickle=False)
+        elif content_type == "application/json":
+            body = json.loads(payload)
+            data = np.asarray(body["instances"] if isinstance(body, dict) else body)
+        else:
+            payload = payload.strip().replace(b"\r", b"")
+            number_of_columns = payload.split(b"\n", 1)[0].count(b",") + 1
+            data = np.fromstring(payload.replace(b"\n", b",").decode("utf-8"), sep=",")
+            data = data.reshape(-1, number_of_columns)
+        return data.reshape(len(data), -1).astype(self.input_type, copy=False)
+
+    def encode(self, prediction, accept):
+        """
+        Serialize the predictions of one request.
+        :param prediction: predictions as numpy
+        :param accept: application/x-npy, text/csv or application/json (default)
+        :return: serialized predictions, and their content type
+        """
+        if accept == NPY_CONTENT_TYPE:
+            buffer = io.BytesIO()
+            np.save(buffer, prediction)
+            return buffer.getvalue(), NPY_CONTENT_TYPE
+        if accept == "text/csv":
+            buffer = io.BytesIO()
+            np.savetxt(buffer, prediction.reshape(len(prediction), -1), delimiter=",", fmt="%.9g")
+            return buffer.getvalue(), "text/csv"
+        return json.dumps({"predictions": prediction.tolist()}), "application/json"
+
+    def handle(self, data, context):
+        """
+        Score all the requests of a batch with a single session run.
+        :param data: input data
+        :param context: mms context
+        """
+        batches = []
+        for idx, row in enumerate(data):
+            content_type = context.get_request_header(idx, "Content-Type") or "text/csv"
+            batches.append(self.decode(bytes(row.get("body") or row.get("data")), content_type))
+        sizes = [len(batch) for batch in batches]
+        model_input = batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+        prediction = self.session.run(None, {self.input_name: model_input})[0]
+
+        responses = []
+        for idx, request_prediction in enumerate(np.split(prediction, np.cumsum(sizes)[:-1])):
+            response, content_type = self.encode(request_prediction, context.get_request_header(idx, "Accept"))
+            context.set_response_content_type(idx, content_type)
+            responses.append(response)
+        return responses
+
+
+_service = OnnxRuntimeHandler()
+
+
+def handle(data, context):
+    if not _service.initialized:
+        _service.initialize(context)
+
+    if data is None:
+        return None
+
+    return _service.handle(data, context)
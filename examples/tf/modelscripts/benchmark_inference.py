@@ -0,0 +1,72 @@
+"""
+Local benchmark of the inference.py input handler, in rows per second.
+
+Compares the previous row by row CSV parser with the vectorized parser and the application/x-npy
+path, and the "instances" and "inputs" TensorFlow Serving payloads.
+
+    python benchmark_inference.py --rows 100,10000,100000
+"""
+import argparse
+import io
+import json
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import inference
+
+Context = namedtuple("Context", ["request_content_type", "accept_header"])
+NUM_FEATURES = 8
+
+
+def read_csv_rows(csv):
+    return np.array([[float(j) for j in i.split(",")] for i in csv.splitlines()])
+
+
+def previous_input_handler(payload):
+    return json.dumps({"instances": read_csv_rows(payload.decode("utf-8")).tolist()})
+
+
+def rows_per_second(function, payload, rows, repeats):
+    function(payload)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(payload)
+    return rows * repeats / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100,10000,100000")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'case':>32} {'rows/s':>12}")
+    for rows in [int(value) for value in args.rows.split(",")]:
+        data = np.random.rand(rows, NUM_FEATURES)
+        csv_buffer = io.BytesIO()
+        np.savetxt(csv_buffer, data, delimiter=",", fmt="%.6f")
+        npy_buffer = io.BytesIO()
+        np.save(npy_buffer, data)
+
+        cases = {
+            "csv parse (previous)": (lambda payload: read_csv_rows(payload.decode("utf-8")), csv_buffer.getvalue()),
+            "csv parse (vectorized)": (inference.read_csv, csv_buffer.getvalue()),
+            "npy parse": (inference.read_npy, npy_buffer.getvalue()),
+            "csv handler, instances (previous)": (previous_input_handler, csv_buffer.getvalue()),
+        }
+        for request_format in ["instances", "inputs"]:
+            for content_type, payload in [("text/csv", csv_buffer.getvalue()),
+                                          (inference.NPY_CONTENT_TYPE, npy_buffer.getvalue())]:
+                def handler(payload, content_type=content_type, request_format=request_format):
+                    inference.REQUEST_FORMAT = request_format
+                    return inference.input_handler(io.BytesIO(payload), Context(content_type, content_type))
+                cases[f"{content_type.split('/')[1]} handler, {request_format}"] = (handler, payload)
+
+        for name, (function, payload) in cases.items():
+            print(f"{rows:>8} {name:>32} {rows_per_second(function, payload, rows, args.repeats):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,27 @@
-import json
 import os
-import pathlib
 
-import numpy as np
-from sklearn.metrics import mean_squared_error
+# streaming_metrics is shipped next to the entry point by the Metrics step
+from streaming_metrics import RegressionState, finalize, get_shard_seed, iter_aligned_chunks
 
 if __name__ == "__main__":
+    chunk_rows = int(os.environ.get("SMP_METRICS_CHUNK_ROWS", "100000"))
+    bootstrap_replicates = int(os.environ.get("SMP_METRICS_BOOTSTRAP_REPLICATES", "100"))
+
     pred_path = "/opt/ml/processing/input/calhousing-Transform-train/"
     print(os.listdir(pred_path))
-    with open(os.path.join(pred_path, "x_test.csv.out")) as f:
-        file_string = f.read()
-    y_test_pred = json.loads(file_string)["predictions"]
-
     test_path = "/opt/ml/processing/input/calhousing-Preprocessing-train/"
     print(os.listdir(test_path))
-    y_test_true = np.loadtxt(os.path.join(test_path, "test/y_test.csv"))
-    scores = mean_squared_error(y_test_true, y_test_pred)
-    print("\nTest MSE :", scores)
 
-    # Available metrics to add to model: https://docs.aws.amazon.com/sagemaker/latest/dg/model-monitor-model-quality-metrics.html
-    report_dict = {
-        "regression_metrics": {
-            "mse": {"value": scores, "standard_deviation": "NaN"},
-        },
-    }
+    # the JSON response holds "outputs" for the columnar "inputs" request format, "predictions" for "instances"
+    state = RegressionState(bootstrap_replicates=bootstrap_replicates, seed=get_shard_seed())
+    for y_test_true, y_test_pred in iter_aligned_chunks(
+            [os.path.join(test_path, "test/y_test.csv")],
+            [os.path.join(pred_path, "x_test.csv.out")],
+            chunk_rows,
+    ):
+        state.update(y_test_true, y_test_pred)
 
-    output_dir = "/opt/ml/processing/output"
-    pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+    # Available metrics to add to model: https://docs.aws.amazon.com/sagemaker/latest/dg/model-monitor-model-quality-metrics.html
+    print("\nTest MSE :", state.result()["mse"])
 
-    evaluation_path = f"{output_dir}/model_evaluation_metrics.json"
-    with open(evaluation_path, "w") as f:
-        f.write(json.dumps(report_dict))
+    finalize(state, "/opt/ml/processing/output")
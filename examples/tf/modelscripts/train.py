@@ -1,5 +1,7 @@
 import argparse
+import glob
 import os
+import tarfile
 
 import numpy as np
 import tensorflow as tf
@@ -12,6 +14,9 @@ def parse_args():
     parser.add_argument('--epochs', type=int, default=1)
     parser.add_argument('--batch_size', type=int, default=64)
     parser.add_argument('--learning_rate', type=float, default=0.1)
+    # export the trained model to model.onnx for ONNX Runtime serving, requires tf2onnx
+    parser.add_argument('--export-onnx', type=str, default='false')
+    parser.add_argument('--onnx-opset', type=int, default=13)
 
     # data directories
     channel_path = "/opt/ml/input/data/calhousing-Preprocessing-train"
@@ -28,6 +33,8 @@ def parse_args():
 
     # model directory
     parser.add_argument('--sm-model-dir', type=str, default=os.environ.get('SM_MODEL_DIR'))
+    # warm start model channel, set when the training job is given a model_uri
+    parser.add_argument('--model-channel', type=str, default=os.environ.get('SM_CHANNEL_MODEL'))
 
     return parser.parse_known_args()
 
@@ -56,6 +63,37 @@ def get_model():
     return tf.keras.Model(inputs=inputs, outputs=outputs)
 
 
+def export_onnx(model, output_path, opset):
+    """Export the Keras model to ONNX, next to the SavedModel."""
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ImportError('--export-onnx requires tf2onnx, add it to requirements.txt')
+    input_signature = [tf.TensorSpec((None,) + tuple(model.inputs[0].shape[1:]), tf.float32, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=opset, output_path=output_path)
+    print('ONNX model saved to {}'.format(output_path))
+
+
+def load_previous_weights(model, model_channel):
+    """Initialize the model with the weights of a previously trained SavedModel, if any."""
+    if not model_channel or not os.path.isdir(model_channel):
+        return False
+    for archive in glob.glob(os.path.join(model_channel, '*.tar.gz')):
+        with tarfile.open(archive) as tar:
+            tar.extractall(model_channel)
+    saved_models = sorted(glob.glob(os.path.join(model_channel, '**', 'saved_model.pb'), recursive=True))
+    if not saved_models:
+        return False
+    previous_model = tf.keras.models.load_model(os.path.dirname(saved_models[-1]))
+    previous_weights = previous_model.get_weights()
+    if [w.shape for w in previous_weights] != [w.shape for w in model.get_weights()]:
+        print('Previous model architecture differs, training from scratch')
+        return False
+    model.set_weights(previous_weights)
+    print('Warm starting from {}'.format(os.path.dirname(saved_models[-1])))
+    return True
+
+
 if __name__ == "__main__":
     args, _ = parse_args()
 
@@ -70,6 +108,7 @@ if __name__ == "__main__":
     print('batch_size = {}, epochs = {}, learning rate = {}'.format(batch_size, epochs, learning_rate))
 
     model = get_model()
+    load_previous_weights(model, args.model_channel)
     optimizer = tf.keras.optimizers.SGD(learning_rate)
     model.compile(optimizer=optimizer, loss='mse')
     model.fit(x_train,
@@ -84,3 +123,6 @@ if __name__ == "__main__":
 
     # save model
     model.save(args.sm_model_dir + '/1')
+
+    if args.export_onnx.lower() == 'true':
+        export_onnx(model, os.path.join(args.sm_model_dir, 'model.onnx'), args.onnx_opset)
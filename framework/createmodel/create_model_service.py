@@ -17,12 +17,18 @@
 
 # Import native libraries
 
+from botocore.exceptions import ClientError
 from sagemaker.model import Model
+from sagemaker.workflow._utils import _RepackModelStep
+from sagemaker.workflow.model_step import ModelStep
 from sagemaker.workflow.pipeline_context import PipelineSession
 # Import Third-party libraries
 from sagemaker.workflow.steps import TrainingStep
 # Import Custom libraries
+from pipeline.helper import get_model_data
 from utilities.logger import Logger
+from utilities.packaging import build_archive, format_dependency_report, select_dependencies
+from utilities.tracing import trace_methods
 
 
 ########################################################################################
@@ -31,11 +37,24 @@ from utilities.logger import Logger
 ########################################################################################
 
 
+@trace_methods
 class CreateModelService:
     """
     Create Model Service. Create a ModelStep
     """
 
+    # SageMaker Models built per (model name, training step name, variant), shared by the
+    # CreateModel and RegisterModel steps of a pipeline compilation
+    _models = {}
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Method to forget the Models built by the previous compilation, called when a pipeline
+        compilation starts
+        """
+        cls._models = {}
+
     def __init__(self, config: dict, model_name: str) -> "CreateModelService":
         """
         Initialization method to Create a SageMaker Model
@@ -102,31 +121,64 @@ class CreateModelService:
             },
             enable_network_isolation=False,
             default_bucket=self.config.get(f"s3Bucket"),
+            code_prefix=conf.get(f"{self.model_name}.registry.code_prefix", f"{self.model_name}/inference-code"),
+            kms_key=self.config.get("sagemakerNetworkSecurity.kms_key"),
         )
 
         return args
 
-    def create_model(self, step_train: TrainingStep) -> Model:
+    def _upload_inference_code(self, args: dict) -> str:
         """
-        Create a SageMaker Model
+        Method to upload the source directory as a content-addressed sourcedir.tar.gz, once per content
+
+        Returns:
+        ----------
+        - S3 URI of the archive, used as SAGEMAKER_SUBMIT_DIRECTORY
+        """
+        selected_files, report = select_dependencies(source_directory=args["source_dir"], max_file_size_mb=None)
+        self.logger.log_info(lambda: format_dependency_report(report))
+        archive_path, digest = build_archive(args["source_dir"], selected_files, prefix="smp-inference-code-")
+
+        sagemaker_session = self._get_pipeline_session()
+        bucket = args["default_bucket"] or sagemaker_session.default_bucket()
+        key = f"{args['code_prefix'].strip('/')}/{digest}/sourcedir.tar.gz"
+        code_uri = f"s3://{bucket}/{key}"
+        try:
+            sagemaker_session.s3_client.head_object(Bucket=bucket, Key=key)
+            self.logger.log_info(f"Inference code of {self.model_name} already uploaded: {code_uri}")
+        except ClientError:
+            extra_args = {"ServerSideEncryption": "aws:kms", "SSEKMSKeyId": args["kms_key"]} if args["kms_key"] else {}
+            sagemaker_session.s3_client.upload_file(archive_path, bucket, key, ExtraArgs=extra_args or None)
+            self.logger.log_info(f"Inference code of {self.model_name} uploaded: {code_uri}")
+        return code_uri
+
+    def create_model(self, step_train: TrainingStep, variant_name: str = None) -> Model:
+        """
+        Create a SageMaker Model, built once per model and training step
 
         Args:
         ----------
         - step_train (TrainingStep): SageMaker Training Step
+        - variant_name (str): Variant of a packed Training Step, served from its own model prefix
 
         Returns:
         ----------
         - SageMaker Model
 
         """
+        key = (self.model_name, step_train.name, variant_name)
+        if key in self._models:
+            self.logger.log_info(f"SageMaker Model - {self.model_name} - Reused")
+            return self._models[key]
+
         # Get SegeMaker Network Configuration
         sagemaker_network_config = self._get_network_config()
         self.logger.log_info(f"{'-' * 50} Start SageMaker Model Creation {self.model_name} {'-' * 50}")
-        self.logger.log_info(f"SageMaker network config: {sagemaker_network_config}")
+        self.logger.log_info(lambda: f"SageMaker network config: {sagemaker_network_config}")
 
         # Get Arg for CreateModel Step
         args = self._args()
-        self.logger.log_info(f"Arguments used: {args}")
+        self.logger.log_info(lambda: f"Arguments used: {args}")
 
         # Check ModelRepack Flag
         _model_repack_flag = args.get("model_repack_flag")
@@ -138,6 +190,15 @@ class CreateModelService:
             {'Subnets': sagemaker_network_config.get("subnets")})
         if not vpc_config: vpc_config = None
 
+        model_data = get_model_data(step_train, variant_name)
+        if variant_name is not None and args["name"]:
+            args["name"] = f"{args['name']}-{variant_name}"
+        if isinstance(model_data, dict) and _model_repack_flag == "True":
+            raise Exception(
+                f"Uncompressed model artifacts of {self.model_name} can't be repacked, "
+                "set registry.ModelRepack to \"Precomputed\" or \"False\"."
+            )
+
         model = ''
         if _model_repack_flag == "True":
             model = Model(
@@ -145,7 +206,7 @@ class CreateModelService:
                 image_uri=args["image_uri"],
                 source_dir=args["source_dir"],
                 entry_point=args["entry_point"],
-                model_data=step_train.properties.ModelArtifacts.S3ModelArtifacts,
+                model_data=model_data,
                 role=sagemaker_network_config["role"],
                 vpc_config=vpc_config,
                 enable_network_isolation=args["enable_network_isolation"],
@@ -153,19 +214,74 @@ class CreateModelService:
                 model_kms_key=sagemaker_network_config["kms_key"],
             )
 
+        elif _model_repack_flag == "Precomputed":
+            # the inference code is served from its own archive, the model artifact is not repacked
+            model = Model(
+                name=args["name"],
+                image_uri=args["image_uri"],
+                env=dict(args["env"], SAGEMAKER_SUBMIT_DIRECTORY=self._upload_inference_code(args)),
+                model_data=model_data,
+                role=sagemaker_network_config["role"],
+                vpc_config=vpc_config,
+                enable_network_isolation=args.get("enable_network_isolation"),
+                sagemaker_session=self._get_pipeline_session(),
+                model_kms_key=sagemaker_network_config["kms_key"],
+            )
+
         elif _model_repack_flag == "False":
             model = Model(
                 name=args["name"],
                 image_uri=args["image_uri"],
                 env=args["env"],
-                model_data=step_train.properties.ModelArtifacts.S3ModelArtifacts,
+                model_data=model_data,
                 role=sagemaker_network_config["role"],
                 vpc_config=vpc_config,
                 enable_network_isolation=args.get("enable_network_isolation"),
                 sagemaker_session=self._get_pipeline_session(),
                 model_kms_key=sagemaker_network_config["kms_key"],
             )
-            print
 
+        self._models[key] = model
         self.logger.log_info(f"SageMaker Model - {self.model_name} - Created")
         return model
+
+    def get_repacked_model(self, step_train: TrainingStep, create_model_step: ModelStep) -> Model:
+        """
+        Get a SageMaker Model serving the artifact repacked by a CreateModel step, so that other
+        steps registering the model do not repack it again
+
+        Args:
+        ----------
+        - step_train (TrainingStep): SageMaker Training Step
+        - create_model_step (ModelStep): The CreateModel step of the model
+
+        Returns:
+        ----------
+        - SageMaker Model on the repacked artifact, or the Model of create_model when the
+          CreateModel step does not repack
+        """
+        model = self.create_model(step_train=step_train)
+        repack_steps = [step for step in create_model_step.steps if isinstance(step, _RepackModelStep)]
+        if not repack_steps:
+            return model
+
+        self.logger.log_info(f"SageMaker Model - {self.model_name} - Reusing {repack_steps[0].name} artifact")
+        # same serving environment as the container of the repacked model
+        env = dict(
+            model.env,
+            SAGEMAKER_PROGRAM=model.entry_point,
+            SAGEMAKER_SUBMIT_DIRECTORY="/opt/ml/model/code",
+            SAGEMAKER_CONTAINER_LOG_LEVEL=str(model.container_log_level),
+            SAGEMAKER_REGION=model.sagemaker_session.boto_region_name,
+        )
+        return Model(
+            name=model.name,
+            image_uri=model.image_uri,
+            env=env,
+            model_data=repack_steps[0].properties.ModelArtifacts.S3ModelArtifacts,
+            role=model.role,
+            vpc_config=model.vpc_config,
+            enable_network_isolation=model.enable_network_isolation(),
+            sagemaker_session=model.sagemaker_session,
+            model_kms_key=model.model_kms_key,
+        )
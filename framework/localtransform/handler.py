@@ -0,0 +1,175 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Import native libraries
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+from typing import Callable, Tuple, Union
+
+# Import third-party libraries
+import numpy as np
+
+
+class LocalContext:
+    """
+    Minimal stand-in for the Multi Model Server context given to model handlers.
+
+    Attributes:
+    ----------
+    - system_properties (dict): Model server properties, model_dir points to the local model artifacts
+    - request_headers (list): Request headers of each request in the batch
+    - response_content_types (dict): Response content type set by the handler for each request
+    """
+
+    def __init__(self, model_dir: str, content_type: str = None, accept: str = None, batch_size: int = 1):
+        self.system_properties = {"model_dir": model_dir, "gpu_id": None, "batch_size": batch_size}
+        self.request_headers = [
+            {"Content-Type": content_type, "Accept": accept or content_type} for _ in range(batch_size)
+        ]
+        self.response_content_types = {}
+
+    def get_request_header(self, idx: int, key: str) -> Union[str, None]:
+        headers = self.request_headers[idx] if idx < len(self.request_headers) else {}
+        return headers.get(key, headers.get(key.lower()))
+
+    def set_response_content_type(self, idx: int, value: str) -> None:
+        self.response_content_types[idx] = value
+
+    def get_response_content_type(self, idx: int) -> Union[str, None]:
+        return self.response_content_types.get(idx)
+
+    def set_batch(self, batch_size: int) -> None:
+        """
+        Resize the request headers to the number of requests of the next handler call.
+        """
+        template = self.request_headers[0]
+        self.request_headers = [dict(template) for _ in range(batch_size)]
+        self.response_content_types = {}
+
+
+def load_handler(handler_spec: str) -> Callable:
+    """
+    Load a model server handler function from a "path/to/script.py:function" specification.
+
+    The script directory is added to sys.path so the handler can import its sibling modules.
+
+    Args:
+        handler_spec (str): The handler script path and function name, separated by ":".
+            The function name defaults to "handle".
+
+    Returns:
+        The handler function, called as handler(data, context).
+    """
+    script_path, _, function_name = handler_spec.partition(":")
+    script_path = os.path.abspath(script_path)
+    script_directory = os.path.dirname(script_path)
+    if script_directory not in sys.path:
+        sys.path.insert(0, script_directory)
+
+    module_name = f"smp_local_handler_{os.path.splitext(os.path.basename(script_path))[0]}"
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, function_name or "handle")
+
+
+def load_sample(path: str, max_rows: int = None) -> np.ndarray:
+    """
+    Load sample records from a .npy or delimited text file.
+
+    Args:
+        path (str): The sample file path.
+        max_rows (int): Maximum number of rows to read.
+
+    Returns:
+        The sample records as a 2D array.
+    """
+    if path.endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        data = np.asarray(data[:max_rows] if max_rows else data)
+    else:
+        data = np.loadtxt(path, delimiter=",", max_rows=max_rows, ndmin=2)
+    return data.reshape(len(data), -1)
+
+
+def encode_records(records: np.ndarray, content_type: str) -> bytes:
+    """
+    Serialize records into a request payload.
+
+    Args:
+        records (np.ndarray): The records, one per row.
+        content_type (str): The payload content type. Supported values are
+            application/x-npy, text/csv and application/json.
+
+    Returns:
+        The request payload.
+    """
+    if content_type == "application/x-npy":
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(records))
+        return buffer.getvalue()
+    if content_type == "text/csv":
+        buffer = io.BytesIO()
+        np.savetxt(buffer, records, delimiter=",", fmt="%.10g")
+        return buffer.getvalue()
+    if content_type == "application/json":
+        return json.dumps({"instances": records.tolist()}).encode("utf-8")
+    raise ValueError(f"Unsupported content type {content_type}, valid values are application/x-npy, "
+                     f"text/csv and application/json")
+
+
+_worker_handler = None
+_worker_context = None
+
+
+def initialize_worker(handler_spec: str, model_dir: str, content_type: str, accept: str = None,
+                      env: dict = None) -> None:
+    """
+    Load the handler once per pool worker, as a model server worker would.
+
+    Args:
+        handler_spec (str): The handler script path and function name.
+        model_dir (str): The local directory holding the extracted model artifacts.
+        content_type (str): The request content type.
+        accept (str): The response content type requested from the handler.
+        env (dict): Environment variables of the serving container.
+    """
+    global _worker_handler, _worker_context
+    os.environ.update({key: str(value) for key, value in (env or {}).items()})
+    _worker_handler = load_handler(handler_spec)
+    _worker_context = LocalContext(model_dir=model_dir, content_type=content_type, accept=accept)
+
+
+def invoke_handler(payload: bytes) -> Tuple[object, float]:
+    """
+    Send one request to the handler loaded by initialize_worker.
+
+    Args:
+        payload (bytes): The request body.
+
+    Returns:
+        The handler response for the request, and the request latency in seconds.
+    """
+    start = time.perf_counter()
+    response = _worker_handler([{"body": payload}], _worker_context)
+    latency = time.perf_counter() - start
+    return (response[0] if response else None), latency
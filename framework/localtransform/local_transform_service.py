@@ -0,0 +1,369 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Local streaming batch transform runner.
+#
+# Usage, from the framework directory:
+#   python -m localtransform.local_transform_service \
+#       --conf ../examples/lgbm/conf/conf.yaml --model-name lgbm \
+#       --handler ../examples/lgbm/transform/docker/model_script.py:handle \
+#       --model-dir /path/to/model.tar.gz \
+#       --input /path/to/test --output /tmp/lgbm-Transform-test
+
+# Import native libraries
+import argparse
+import atexit
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Union
+
+# Import third-party libraries
+import yaml
+
+# Import custom libraries
+from localtransform.handler import initialize_worker, invoke_handler
+from utilities.configuration import DotDict
+from utilities.logger import Logger
+
+MEGABYTE = 1024 * 1024
+# SageMaker Batch Transform default max_payload, in MB
+DEFAULT_MAX_PAYLOAD_MB = 6
+
+_INDEX_FILTER = re.compile(r"^\$\[(.+)\]$")
+
+
+def _select_columns(columns: list, selector: str) -> list:
+    """
+    Select CSV columns with a JSONPath index expression such as "0", "1:", "0,-1" or "2:5".
+    """
+    selected = []
+    for part in selector.split(","):
+        part = part.strip()
+        if ":" in part:
+            start, _, stop = part.partition(":")
+            selected.extend(columns[slice(int(start) if start else None, int(stop) if stop else None)])
+        else:
+            selected.append(columns[int(part)])
+    return selected
+
+
+def apply_filter(record: bytes, json_path: Union[str, None], content_type: str) -> bytes:
+    """
+    Apply a Batch Transform input or output JSONPath filter to a record.
+
+    Supported expressions are "$" for the whole record, index selections such as "$[1:]"
+    or "$[0,-1]" for CSV records, and key paths such as "$.features" for JSON records.
+
+    Args:
+        record (bytes): The record, without trailing newline.
+        json_path (str): The filter expression. None keeps the record unchanged.
+        content_type (str): The record content type.
+
+    Returns:
+        The filtered record.
+    """
+    if json_path is None or json_path == "$":
+        return record
+
+    if content_type == "text/csv":
+        match = _INDEX_FILTER.match(json_path)
+        if not match:
+            raise ValueError(f"Unsupported CSV filter {json_path}, use an index expression such as $[1:]")
+        columns = record.decode("utf-8").split(",")
+        return ",".join(_select_columns(columns, match.group(1))).encode("utf-8")
+
+    if content_type in ["application/json", "application/jsonlines"]:
+        value = json.loads(record)
+        for key in re.findall(r"\.([^.\[]+)|\[(\d+)\]", json_path[1:]):
+            value = value[key[0]] if key[0] else value[int(key[1])]
+        return json.dumps(value).encode("utf-8")
+
+    raise ValueError(f"Filters are not supported for content type {content_type}")
+
+
+def join_record(input_record: bytes, output_record: bytes, content_type: str) -> bytes:
+    """
+    Join an input record with its prediction, as join_source "Input" does.
+
+    CSV predictions are appended as extra columns. JSON predictions are added under the
+    SageMakerOutput key of JSON objects, or appended to JSON arrays.
+    """
+    if content_type == "text/csv":
+        return input_record + b"," + output_record
+
+    input_value = json.loads(input_record)
+    output_value = json.loads(output_record)
+    if isinstance(input_value, dict):
+        input_value["SageMakerOutput"] = output_value
+    elif isinstance(input_value, list):
+        input_value.append(output_value)
+    else:
+        raise ValueError("join_source Input requires JSON objects or arrays as input records")
+    return json.dumps(input_value).encode("utf-8")
+
+
+def _to_bytes(response: object) -> bytes:
+    if response is None:
+        return b""
+    if isinstance(response, str):
+        return response.encode("utf-8")
+    return bytes(response)
+
+
+class LocalTransformService:
+    """
+    Run a Transform step locally: stream input files through a model handler on a process pool
+    and write ".out" files with the same layout as a SageMaker Batch Transform job.
+
+    The split_type, strategy, max_payload, assemble_with, join_source, input_filter, output_filter,
+    content_type, accept, max_concurrent_transforms and env values of the transform configuration
+    are honoured.
+    """
+
+    def __init__(self, transform_config: dict, handler_spec: str, model_dir: str) -> "LocalTransformService":
+        """
+        Initialization method to LocalTransformService
+
+        Args:
+        ----------
+        - transform_config (dict): Transform section of the model configuration
+        - handler_spec (str): Handler script and function, as "path/to/script.py:handle"
+        - model_dir (str): Local model directory, or model.tar.gz archive
+        """
+        self.transform_config = DotDict(transform_config or {})
+        self.handler_spec = handler_spec
+        self.model_dir = self._extract_model(model_dir)
+        self.logger = Logger()
+
+    def _extract_model(self, model_dir: str) -> str:
+        """
+        Method to extract a model.tar.gz archive into a temporary model directory, removed at exit
+        """
+        if os.path.isdir(model_dir):
+            return model_dir
+        extract_dir = tempfile.mkdtemp(prefix="smp-local-model-")
+        atexit.register(shutil.rmtree, extract_dir, ignore_errors=True)
+        with tarfile.open(model_dir) as tar:
+            tar.extractall(extract_dir)
+        return extract_dir
+
+    def _args(self) -> dict:
+        """
+        Parse method to retreive the transform arguments, with TransformService defaults
+
+        Returns:
+        ----------
+        - Transform arguments : dict
+        """
+        conf = self.transform_config
+        env = conf.get("env", {}) or {}
+        content_type = conf.get("content_type", "text/csv")
+
+        args = dict(
+            strategy=conf.get("strategy", "MultiRecord"),
+            assemble_with=conf.get("assemble_with", None),
+            join_source=conf.get("join_source", None),
+            split_type=conf.get("split_type", None),
+            content_type=content_type,
+            accept=conf.get("accept", content_type),
+            max_payload=conf.get("max_payload", DEFAULT_MAX_PAYLOAD_MB),
+            input_filter=conf.get("input_filter", None),
+            output_filter=conf.get("output_filter", None),
+            max_concurrent_transforms=conf.get(
+                "max_concurrent_transforms",
+                int(env["SAGEMAKER_MODEL_SERVER_WORKERS"]) if env.get("SAGEMAKER_MODEL_SERVER_WORKERS")
+                else os.cpu_count() or 1
+            ),
+            env=env,
+        )
+
+        if args["split_type"] not in [None, "None", "Line"]:
+            raise ValueError(f"split_type {args['split_type']} is not supported by the local transform")
+        if args["split_type"] == "None":
+            args["split_type"] = None
+        if args["assemble_with"] == "None":
+            args["assemble_with"] = None
+        if args["split_type"] is None and (args["input_filter"] or args["join_source"] or args["output_filter"]):
+            raise ValueError("input_filter, join_source and output_filter require split_type Line")
+
+        return args
+
+    def _get_input_files(self, input_path: str) -> List[str]:
+        """
+        Method to list the input files, relative to the input path
+        """
+        if os.path.isfile(input_path):
+            return [os.path.basename(input_path)]
+        input_files = []
+        for root, _, files in os.walk(input_path):
+            for file_name in sorted(files):
+                input_files.append(os.path.relpath(os.path.join(root, file_name), input_path))
+        return sorted(input_files)
+
+    def _get_requests(self, file_path: str, args: dict) -> Iterator[List[bytes]]:
+        """
+        Method to stream the records of an input file, grouped into requests
+
+        Without split_type the whole file is one request. With split_type Line, SingleRecord sends
+        one line per request and MultiRecord packs lines up to max_payload. As in a Batch Transform
+        job, a request or record larger than max_payload is rejected, and max_payload 0 disables
+        the limit.
+
+        Returns:
+        ----------
+        - Iterator over the list of records of each request
+        """
+        max_payload_bytes = int(float(args["max_payload"]) * MEGABYTE) or None
+        if args["split_type"] is None:
+            if max_payload_bytes is not None and os.path.getsize(file_path) > max_payload_bytes:
+                raise ValueError(
+                    f"{file_path} is larger than max_payload {args['max_payload']} MB, "
+                    f"set split_type Line or increase max_payload"
+                )
+            with open(file_path, "rb") as f:
+                yield [f.read()]
+            return
+
+        batch, batch_size = [], 0
+        with open(file_path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                record = line.rstrip(b"\r\n")
+                if not record:
+                    continue
+                if max_payload_bytes is not None and len(record) + 1 > max_payload_bytes:
+                    raise ValueError(
+                        f"Record {line_number} of {file_path} is larger than max_payload {args['max_payload']} MB"
+                    )
+                if args["strategy"] == "SingleRecord":
+                    yield [record]
+                    continue
+                if batch and max_payload_bytes is not None and batch_size + len(record) + 1 > max_payload_bytes:
+                    yield batch
+                    batch, batch_size = [], 0
+                batch.append(record)
+                batch_size += len(record) + 1
+        if batch:
+            yield batch
+
+    def _build_payload(self, records: List[bytes], args: dict) -> bytes:
+        """
+        Method to filter the records of a request and build its body
+        """
+        if args["split_type"] is None:
+            return records[0]
+        filtered = [apply_filter(record, args["input_filter"], args["content_type"]) for record in records]
+        return b"\n".join(filtered) + b"\n"
+
+    def _build_output(self, records: List[bytes], response: object, args: dict) -> bytes:
+        """
+        Method to join and filter the predictions of a request, and assemble them
+        """
+        response = _to_bytes(response)
+        if args["join_source"] != "Input" and args["output_filter"] is None:
+            return response + (b"\n" if args["assemble_with"] == "Line" and not response.endswith(b"\n") else b"")
+
+        predictions = [line for line in response.splitlines() if line]
+        if len(predictions) != len(records):
+            raise ValueError(
+                f"The handler returned {len(predictions)} predictions for {len(records)} records, "
+                f"join_source and output_filter require one prediction line per record"
+            )
+
+        outputs = []
+        for record, prediction in zip(records, predictions):
+            output = join_record(record, prediction, args["accept"]) if args["join_source"] == "Input" else prediction
+            outputs.append(apply_filter(output, args["output_filter"], args["accept"]))
+        separator = b"\n" if args["assemble_with"] == "Line" else b""
+        return separator.join(outputs) + separator
+
+    def transform(self, input_path: str, output_path: str) -> List[str]:
+        """
+        Method to transform every file of the input path into output_path/<relative path>.out
+
+        Requests are sent to max_concurrent_transforms handler processes, with a bounded number
+        of in-flight requests, and outputs are written in input order.
+
+        Args:
+        ----------
+        - input_path (str): Input file or directory
+        - output_path (str): Output directory
+
+        Returns:
+        ----------
+        - List of output files
+        """
+        args = self._args()
+        workers = int(args["max_concurrent_transforms"])
+        self.logger.log_info(lambda: f"Local transform of {input_path} with {workers} worker(s), args: {args}")
+
+        output_files = []
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=initialize_worker,
+                initargs=(self.handler_spec, self.model_dir, args["content_type"], args["accept"], args["env"]),
+        ) as executor:
+            for relative_path in self._get_input_files(input_path):
+                file_path = input_path if os.path.isfile(input_path) else os.path.join(input_path, relative_path)
+                output_file = os.path.join(output_path, f"{relative_path}.out")
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+                number_of_requests = 0
+                in_flight = deque()
+                with open(output_file, "wb") as out:
+                    for records in self._get_requests(file_path, args):
+                        future = executor.submit(invoke_handler, self._build_payload(records, args))
+                        in_flight.append((records, future))
+                        number_of_requests += 1
+                        if len(in_flight) >= workers * 2:
+                            done_records, done_future = in_flight.popleft()
+                            out.write(self._build_output(done_records, done_future.result()[0], args))
+                    while in_flight:
+                        done_records, done_future = in_flight.popleft()
+                        out.write(self._build_output(done_records, done_future.result()[0], args))
+
+                self.logger.log_info(f"{relative_path}: {number_of_requests} request(s) written to {output_file}")
+                output_files.append(output_file)
+
+        return output_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Transform step locally")
+    parser.add_argument("--conf", default=None, help="Model conf.yaml holding the transform section")
+    parser.add_argument("--model-name", default=None, help="Model name in the conf.yaml")
+    parser.add_argument("--handler", required=True, help="path/to/script.py:function")
+    parser.add_argument("--model-dir", required=True, help="Local model directory or model.tar.gz")
+    parser.add_argument("--input", required=True, help="Input file or directory")
+    parser.add_argument("--output", required=True, help="Output directory")
+    args = parser.parse_args()
+
+    transform_config = {}
+    if args.conf:
+        with open(args.conf, "r") as f:
+            transform_config = yaml.safe_load(f)["conf"]["models"][args.model_name].get("transform", {})
+
+    LocalTransformService(transform_config, args.handler, args.model_dir).transform(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
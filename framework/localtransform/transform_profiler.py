@@ -0,0 +1,256 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Local throughput profiler for batch transform model handlers.
+#
+# Usage, from the framework directory:
+#   python -m localtransform.transform_profiler \
+#       --handler ../examples/lgbm/transform/docker/model_script.py:handle \
+#       --model-dir /path/to/extracted/model \
+#       --sample /path/to/x_test.npy \
+#       --content-type application/x-npy \
+#       --write-patch /tmp/lgbm-transform-patch.yaml --model-name lgbm
+
+# Import native libraries
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+# Import third-party libraries
+import numpy as np
+import yaml
+
+# Import custom libraries
+from localtransform.handler import encode_records, initialize_worker, invoke_handler, load_sample
+from utilities.logger import Logger
+
+MEGABYTE = 1024 * 1024
+# SageMaker Batch Transform limits max_payload to 100 MB
+MAX_PAYLOAD_LIMIT_MB = 100
+# Configurations within this ratio of the best throughput are considered equivalent
+THROUGHPUT_TOLERANCE = 0.05
+
+
+class TransformProfiler:
+    """
+    Sweep batch sizes and worker counts of a model handler on sample data, and recommend
+    the transform max_payload, strategy, max_concurrent_transforms and model server workers.
+
+    Attributes:
+    ----------
+    - handler_spec (str): Handler script and function, as "path/to/script.py:handle"
+    - model_dir (str): Local directory holding the extracted model artifacts
+    - sample (np.ndarray): Sample records, one per row
+    - content_type (str): Request content type
+    - accept (str): Response content type requested from the handler
+    """
+
+    def __init__(self, handler_spec: str, model_dir: str, sample: np.ndarray, content_type: str,
+                 accept: str = None):
+        self.handler_spec = handler_spec
+        self.model_dir = model_dir
+        self.sample = sample
+        self.content_type = content_type
+        self.accept = accept or content_type
+        self.logger = Logger()
+
+    def _get_payload(self, batch_size: int) -> bytes:
+        """
+        Build a request payload of batch_size records, repeating the sample when needed.
+        """
+        indices = np.arange(batch_size) % len(self.sample)
+        return encode_records(self.sample[indices], self.content_type)
+
+    def _measure(self, executor: ProcessPoolExecutor, workers: int, batch_size: int,
+                 min_records: int, min_requests: int) -> dict:
+        """
+        Measure the throughput and latency of one batch size with a pool of workers.
+        """
+        payload = self._get_payload(batch_size)
+        number_of_requests = max(min_requests * workers, math.ceil(min_records / batch_size))
+
+        start = time.perf_counter()
+        latencies = [latency for _, latency in executor.map(invoke_handler, [payload] * number_of_requests)]
+        elapsed = time.perf_counter() - start
+
+        return dict(
+            workers=workers,
+            batch_size=batch_size,
+            payload_bytes=len(payload),
+            requests=number_of_requests,
+            records_per_second=number_of_requests * batch_size / elapsed,
+            latency_p50_ms=float(np.percentile(latencies, 50) * 1000),
+            latency_p95_ms=float(np.percentile(latencies, 95) * 1000),
+        )
+
+    def sweep(self, batch_sizes: List[int], worker_counts: List[int], min_records: int = 10000,
+              min_requests: int = 4) -> List[dict]:
+        """
+        Run every batch size with every worker count.
+
+        Args:
+        ----------
+        - batch_sizes (list): Records per request to try. Payloads over the 100 MB limit are skipped
+        - worker_counts (list): Number of concurrent handler processes to try
+        - min_records (int): Minimum number of records sent per measurement
+        - min_requests (int): Minimum number of requests per worker per measurement
+
+        Returns:
+        ----------
+        - List of measurements
+        """
+        results = []
+        for workers in worker_counts:
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=initialize_worker,
+                    initargs=(self.handler_spec, self.model_dir, self.content_type, self.accept),
+            ) as executor:
+                # Warm up every worker so model loading is not measured
+                list(executor.map(invoke_handler, [self._get_payload(1)] * workers * 2))
+
+                for batch_size in batch_sizes:
+                    if len(self._get_payload(1)) * batch_size > MAX_PAYLOAD_LIMIT_MB * MEGABYTE:
+                        self.logger.log_warning(f"Skipping batch size {batch_size}, payload exceeds "
+                                                f"{MAX_PAYLOAD_LIMIT_MB} MB")
+                        continue
+                    result = self._measure(executor, workers, batch_size, min_records, min_requests)
+                    self.logger.log_info(
+                        f"workers={workers} batch_size={batch_size} "
+                        f"records/s={result['records_per_second']:.0f} p95={result['latency_p95_ms']:.1f}ms"
+                    )
+                    results.append(result)
+        return results
+
+    def recommend(self, results: List[dict]) -> dict:
+        """
+        Pick the transform settings from the sweep results.
+
+        Among the configurations within 5% of the best throughput, the smallest payload
+        and then the fewest workers are preferred, since they lower latency and memory use.
+
+        Returns:
+        ----------
+        - Transform configuration values
+        """
+        best_throughput = max(result["records_per_second"] for result in results)
+        candidates = [
+            result for result in results
+            if result["records_per_second"] >= best_throughput * (1 - THROUGHPUT_TOLERANCE)
+        ]
+        best = min(candidates, key=lambda result: (result["payload_bytes"], result["workers"]))
+
+        recommendation = dict(
+            strategy="MultiRecord" if best["batch_size"] > 1 else "SingleRecord",
+            max_payload=min(MAX_PAYLOAD_LIMIT_MB, max(1, math.ceil(best["payload_bytes"] / MEGABYTE))),
+            max_concurrent_transforms=best["workers"],
+            env={"SAGEMAKER_MODEL_SERVER_WORKERS": str(best["workers"])},
+        )
+        if self.content_type in ["text/csv", "application/jsonlines"]:
+            recommendation["split_type"] = "Line"
+
+        recommendation["_measurement"] = best
+        return recommendation
+
+
+def format_results(results: List[dict]) -> str:
+    """
+    Render the sweep results as a table.
+    """
+    header = f"{'workers':>8} {'batch':>8} {'payload':>12} {'records/s':>12} {'p50 ms':>10} {'p95 ms':>10}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['workers']:>8} {result['batch_size']:>8} {result['payload_bytes']:>12} "
+            f"{result['records_per_second']:>12.0f} {result['latency_p50_ms']:>10.2f} "
+            f"{result['latency_p95_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def write_recommendation(patch_path: str, model_name: str, recommendation: dict) -> None:
+    """
+    Write the recommended values as a patch of the transform section of a model configuration.
+
+    The patch only holds the recommended keys, under conf.models.<model_name>.transform, so that
+    they can be merged into the model conf.yaml without losing its comments and layout.
+
+    Args:
+    ----------
+    - patch_path (str): Patch file path
+    - model_name (str): Model name under conf.models
+    - recommendation (dict): Values returned by TransformProfiler.recommend
+    """
+    transform_conf = {key: value for key, value in recommendation.items() if not key.startswith("_")}
+    patch = {"conf": {"models": {model_name: {"transform": transform_conf}}}}
+
+    with open(patch_path, "w") as f:
+        f.write(f"# Recommended transform settings of {model_name}, to merge into its conf.yaml\n---\n")
+        yaml.safe_dump(patch, f, sort_keys=False, default_flow_style=False)
+
+
+def _parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a transform model handler and recommend settings")
+    parser.add_argument("--handler", required=True, help="path/to/script.py:function")
+    parser.add_argument("--model-dir", required=True, help="Local directory with the extracted model")
+    parser.add_argument("--sample", required=True, help="Sample input data, .npy or .csv")
+    parser.add_argument("--content-type", default="text/csv")
+    parser.add_argument("--accept", default=None)
+    parser.add_argument("--max-rows", type=int, default=100000, help="Rows read from the sample file")
+    parser.add_argument("--batch-sizes", type=_parse_int_list, default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--workers", type=_parse_int_list,
+                        default=sorted({1, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}))
+    parser.add_argument("--min-records", type=int, default=10000)
+    parser.add_argument("--output", default=None, help="Write the results and recommendation as JSON")
+    parser.add_argument("--write-patch", default=None, help="Write the recommendation as a conf.yaml patch")
+    parser.add_argument("--model-name", default=None, help="Model name of the patch")
+    args = parser.parse_args()
+
+    profiler = TransformProfiler(
+        handler_spec=args.handler,
+        model_dir=args.model_dir,
+        sample=load_sample(args.sample, args.max_rows),
+        content_type=args.content_type,
+        accept=args.accept,
+    )
+    results = profiler.sweep(args.batch_sizes, args.workers, min_records=args.min_records)
+    recommendation = profiler.recommend(results)
+
+    print(format_results(results))
+    print(json.dumps({k: v for k, v in recommendation.items() if not k.startswith("_")}, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "recommendation": recommendation}, f, indent=2)
+
+    if args.write_patch:
+        if not args.model_name:
+            raise ValueError("--model-name is required with --write-patch")
+        write_recommendation(args.write_patch, args.model_name, recommendation)
+        profiler.logger.log_info(f"Transform recommendation written to {args.write_patch}")
+
+
+if __name__ == "__main__":
+    main()
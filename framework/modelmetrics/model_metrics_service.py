@@ -21,7 +21,7 @@ import os
 # Import Third-party libraries
 import boto3
 import sagemaker
-from pipeline.helper import get_chain_input_file
+from pipeline.helper import get_chain_input_file, look_up_step_type_from_step_name
 from sagemaker.network import NetworkConfig
 from sagemaker.processing import (
     FrameworkProcessor,
@@ -30,19 +30,32 @@ from sagemaker.processing import (
     RunArgs,
 )
 from sagemaker.workflow.pipeline_context import PipelineSession
+from sagemaker.workflow.steps import ProcessingStep
 # Import Custom libraries
 from utilities.logger import Logger
+from utilities.packaging import stage_files
+from utilities.sizing import SizingService
+from utilities.tracing import trace_methods
 
 ########################################################################################
 ### If the Logger class implememntation required file handler                        ###
 ### self.logger = Logger(_conf)                                                      ###
 ########################################################################################
 
+STREAMING_METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streaming_metrics")
+# Partial metric states of the shards of a sharded Metrics step
+METRIC_STATES_OUTPUT_NAME = "metric_states"
+METRIC_STATES_SOURCE = "/opt/ml/processing/output/metric_states"
+METRIC_STATES_DESTINATION = "/opt/ml/processing/input/metric_states"
+# Step types whose outputs hold one prediction file per input file
+PREDICTION_STEP_TYPES = ["transform", "processing_transform"]
+
 session = boto3.session.Session()
 region_name = session.region_name
 client_sagemaker_obj = boto3.client("sagemaker", region_name=region_name)
 
 
+@trace_methods
 class ModelMetricsService:
     """
     Create an Evaluate function to generate the model metrcis
@@ -111,10 +124,30 @@ class ModelMetricsService:
             env=conf.get("env", None),
         )
 
-        self.logger.log_info("Arguments Instantiates", f"Args: {args}")
+        static_input_uris = []
+        if isinstance(conf.get("channels", {}), dict):
+            static_input_uris = [self._get_static_input_source(file) for file in self._get_static_input_list()]
+        args = SizingService(self.config, self.model_name, "evaluate").size(
+            args,
+            static_input_uris,
+            sharded=args["s3_data_distribution_type"] == "ShardedByS3Key",
+        )
+
+        self.logger.log_info("Arguments Instantiates", lambda: f"Args: {args}")
 
         return args
 
+    def is_sharded(self) -> bool:
+        """
+        Method to check whether the metrics are computed by several instances, each on a
+        shard of the predictions, and merged by a single instance job
+
+        Returns:
+        ----------
+        - True when the evaluate instance_count is greater than 1
+        """
+        return self._sagemaker_args().get("instance_count") > 1
+
     def _get_static_input_list(self) -> list:
         """
         Method to retreive SageMaker static inputs
@@ -131,6 +164,21 @@ class ModelMetricsService:
             conf.get(f"channels.{channel}.dataFiles", [])[0])
         return input_files_list
 
+    def _get_static_input_source(self, file: dict) -> str:
+        """
+        Method to resolve a dataFiles entry into its S3 source
+
+        Returns:
+        ----------
+        - S3 URI of the input
+        """
+        if file.get("fileName").startswith("s3://"):
+            return file.get("fileName")
+        conf = self.config.get(f"models.{self.model_name}.evaluate")
+        bucket = conf.get("channels.train.s3Bucket")
+        input_prefix = conf.get("channels.train.s3InputPrefix", "")
+        return os.path.join(bucket, input_prefix, file.get("fileName"))
+
     def _get_static_input(self, input_local_filepath):
         """
         Method to retreive SageMaker static inputs
@@ -149,16 +197,9 @@ class ModelMetricsService:
             if len(input_files_list) >= 7:
                 raise Exception("Static inputs for metrics should not exceed 7")
             for file in input_files_list:
-                if file.get("fileName").startswith("s3://"):
-                    _source = file.get("fileName")
-                else:
-                    bucket = conf.get("channels.train.s3Bucket")
-                    input_prefix = conf.get("channels.train.s3InputPrefix", "")
-                    _source = os.path.join(bucket, input_prefix, file.get("fileName"))
-
                 temp = ProcessingInput(
                     input_name=file.get("sourceName", ""),
-                    source=_source,
+                    source=self._get_static_input_source(file),
                     destination=os.path.join(input_local_filepath, file.get("sourceName", "")),
                     s3_data_distribution_type=conf.get("s3_data_distribution_type", "FullyReplicated"),
                 )
@@ -176,6 +217,7 @@ class ModelMetricsService:
         """
         dynamic_inputs = []
         chain_input_source_step = self.step_config.get("chain_input_source_step", [])
+        sharded = self.is_sharded()
 
         channels_conf = self.config.get(f"models.{self.model_name}.evaluate.channels", "train")
         if isinstance(channels_conf, str):
@@ -194,10 +236,14 @@ class ModelMetricsService:
                 source_output_name=channel_name,
             )
 
+            # predictions are split between the instances, the other inputs are replicated
+            source_step_type = look_up_step_type_from_step_name(source_step_name=source_step_name, config=self.config)
             temp = ProcessingInput(
                 input_name=f"{source_step_name}-input",
                 source=chain_input_path,
                 destination=os.path.join(input_local_filepath, f"{source_step_name}-{channel_name}"),
+                s3_data_distribution_type="ShardedByS3Key"
+                if sharded and source_step_type in PREDICTION_STEP_TYPES else "FullyReplicated",
             )
             dynamic_inputs.append(temp)
 
@@ -239,6 +285,24 @@ class ModelMetricsService:
         # Replace entry point path leverage python -m for local dependencies
         entrypoint_command = args.get("entry_point").replace("/", ".").replace(".py", "")
 
+        env = args.get("env")
+        outputs = [
+            ProcessingOutput(
+                source=output_source,
+                destination=output_destination,
+                output_name="model_evaluation_metrics",
+            ),
+        ]
+        if self.is_sharded():
+            # every shard writes its partial metric state, merged by merge_model_metrics
+            env = dict(env or {}, SMP_METRICS_MODE="shard", SMP_METRICS_STATE_DIR=METRIC_STATES_SOURCE)
+            outputs = [
+                ProcessingOutput(
+                    source=METRIC_STATES_SOURCE,
+                    output_name=METRIC_STATES_OUTPUT_NAME,
+                ),
+            ]
+
         # Create SageMaker Processor Instance
         processor = FrameworkProcessor(
             image_uri=args.get("image_uri"),
@@ -254,25 +318,21 @@ class ModelMetricsService:
             max_runtime_in_seconds=args.get("max_runtime_in_seconds"),
             base_job_name=args.get("base_job_name"),
             sagemaker_session=self._get_pipeline_session(),
-            env=args.get("env"),
+            env=env,
             tags=args.get("tags"),
             network_config=NetworkConfig(**sagemakernetworkconfig),
         )
 
         generate_model_metrics_args = processor.run(
             inputs=self._get_processing_inputs(input_destination),
-            outputs=[
-                ProcessingOutput(
-                    source=output_source,
-                    destination=output_destination,
-                    output_name="model_evaluation_metrics",
-                ),
-            ],
+            outputs=outputs,
             source_dir=self.config.get(
                 f"models.{self.model_name}.source_directory",
                 os.getenv("SMP_SOURCE_DIR_PATH")
             ),
             code=args.get("entry_point"),
+            # streaming evaluation library importable by the entry point
+            dependencies=[STREAMING_METRICS_PATH],
             wait=True,
             logs=True,
             job_name=args.get("base_job_name"),
@@ -280,12 +340,14 @@ class ModelMetricsService:
 
         return generate_model_metrics_args
 
-    def calculate_model_metrics(self) -> RunArgs:
-        """
-        Method to calculate models metrics
+    def _get_output_locations(self) -> tuple:
         """
+        Method to retreive the input destination, output source and output destination of the evaluate step
 
-        self.logger.log_info(f"{'-' * 40} {self.model_name} {'-' * 40}")
+        Returns:
+        ----------
+        - Tuple of the processing input destination, output source and output destination
+        """
         evaluate_data = self.config.get(f"models.{self.model_name}.evaluate")
         if isinstance(evaluate_data.get("channels", "train"), dict):
             evaluate_channels = list(evaluate_data.get("channels").keys())
@@ -316,6 +378,20 @@ class ModelMetricsService:
             processing_output_source = "/opt/ml/processing/output/"
             processing_output_destination = None
 
+        return processing_input_destination, processing_output_source, processing_output_destination
+
+    def calculate_model_metrics(self) -> RunArgs:
+        """
+        Method to calculate models metrics, or the partial metric states of a sharded Metrics step
+        """
+
+        self.logger.log_info(f"{'-' * 40} {self.model_name} {'-' * 40}")
+        (
+            processing_input_destination,
+            processing_output_source,
+            processing_output_destination,
+        ) = self._get_output_locations()
+
         generate_model_metrics_args = self._generate_model_metrics(
             input_destination=processing_input_destination,
             output_source=processing_output_source,
@@ -325,3 +401,87 @@ class ModelMetricsService:
         self.logger.log_info(f" Model evaluate completed.")
 
         return generate_model_metrics_args
+
+    def _stage_merge_source_directory(self) -> str:
+        """
+        Method to stage the source directory of the merge job, holding only the streaming evaluation library.
+        The library is staged at a path named after its content, so that the merge step definition, and
+        thus its cache key, is stable across compiles
+
+        Returns:
+        ----------
+        - Staging directory path
+        """
+        library_files = [
+            os.path.join("streaming_metrics", file_name)
+            for file_name in sorted(os.listdir(STREAMING_METRICS_PATH)) if file_name.endswith(".py")
+        ]
+        return stage_files(os.path.dirname(STREAMING_METRICS_PATH), library_files, prefix="smp-metrics-merge-")
+
+    def merge_model_metrics(self, shard_step: ProcessingStep) -> RunArgs:
+        """
+        Method to merge the partial metric states of a sharded Metrics step into the
+        model_evaluation_metrics.json report, on a single instance
+
+        Args:
+        ----------
+        - shard_step (ProcessingStep): The step computing the partial metric states
+
+        Returns:
+        ----------
+        - SageMaker Processing run args
+        """
+        args = self._sagemaker_args()
+        _, processing_output_source, processing_output_destination = self._get_output_locations()
+
+        processor = FrameworkProcessor(
+            image_uri=args.get("image_uri"),
+            estimator_cls=sagemaker.sklearn.estimator.SKLearn,  # ignore bc of image_uri
+            framework_version=None,
+            role=args.get("role"),
+            command=["python", "-m", "streaming_metrics.merge"],
+            instance_count=1,
+            instance_type=self.config.get(
+                f"models.{self.model_name}.evaluate.merge_instance_type", args.get("instance_type")
+            ),
+            volume_size_in_gb=30,
+            volume_kms_key=args.get("kms_key"),
+            output_kms_key=args.get("kms_key"),
+            max_runtime_in_seconds=args.get("max_runtime_in_seconds"),
+            base_job_name=f"{args.get('base_job_name')}-merge",
+            sagemaker_session=self._get_pipeline_session(),
+            env=dict(
+                SMP_METRICS_STATE_DIR=METRIC_STATES_DESTINATION,
+                SMP_METRICS_OUTPUT_DIR=processing_output_source,
+            ),
+            tags=args.get("tags"),
+            network_config=NetworkConfig(**self._get_network_config()),
+        )
+
+        merge_model_metrics_args = processor.run(
+            inputs=[
+                ProcessingInput(
+                    input_name=METRIC_STATES_OUTPUT_NAME,
+                    source=shard_step.properties.ProcessingOutputConfig.Outputs[
+                        METRIC_STATES_OUTPUT_NAME
+                    ].S3Output.S3Uri,
+                    destination=METRIC_STATES_DESTINATION,
+                ),
+            ],
+            outputs=[
+                ProcessingOutput(
+                    source=processing_output_source,
+                    destination=processing_output_destination,
+                    output_name="model_evaluation_metrics",
+                ),
+            ],
+            source_dir=self._stage_merge_source_directory(),
+            code="streaming_metrics/merge.py",
+            wait=True,
+            logs=True,
+            job_name=f"{args.get('base_job_name')}-merge",
+        )
+
+        self.logger.log_info(f" Model metrics merge of {shard_step.name} created.")
+
+        return merge_model_metrics_args
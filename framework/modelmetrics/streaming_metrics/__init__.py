@@ -0,0 +1,43 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Streaming evaluation library for Metrics step entry points. It only depends on numpy,
+# and is shipped next to the entry point by ModelMetricsService.
+
+from .readers import (
+    iter_aligned_chunks,
+    iter_chunks,
+    iter_file_chunks,
+)
+from .report import (
+    build_report,
+    write_report,
+)
+from .sharding import (
+    finalize,
+    get_shard_seed,
+    is_shard_mode,
+    merge_states,
+    read_states,
+    write_state,
+)
+from .states import (
+    BinaryClassificationState,
+    RegressionState,
+    histogram_auc,
+    state_from_dict,
+)
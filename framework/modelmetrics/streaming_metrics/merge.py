@@ -0,0 +1,42 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Entry point of the merge job of sharded Metrics steps: python -m streaming_metrics.merge
+
+import json
+import os
+
+from .report import DEFAULT_OUTPUT_DIR, build_report, write_report
+from .sharding import STATE_DIR_ENV, merge_states, read_states
+
+OUTPUT_DIR_ENV = "SMP_METRICS_OUTPUT_DIR"
+DEFAULT_MERGE_STATE_DIR = "/opt/ml/processing/input/metric_states"
+
+
+def main() -> None:
+    state_dir = os.environ.get(STATE_DIR_ENV, DEFAULT_MERGE_STATE_DIR)
+    output_dir = os.environ.get(OUTPUT_DIR_ENV, DEFAULT_OUTPUT_DIR)
+
+    states = read_states(state_dir)
+    print(f"Merging {len(states)} partial metric state(s) from {state_dir}")
+    report = build_report(merge_states(states))
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {write_report(report, output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Chunked readers of transform outputs and label files
+
+import json
+from typing import Iterator
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY"
+# Arrow IPC streams start with a continuation marker
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+DEFAULT_CHUNK_ROWS = 100_000
+TEXT_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def iter_npy_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """
+    Memory-map the .npy buffers of a file and yield them in chunks of rows.
+    Transform outputs of several requests are concatenated .npy buffers, read one after the other.
+    Column-major (fortran_order) buffers are read row by row like the others.
+    """
+    with open(path, "rb") as f:
+        file_size = f.seek(0, 2)
+        offset = 0
+        while offset < file_size:
+            f.seek(offset)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            rows = shape[0] if shape else 1
+            count = int(np.prod(shape))
+            if fortran_order and len(shape) > 1:
+                # column-major buffers are mapped as the transposed C array
+                array = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape[::-1]).T
+            else:
+                array = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=(count,))
+            array = array.reshape(rows, -1) if rows else array.reshape(0)
+            for start in range(0, rows, chunk_rows):
+                yield np.asarray(array[start:start + chunk_rows]).reshape(min(chunk_rows, rows - start), -1)
+            offset = f.tell() + count * dtype.itemsize
+
+
+def iter_arrow_chunks(path: str, column: str = "prediction") -> Iterator[np.ndarray]:
+    """
+    Yield a column of an Arrow IPC stream file, one record batch at a time. Requires pyarrow.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        for batch in pa.ipc.open_stream(source):
+            yield batch.column(batch.schema.get_field_index(column)).to_numpy(zero_copy_only=False)
+
+
+def iter_json_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """
+    Yield the "predictions" or "outputs" of a TensorFlow Serving style JSON response file, or of
+    a file of JSON lines, in chunks of rows.
+    """
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        responses = [json.loads(text)]
+    except json.JSONDecodeError:
+        responses = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for response in responses:
+        if isinstance(response, dict):
+            response = response["outputs"] if "outputs" in response else response["predictions"]
+        array = np.asarray(response, dtype=np.float64)
+        array = array.reshape(len(array), -1) if array.ndim else array.reshape(1, 1)
+        for start in range(0, len(array), chunk_rows):
+            yield array[start:start + chunk_rows]
+
+
+def iter_text_chunks(path: str, block_bytes: int = TEXT_BLOCK_BYTES) -> Iterator[np.ndarray]:
+    """
+    Yield the numbers of a text file, e.g. "[0.1, 0.7]" lists or one value per line CSV,
+    parsing one block of the file at a time.
+    """
+    remainder = ""
+    with open(path, "r") as f:
+        while True:
+            block = f.read(block_bytes)
+            text = remainder + block.replace("[", " ").replace("]", ",").replace("\n", ",")
+            if block:
+                # the last token may continue in the next block
+                cut = text.rfind(",")
+                text, remainder = (text[:cut], text[cut + 1:]) if cut >= 0 else ("", text)
+            else:
+                remainder = ""
+            text = ",".join(token for token in text.split(",") if token.strip())
+            if text:
+                yield np.fromstring(text, sep=",").reshape(-1, 1)
+            if not block:
+                break
+
+
+def iter_file_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """
+    Yield the rows of a prediction or label file in chunks, detecting its format from its first bytes:
+    .npy buffers, Arrow IPC stream, JSON response or text.
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(NPY_MAGIC)).lstrip()
+    if head.startswith(NPY_MAGIC):
+        return iter_npy_chunks(path, chunk_rows)
+    if head.startswith(ARROW_STREAM_MAGIC):
+        return iter_arrow_chunks(path)
+    if head.startswith(b"{"):
+        return iter_json_chunks(path, chunk_rows)
+    return iter_text_chunks(path)
+
+
+def iter_chunks(paths: list, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """
+    Yield the rows of several files, in order, in chunks of exactly chunk_rows rows (the last may be shorter).
+    """
+    pending = []
+    pending_rows = 0
+    for path in paths:
+        for chunk in iter_file_chunks(path, chunk_rows):
+            pending.append(chunk)
+            pending_rows += len(chunk)
+            while pending_rows >= chunk_rows:
+                merged = pending[0] if len(pending) == 1 else np.concatenate(
+                    [part.reshape(len(part), -1) for part in pending])
+                yield merged[:chunk_rows]
+                pending = [merged[chunk_rows:]] if len(merged) > chunk_rows else []
+                pending_rows -= chunk_rows
+    if pending_rows:
+        yield pending[0] if len(pending) == 1 else np.concatenate([part.reshape(len(part), -1) for part in pending])
+
+
+def iter_aligned_chunks(
+        label_paths: list,
+        prediction_paths: list,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[tuple]:
+    """
+    Yield (labels, predictions) chunks with the same number of rows.
+
+    Raises:
+        ValueError: when the files don't hold the same number of rows.
+    """
+    labels = iter_chunks(label_paths, chunk_rows)
+    predictions = iter_chunks(prediction_paths, chunk_rows)
+    while True:
+        label_chunk = next(labels, None)
+        prediction_chunk = next(predictions, None)
+        if label_chunk is None and prediction_chunk is None:
+            return
+        if label_chunk is None or prediction_chunk is None or len(label_chunk) != len(prediction_chunk):
+            raise ValueError("Labels and predictions don't have the same number of rows.")
+        yield label_chunk, prediction_chunk
@@ -0,0 +1,67 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Model quality report written by Metrics step entry points
+
+import json
+import math
+import os
+import pathlib
+
+from .states import BinaryClassificationState, RegressionState
+
+REPORT_FILE_NAME = "model_evaluation_metrics.json"
+DEFAULT_OUTPUT_DIR = "/opt/ml/processing/output"
+# Sections of the SageMaker model quality metrics format
+REPORT_SECTIONS = {
+    BinaryClassificationState: "binary_classification_metrics",
+    RegressionState: "regression_metrics",
+}
+
+
+def _to_json_value(value):
+    """
+    NaN and infinite values are written as "NaN" strings, as JSON has no NaN.
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        return "NaN"
+    if isinstance(value, dict):
+        return {key: _to_json_value(item) for key, item in value.items()}
+    return value
+
+
+def build_report(state) -> dict:
+    """
+    Build the model quality report of a metric state, in the SageMaker model quality format
+    registered as model statistics by RegisterModelService, e.g.
+    {"regression_metrics": {"mse": {"value": 0.5, "standard_deviation": 0.01}}}.
+    """
+    return {REPORT_SECTIONS[type(state)]: _to_json_value(state.result())}
+
+
+def write_report(report: dict, output_dir: str = DEFAULT_OUTPUT_DIR, file_name: str = REPORT_FILE_NAME) -> str:
+    """
+    Write a report in the Metrics step output directory.
+
+    Returns:
+        The report path.
+    """
+    pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+    report_path = os.path.join(output_dir, file_name)
+    with open(report_path, "w") as f:
+        json.dump(report, f)
+    return report_path
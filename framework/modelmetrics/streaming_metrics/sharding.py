@@ -0,0 +1,121 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Partial metric states of sharded Metrics steps.
+#
+# With instance_count > 1, ModelMetricsService runs the entry point on every instance with
+# SMP_METRICS_MODE=shard, and a merge job reads the partial states to write the report.
+
+import glob
+import json
+import os
+import socket
+from typing import Union
+
+from .report import DEFAULT_OUTPUT_DIR, build_report, write_report
+from .states import state_from_dict
+
+MODE_ENV = "SMP_METRICS_MODE"
+STATE_DIR_ENV = "SMP_METRICS_STATE_DIR"
+SHARD_MODE = "shard"
+DEFAULT_STATE_DIR = "/opt/ml/processing/output/metric_states"
+RESOURCE_CONFIG_PATH = "/opt/ml/config/resourceconfig.json"
+
+
+def is_shard_mode() -> bool:
+    return os.environ.get(MODE_ENV) == SHARD_MODE
+
+
+def _resource_config() -> dict:
+    if os.path.isfile(RESOURCE_CONFIG_PATH):
+        with open(RESOURCE_CONFIG_PATH, "r") as f:
+            return json.load(f)
+    return dict(current_host=socket.gethostname(), hosts=[socket.gethostname()])
+
+
+def get_shard_seed() -> int:
+    """
+    Bootstrap seed of the current instance, so that shards draw independent bootstrap weights.
+    """
+    if not is_shard_mode():
+        return 0
+    resource_config = _resource_config()
+    hosts = sorted(resource_config.get("hosts", []))
+    current_host = resource_config.get("current_host")
+    return hosts.index(current_host) + 1 if current_host in hosts else abs(hash(current_host)) % (2 ** 31)
+
+
+def write_state(state, state_dir: str = None) -> str:
+    """
+    Write the partial state of the current instance.
+
+    Returns:
+        The state file path.
+    """
+    state_dir = state_dir or os.environ.get(STATE_DIR_ENV, DEFAULT_STATE_DIR)
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = os.path.join(state_dir, f"state-{_resource_config().get('current_host')}.json")
+    with open(state_path, "w") as f:
+        json.dump(state.to_dict(), f)
+    return state_path
+
+
+def read_states(state_dir: str) -> list:
+    """
+    Read the partial states written by write_state, in any sub-directory of state_dir.
+    """
+    states = []
+    for state_path in sorted(glob.glob(os.path.join(state_dir, "**", "state-*.json"), recursive=True)):
+        with open(state_path, "r") as f:
+            states.append(state_from_dict(json.load(f)))
+    return states
+
+
+def merge_states(states: list):
+    """
+    Merge partial states of the same type into the first one.
+    """
+    if not states:
+        raise ValueError("No metric state to merge.")
+    merged = states[0]
+    for state in states[1:]:
+        if type(state) is not type(merged):
+            raise ValueError(f"Can't merge {type(state).__name__} into {type(merged).__name__}.")
+        merged.merge(state)
+    return merged
+
+
+def finalize(state, output_dir: str = DEFAULT_OUTPUT_DIR, extra_report: dict = None) -> Union[dict, None]:
+    """
+    End a Metrics step entry point: write the partial state on a shard of a sharded Metrics
+    step, or the model_evaluation_metrics.json report otherwise.
+
+    Args:
+        state: The metric state.
+        output_dir (str): The report output directory.
+        extra_report (dict): Additional report sections, only written by single instance steps.
+
+    Returns:
+        The report, or None on a shard.
+    """
+    if is_shard_mode():
+        print(f"Partial metric state written to {write_state(state)}")
+        return None
+    report = build_report(state)
+    report.update(extra_report or {})
+    write_report(report, output_dir)
+    return report
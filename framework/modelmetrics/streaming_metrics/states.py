@@ -0,0 +1,423 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Mergeable metric states updated chunk by chunk.
+#
+# Standard deviations are estimated with a Poisson bootstrap: every row gets an independent
+# Poisson(1) weight per replicate, so chunks and shards can be bootstrapped separately and
+# their replicate statistics summed, which an in-memory resampling can't do.
+
+import base64
+import zlib
+
+import numpy as np
+
+# Rows x replicates processed at once by the bootstrap, bounds its memory use
+BOOTSTRAP_BLOCK_SIZE = 4_000_000
+
+
+def _bootstrap_weights(rng: np.random.Generator, replicates: int, rows: int):
+    """
+    Yield (replicate slice, Poisson(1) weights of shape replicates x rows) blocks.
+    """
+    block = max(1, BOOTSTRAP_BLOCK_SIZE // max(rows, 1))
+    for start in range(0, replicates, block):
+        stop = min(start + block, replicates)
+        yield slice(start, stop), rng.poisson(1.0, size=(stop - start, rows)).astype(np.float64)
+
+
+def _encode_array(values: np.ndarray) -> str:
+    """
+    Serialize an array as base64 of its compressed float64 bytes, the bootstrap histograms
+    would take megabytes as a JSON list.
+    """
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(values, dtype="<f8").tobytes())).decode("ascii")
+
+
+def _decode_array(encoded: str, shape: tuple) -> np.ndarray:
+    """
+    Deserialize an array written by _encode_array.
+    """
+    return np.frombuffer(zlib.decompress(base64.b64decode(encoded)), dtype="<f8").astype(np.float64).reshape(shape)
+
+
+def _std(values: np.ndarray) -> float:
+    values = values[np.isfinite(values)]
+    return float(np.std(values, ddof=1)) if len(values) > 1 else float("nan")
+
+
+def _divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def histogram_auc(positive_histogram: np.ndarray, negative_histogram: np.ndarray) -> np.ndarray:
+    """
+    Area under the ROC curve from score histograms of the positive and negative rows.
+
+    Pairs falling in the same bin count as ties (one half), so the error is bounded by half
+    the fraction of positive and negative pairs sharing a bin.
+
+    Args:
+        positive_histogram (np.ndarray): Counts of positive rows per ascending score bin, (..., bins).
+        negative_histogram (np.ndarray): Counts of negative rows per ascending score bin, (..., bins).
+
+    Returns:
+        The AUC, with the leading dimensions of the histograms.
+    """
+    negatives_below = np.cumsum(negative_histogram, axis=-1) - negative_histogram
+    concordant = np.sum(positive_histogram * (negatives_below + 0.5 * negative_histogram), axis=-1)
+    return _divide(concordant, positive_histogram.sum(axis=-1) * negative_histogram.sum(axis=-1))
+
+
+class BinaryClassificationState:
+    """
+    Mergeable state of binary classification metrics: accuracy, precision, recall, f1 and AUC.
+
+    Scores are bucketed in a fixed histogram over score_range for the AUC, and compared with
+    threshold for the confusion matrix metrics.
+
+    Attributes:
+    ----------
+    - bins: int
+        - Number of score histogram bins, the AUC error is bounded by the pairs sharing a bin
+    - threshold: float
+        - Score above or equal to which a row is predicted positive
+    - score_range: tuple
+        - Range of the scores, values outside are clipped
+    - bootstrap_replicates: int
+        - Number of Poisson bootstrap replicates, 0 disables standard deviations
+    - seed: int
+        - Seed of the bootstrap weights, use a different seed per shard
+    """
+
+    def __init__(
+            self,
+            bins: int = 1000,
+            threshold: float = 0.5,
+            score_range: tuple = (0.0, 1.0),
+            bootstrap_replicates: int = 100,
+            seed: int = 0,
+    ):
+        self.bins = int(bins)
+        self.threshold = float(threshold)
+        self.score_range = (float(score_range[0]), float(score_range[1]))
+        self.bootstrap_replicates = int(bootstrap_replicates)
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self.positive_histogram = np.zeros(self.bins)
+        self.negative_histogram = np.zeros(self.bins)
+        self.confusion = np.zeros(4)  # tp, fp, tn, fn
+        self.bootstrap_histograms = np.zeros((self.bootstrap_replicates, 2, self.bins))
+        self.bootstrap_confusion = np.zeros((self.bootstrap_replicates, 4))
+
+    def _bin(self, y_score: np.ndarray) -> np.ndarray:
+        low, high = self.score_range
+        scaled = (np.clip(y_score, low, high) - low) / (high - low) * self.bins
+        return np.minimum(scaled.astype(np.int64), self.bins - 1)
+
+    def update(self, y_true, y_score) -> "BinaryClassificationState":
+        """
+        Add a chunk of labels (0 or 1) and scores.
+        """
+        y_true = np.asarray(y_true).reshape(-1) > 0.5
+        y_score = np.asarray(y_score, dtype=np.float64).reshape(-1)
+        if len(y_true) != len(y_score):
+            raise ValueError(f"{len(y_true)} labels for {len(y_score)} scores.")
+        if len(y_true) == 0:
+            return self
+
+        bins = self._bin(y_score)
+        self.positive_histogram += np.bincount(bins[y_true], minlength=self.bins)
+        self.negative_histogram += np.bincount(bins[~y_true], minlength=self.bins)
+        y_pred = y_score >= self.threshold
+        # one column per confusion cell: tp, fp, tn, fn
+        cells = np.stack([y_pred & y_true, y_pred & ~y_true, ~y_pred & ~y_true, ~y_pred & y_true], axis=1)
+        self.confusion += cells.sum(axis=0)
+
+        for replicates, weights in _bootstrap_weights(self._rng, self.bootstrap_replicates, len(y_true)):
+            self.bootstrap_confusion[replicates] += weights @ cells
+            number_of_replicates = weights.shape[0]
+            # one histogram per replicate and class, filled by a single weighted bincount
+            offsets = (np.arange(number_of_replicates)[:, None] * 2 + (~y_true)[None, :]) * self.bins
+            self.bootstrap_histograms[replicates] += np.bincount(
+                (offsets + bins[None, :]).ravel(),
+                weights=weights.ravel(),
+                minlength=number_of_replicates * 2 * self.bins,
+            ).reshape(number_of_replicates, 2, self.bins)
+        return self
+
+    def merge(self, other: "BinaryClassificationState") -> "BinaryClassificationState":
+        """
+        Add the state of another chunk or shard, computed with the same bins and replicates.
+        """
+        if (self.bins, self.score_range, self.bootstrap_replicates) != \
+                (other.bins, other.score_range, other.bootstrap_replicates):
+            raise ValueError("Only states with the same bins, score_range and bootstrap_replicates can be merged.")
+        self.positive_histogram += other.positive_histogram
+        self.negative_histogram += other.negative_histogram
+        self.confusion += other.confusion
+        self.bootstrap_histograms += other.bootstrap_histograms
+        self.bootstrap_confusion += other.bootstrap_confusion
+        return self
+
+    @staticmethod
+    def _confusion_metrics(confusion: np.ndarray) -> dict:
+        tp, fp, tn, fn = np.moveaxis(confusion, -1, 0)
+        precision = _divide(tp, tp + fp)
+        recall = _divide(tp, tp + fn)
+        return dict(
+            accuracy=_divide(tp + tn, tp + fp + tn + fn),
+            precision=precision,
+            recall=recall,
+            f1=_divide(2 * precision * recall, precision + recall),
+            true_positive_rate=recall,
+            false_positive_rate=_divide(fp, fp + tn),
+        )
+
+    def result(self) -> dict:
+        """
+        Compute the metrics.
+
+        Returns:
+            {metric: {"value": value, "standard_deviation": std}}, the standard deviation is
+            NaN when the bootstrap is disabled.
+        """
+        values = self._confusion_metrics(self.confusion)
+        values["auc"] = histogram_auc(self.positive_histogram, self.negative_histogram)
+        if self.bootstrap_replicates > 1:
+            replicates = self._confusion_metrics(self.bootstrap_confusion)
+            replicates["auc"] = histogram_auc(self.bootstrap_histograms[:, 0], self.bootstrap_histograms[:, 1])
+        else:
+            replicates = {}
+
+        metrics = {
+            name: dict(
+                value=float(value),
+                standard_deviation=_std(replicates[name]) if name in replicates else float("nan"),
+            )
+            for name, value in values.items()
+        }
+        tp, fp, tn, fn = self.confusion
+        metrics["confusion_matrix"] = {"0": {"0": int(tn), "1": int(fp)}, "1": {"0": int(fn), "1": int(tp)}}
+        return metrics
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the state, e.g. to merge the states of several processing instances.
+        """
+        return dict(
+            type=self.__class__.__name__,
+            bins=self.bins,
+            threshold=self.threshold,
+            score_range=list(self.score_range),
+            bootstrap_replicates=self.bootstrap_replicates,
+            seed=self.seed,
+            positive_histogram=_encode_array(self.positive_histogram),
+            negative_histogram=_encode_array(self.negative_histogram),
+            confusion=self.confusion.tolist(),
+            bootstrap_histograms=_encode_array(self.bootstrap_histograms),
+            bootstrap_confusion=_encode_array(self.bootstrap_confusion),
+        )
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "BinaryClassificationState":
+        instance = cls(
+            bins=state["bins"],
+            threshold=state["threshold"],
+            score_range=tuple(state["score_range"]),
+            bootstrap_replicates=state["bootstrap_replicates"],
+            seed=state["seed"],
+        )
+        instance.positive_histogram = _decode_array(state["positive_histogram"], (instance.bins,))
+        instance.negative_histogram = _decode_array(state["negative_histogram"], (instance.bins,))
+        instance.confusion = np.asarray(state["confusion"], dtype=np.float64)
+        instance.bootstrap_histograms = _decode_array(
+            state["bootstrap_histograms"], (instance.bootstrap_replicates, 2, instance.bins))
+        instance.bootstrap_confusion = _decode_array(
+            state["bootstrap_confusion"], (instance.bootstrap_replicates, 4))
+        return instance
+
+
+class RegressionState:
+    """
+    Mergeable state of regression metrics: mse, rmse, mae and r2.
+
+    The mean and variance of the squared errors and of the labels are accumulated with
+    Welford's algorithm, and merged with Chan's parallel formula. Without bootstrap, the
+    standard deviation of the mse is its standard error.
+
+    Attributes:
+    ----------
+    - bootstrap_replicates: int
+        - Number of Poisson bootstrap replicates, 0 disables the bootstrap
+    - seed: int
+        - Seed of the bootstrap weights, use a different seed per shard
+    """
+
+    def __init__(self, bootstrap_replicates: int = 100, seed: int = 0):
+        self.bootstrap_replicates = int(bootstrap_replicates)
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self.count = 0
+        self.squared_error_mean = 0.0
+        self.squared_error_m2 = 0.0
+        self.absolute_error_sum = 0.0
+        self.label_mean = 0.0
+        self.label_m2 = 0.0
+        # weight, squared error, absolute error, label and squared label sums per replicate
+        self.bootstrap_sums = np.zeros((self.bootstrap_replicates, 5))
+
+    @staticmethod
+    def _merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b) -> tuple:
+        count = count_a + count_b
+        if count == 0:
+            return 0.0, 0.0
+        delta = mean_b - mean_a
+        mean = mean_a + delta * count_b / count
+        m2 = m2_a + m2_b + delta * delta * count_a * count_b / count
+        return mean, m2
+
+    def update(self, y_true, y_pred) -> "RegressionState":
+        """
+        Add a chunk of labels and predictions.
+        """
+        y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
+        y_pred = np.asarray(y_pred, dtype=np.float64).reshape(-1)
+        if len(y_true) != len(y_pred):
+            raise ValueError(f"{len(y_true)} labels for {len(y_pred)} predictions.")
+        count = len(y_true)
+        if count == 0:
+            return self
+
+        error = y_pred - y_true
+        squared_error = error * error
+        # chunk moments, merged into the running moments
+        self.squared_error_mean, self.squared_error_m2 = self._merge_moments(
+            self.count, self.squared_error_mean, self.squared_error_m2,
+            count, squared_error.mean(), np.sum((squared_error - squared_error.mean()) ** 2),
+        )
+        self.label_mean, self.label_m2 = self._merge_moments(
+            self.count, self.label_mean, self.label_m2,
+            count, y_true.mean(), np.sum((y_true - y_true.mean()) ** 2),
+        )
+        self.absolute_error_sum += float(np.abs(error).sum())
+        self.count += count
+
+        columns = np.stack([np.ones(count), squared_error, np.abs(error), y_true, y_true * y_true], axis=1)
+        for replicates, weights in _bootstrap_weights(self._rng, self.bootstrap_replicates, count):
+            self.bootstrap_sums[replicates] += weights @ columns
+        return self
+
+    def merge(self, other: "RegressionState") -> "RegressionState":
+        """
+        Add the state of another chunk or shard, computed with the same number of replicates.
+        """
+        if self.bootstrap_replicates != other.bootstrap_replicates:
+            raise ValueError("Only states with the same bootstrap_replicates can be merged.")
+        self.squared_error_mean, self.squared_error_m2 = self._merge_moments(
+            self.count, self.squared_error_mean, self.squared_error_m2,
+            other.count, other.squared_error_mean, other.squared_error_m2,
+        )
+        self.label_mean, self.label_m2 = self._merge_moments(
+            self.count, self.label_mean, self.label_m2,
+            other.count, other.label_mean, other.label_m2,
+        )
+        self.absolute_error_sum += other.absolute_error_sum
+        self.count += other.count
+        self.bootstrap_sums += other.bootstrap_sums
+        return self
+
+    def result(self) -> dict:
+        """
+        Compute the metrics.
+
+        Returns:
+            {metric: {"value": value, "standard_deviation": std}}
+        """
+        if self.count == 0:
+            return {name: dict(value=float("nan"), standard_deviation=float("nan"))
+                    for name in ["mse", "rmse", "mae", "r2"]}
+        mse = self.squared_error_mean
+        values = dict(
+            mse=mse,
+            rmse=np.sqrt(mse),
+            mae=self.absolute_error_sum / self.count,
+            r2=float(1 - _divide(mse * self.count, self.label_m2)),
+        )
+
+        if self.bootstrap_replicates > 1:
+            weight, squared_error, absolute_error, label, squared_label = self.bootstrap_sums.T
+            replicate_mse = _divide(squared_error, weight)
+            replicates = dict(
+                mse=replicate_mse,
+                rmse=np.sqrt(replicate_mse),
+                mae=_divide(absolute_error, weight),
+                r2=1 - _divide(squared_error, squared_label - _divide(label * label, weight)),
+            )
+        else:
+            # standard error of the mean squared error
+            replicates = {}
+            standard_error = np.sqrt(self.squared_error_m2 / (self.count - 1) / self.count) \
+                if self.count > 1 else float("nan")
+
+        return {
+            name: dict(
+                value=float(value),
+                standard_deviation=_std(replicates[name]) if replicates
+                else (float(standard_error) if name == "mse" else float("nan")),
+            )
+            for name, value in values.items()
+        }
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the state, e.g. to merge the states of several processing instances.
+        """
+        return dict(
+            type=self.__class__.__name__,
+            bootstrap_replicates=self.bootstrap_replicates,
+            seed=self.seed,
+            count=self.count,
+            squared_error_mean=self.squared_error_mean,
+            squared_error_m2=self.squared_error_m2,
+            absolute_error_sum=self.absolute_error_sum,
+            label_mean=self.label_mean,
+            label_m2=self.label_m2,
+            bootstrap_sums=_encode_array(self.bootstrap_sums),
+        )
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RegressionState":
+        instance = cls(bootstrap_replicates=state["bootstrap_replicates"], seed=state["seed"])
+        for name in ["count", "squared_error_mean", "squared_error_m2", "absolute_error_sum",
+                     "label_mean", "label_m2"]:
+            setattr(instance, name, state[name])
+        instance.bootstrap_sums = _decode_array(state["bootstrap_sums"], (instance.bootstrap_replicates, 5))
+        return instance
+
+
+STATE_TYPES = {state_type.__name__: state_type for state_type in [BinaryClassificationState, RegressionState]}
+
+
+def state_from_dict(state: dict):
+    """
+    Deserialize a state written by to_dict, whatever its type.
+    """
+    return STATE_TYPES[state["type"]].from_dict(state)
@@ -0,0 +1,354 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Critical path analysis of pipeline executions: combines the compiled pipeline DAG with the
+# step durations recorded by the execution monitor.
+#
+# Usage, from the framework directory:
+#   python -m pipeline.critical_path --definition ../pipeline_definition.json \
+#       --reports pipeline_execution_report.json --dot critical_path.dot --svg critical_path.svg
+#   python -m pipeline.critical_path --definition ../pipeline_definition.json --history --pipeline <pipeline-name>
+
+# Import native libraries
+import argparse
+import json
+import re
+import shutil
+import statistics
+import subprocess
+from typing import Dict, List, Union
+
+# Import custom libraries
+from utilities.logger import Logger
+
+STEP_REFERENCE = re.compile(r'"Steps\.([^."\[\]]+)')
+DEFAULT_SPEEDUP = 2.0
+STATISTICS = ("median", "mean", "max", "p95", "last")
+
+
+def _get_step_references(arguments) -> set:
+    # implicit edges: properties of other steps used in the step arguments ({"Get": "Steps.<name>..."})
+    return set(STEP_REFERENCE.findall(json.dumps(arguments, default=str)))
+
+
+def load_dag(definition: dict) -> Dict[str, dict]:
+    """
+    Read the steps of a pipeline definition and their dependencies.
+
+    Dependencies are the DependsOn steps and the steps whose properties are used in the step
+    arguments. Steps of a Condition step branches depend on the Condition step.
+
+    Args:
+        definition (dict): The pipeline definition, as written by PipelineService.execute_pipeline.
+
+    Returns:
+        Dictionary of step name to dictionary with the step type and its dependencies.
+    """
+    dag = {}
+
+    def add_steps(steps: list, parents: set) -> None:
+        for step in steps:
+            arguments = step.get("Arguments", {})
+            if step["Type"] == "Condition":
+                references = _get_step_references(arguments.get("Conditions", []))
+            else:
+                references = _get_step_references(arguments)
+            depends_on = set(step.get("DependsOn") or []) | references | parents
+            dag[step["Name"]] = dict(type=step["Type"], depends_on=depends_on - {step["Name"]})
+            if step["Type"] == "Condition":
+                add_steps(arguments.get("IfSteps", []) + arguments.get("ElseSteps", []), {step["Name"]})
+
+    add_steps(definition.get("Steps", []), set())
+    for name, node in dag.items():
+        unknown = node["depends_on"] - set(dag)
+        if unknown:
+            raise Exception(f"Step {name} depends on unknown steps {sorted(unknown)}.")
+    return dag
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize(values: List[float], statistic: str = "median") -> float:
+    """
+    Summarize the recorded durations of a step, in chronological order.
+    """
+    if statistic == "median":
+        return statistics.median(values)
+    if statistic == "mean":
+        return statistics.fmean(values)
+    if statistic == "max":
+        return max(values)
+    if statistic == "p95":
+        return _percentile(values, 95)
+    if statistic == "last":
+        return values[-1]
+    raise Exception(f"Unsupported statistic {statistic}, use one of {STATISTICS}.")
+
+
+def get_step_durations(reports: List[dict], statistic: str = "median", include_cached: bool = False) -> Dict[str, float]:
+    """
+    Get the duration of each step from execution reports of the execution monitor.
+
+    Only succeeded steps are used. Cached steps are left out unless include_cached is True,
+    as they don't show the duration of the step when it runs.
+
+    Args:
+        reports (list): Execution reports, in chronological order.
+        statistic (str): How durations of several executions are combined, one of STATISTICS.
+        include_cached (bool): Whether durations of cached steps are used.
+
+    Returns:
+        Dictionary of step name to duration in seconds.
+    """
+    samples = {}
+    for report in reports:
+        for step in report.get("steps", []):
+            if step.get("status") != "Succeeded" or step.get("wall_seconds") is None:
+                continue
+            if step.get("cache_hit") and not include_cached:
+                continue
+            samples.setdefault(step["step_name"], []).append(float(step["wall_seconds"]))
+    return {name: round(summarize(values, statistic), 3) for name, values in samples.items()}
+
+
+def _topological_order(dag: Dict[str, dict]) -> List[str]:
+    order, state = [], {}
+
+    def visit(name: str, path: list) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise Exception(f"Pipeline steps have a cycle: {' >> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dependency in sorted(dag[name]["depends_on"]):
+            visit(dependency, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in sorted(dag):
+        visit(name, [])
+    return order
+
+
+def longest_path(dag: Dict[str, dict], durations: Dict[str, float], order: Union[List[str], None] = None) -> float:
+    """
+    Wall time of the pipeline with unlimited parallelism: the longest path of step durations.
+    """
+    finish = {}
+    for name in order or _topological_order(dag):
+        start = max((finish[dependency] for dependency in dag[name]["depends_on"]), default=0.0)
+        finish[name] = start + durations.get(name, 0.0)
+    return max(finish.values(), default=0.0)
+
+
+class CriticalPathAnalyzer:
+    """
+    Compute the critical path of a pipeline, the slack of every step and the expected wall time
+    savings of making each step faster.
+
+    Attributes:
+    ----------
+    - dag (dict): Step name to step type and dependencies, see load_dag
+    - durations (dict): Step name to duration in seconds, see get_step_durations
+    """
+
+    def __init__(self, dag: Dict[str, dict], durations: Dict[str, float]) -> "CriticalPathAnalyzer":
+        self.dag = dag
+        self.durations = {name: durations.get(name, 0.0) for name in dag}
+        self.missing = sorted(name for name in dag if name not in durations)
+        self.order = _topological_order(dag)
+        self.logger = Logger()
+        if self.missing:
+            self.logger.log_warning(f"No recorded duration for steps {self.missing}, counted as 0 s.")
+
+    def analyze(self, speedup: float = DEFAULT_SPEEDUP) -> dict:
+        """
+        Run the analysis.
+
+        Args:
+            speedup (float): Speedup factor of a step, e.g. 2 for a step running twice as fast,
+                or split between twice as many instances.
+
+        Returns:
+            Dictionary with the wall_seconds of the pipeline, the critical_path step names, and
+            per step duration, earliest and latest start, slack, and the savings_seconds of the
+            speedup and removed_savings_seconds of a step taking no time.
+        """
+        successors = {name: set() for name in self.dag}
+        for name, node in self.dag.items():
+            for dependency in node["depends_on"]:
+                successors[dependency].add(name)
+
+        earliest_start, earliest_finish = {}, {}
+        for name in self.order:
+            earliest_start[name] = max((earliest_finish[d] for d in self.dag[name]["depends_on"]), default=0.0)
+            earliest_finish[name] = earliest_start[name] + self.durations[name]
+        wall_seconds = max(earliest_finish.values(), default=0.0)
+
+        latest_start = {}
+        for name in reversed(self.order):
+            latest_finish = min((latest_start[s] for s in successors[name]), default=wall_seconds)
+            latest_start[name] = latest_finish - self.durations[name]
+
+        critical_path = []
+        current = max(self.order, key=lambda name: (earliest_finish[name], name)) if self.order else None
+        while current is not None:
+            critical_path.insert(0, current)
+            dependencies = [
+                d for d in self.dag[current]["depends_on"]
+                if abs(earliest_finish[d] - earliest_start[current]) < 1e-6
+            ]
+            current = max(dependencies, key=lambda d: (self.durations[d], d)) if dependencies else None
+
+        steps = []
+        for name in self.order:
+            faster = dict(self.durations, **{name: self.durations[name] / speedup})
+            removed = dict(self.durations, **{name: 0.0})
+            steps.append(dict(
+                step_name=name,
+                step_type=self.dag[name]["type"],
+                duration_seconds=round(self.durations[name], 3),
+                earliest_start_seconds=round(earliest_start[name], 3),
+                latest_start_seconds=round(latest_start[name], 3),
+                slack_seconds=round(max(latest_start[name] - earliest_start[name], 0.0), 3),
+                critical=name in critical_path,
+                savings_seconds=round(wall_seconds - longest_path(self.dag, faster, self.order), 3),
+                removed_savings_seconds=round(wall_seconds - longest_path(self.dag, removed, self.order), 3),
+                recorded=name not in self.missing,
+            ))
+        steps.sort(key=lambda step: (-step["savings_seconds"], -step["duration_seconds"], step["step_name"]))
+        return dict(wall_seconds=round(wall_seconds, 3), speedup=speedup, critical_path=critical_path, steps=steps)
+
+    def to_dot(self, analysis: dict) -> str:
+        """
+        Render the DAG in Graphviz DOT, annotated with durations and slack, and the critical path in red.
+        """
+        steps = {step["step_name"]: step for step in analysis["steps"]}
+        critical_path = analysis["critical_path"]
+        critical_edges = set(zip(critical_path, critical_path[1:]))
+        lines = [
+            "digraph pipeline {",
+            "    rankdir=LR;",
+            '    node [shape=box, style="rounded,filled", fillcolor=white, fontname=Helvetica];',
+            f'    label="wall time {analysis["wall_seconds"]} s, critical path in red";',
+        ]
+        for name in self.order:
+            step = steps[name]
+            label = f'{name}\\n{step["step_type"]}, {step["duration_seconds"]} s\\nslack {step["slack_seconds"]} s'
+            if step["critical"]:
+                label += f'\\n{analysis["speedup"]:g}x faster saves {step["savings_seconds"]} s'
+            color = 'color=red, fillcolor="#fde0dd", penwidth=2' if step["critical"] else "color=gray40"
+            lines.append(f'    "{name}" [label="{label}", {color}];')
+        for name in self.order:
+            for dependency in sorted(self.dag[name]["depends_on"]):
+                style = "color=red, penwidth=2" if (dependency, name) in critical_edges else "color=gray60"
+                lines.append(f'    "{dependency}" -> "{name}" [{style}];')
+        lines.append("}")
+        return "\n".join(lines)
+
+
+def format_report(analysis: dict) -> str:
+    """
+    Render an analysis as a console report.
+    """
+    lines = [
+        f"Pipeline wall time: {analysis['wall_seconds']} s",
+        f"Critical path: {' >> '.join(analysis['critical_path'])}",
+        f"{'step':<40} {'duration':>9} {'slack':>9} {'save ' + format(analysis['speedup'], 'g') + 'x':>9} "
+        f"{'save max':>9}  critical",
+    ]
+    for step in analysis["steps"]:
+        lines.append(
+            f"{step['step_name']:<40.40} {step['duration_seconds']:>9} {step['slack_seconds']:>9} "
+            f"{step['savings_seconds']:>9} {step['removed_savings_seconds']:>9}  "
+            f"{'yes' if step['critical'] else ''}{'' if step['recorded'] else ' (no duration)'}"
+        )
+    return "\n".join(lines)
+
+
+def render_svg(dot: str, svg_path: str) -> bool:
+    """
+    Render DOT as SVG with the Graphviz dot command, when it is installed.
+
+    Returns:
+        Whether the SVG file was written.
+    """
+    if not shutil.which("dot"):
+        Logger().log_warning("Graphviz dot command not found, SVG not rendered.")
+        return False
+    subprocess.run(["dot", "-Tsvg", "-o", svg_path], input=dot.encode("utf-8"), check=True)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical path and bottleneck report of pipeline executions")
+    parser.add_argument("--definition", required=True, help="Pipeline definition JSON")
+    parser.add_argument("--reports", nargs="+", default=[], help="Execution monitor reports, oldest first")
+    parser.add_argument("--history", nargs="?", const="", default=None,
+                        help="Read the executions recorded in the history database (default $SMP_HISTORY_DB)")
+    parser.add_argument("--pipeline", default=None, help="Pipeline name of the recorded executions")
+    parser.add_argument("--last", type=int, default=None, help="Number of recorded executions used")
+    parser.add_argument("--statistic", choices=STATISTICS, default="median")
+    parser.add_argument("--include-cached", action="store_true", help="Use durations of cached steps")
+    parser.add_argument("--speedup", type=float, default=DEFAULT_SPEEDUP)
+    parser.add_argument("--output", default=None, help="Write the analysis as JSON")
+    parser.add_argument("--dot", default=None, help="Write the annotated DAG as DOT")
+    parser.add_argument("--svg", default=None, help="Render the annotated DAG as SVG with Graphviz")
+    args = parser.parse_args()
+
+    with open(args.definition, "r") as f:
+        dag = load_dag(json.load(f))
+    reports = []
+    for report_path in args.reports:
+        with open(report_path, "r") as f:
+            reports.append(json.load(f))
+    if args.history is not None:
+        from pipeline.execution_history import ExecutionHistory
+
+        if not args.pipeline:
+            raise ValueError("--pipeline is required with --history")
+        history = ExecutionHistory(args.history or None)
+        reports += history.get_reports(args.pipeline, args.last)
+        history.close()
+    if not reports:
+        raise ValueError("No execution report, use --reports or --history")
+
+    analyzer = CriticalPathAnalyzer(dag, get_step_durations(reports, args.statistic, args.include_cached))
+    analysis = analyzer.analyze(args.speedup)
+    print(format_report(analysis))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(analysis, f, indent=2)
+    if args.dot or args.svg:
+        dot = analyzer.to_dot(analysis)
+        if args.dot:
+            with open(args.dot, "w") as f:
+                f.write(dot)
+        if args.svg:
+            render_svg(dot, args.svg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Local SQLite history of pipeline executions, for step duration trends, regression detection
+# and cost per run estimates.
+#
+# Usage, from the framework directory:
+#   python -m pipeline.execution_history import --reports pipeline_execution_report.json
+#   python -m pipeline.execution_history trends --pipeline <pipeline-name>
+#   python -m pipeline.execution_history regressions --pipeline <pipeline-name>
+#   python -m pipeline.execution_history cost --pipeline <pipeline-name>
+
+# Import native libraries
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+from datetime import datetime, timezone
+from typing import Dict, List, Union
+
+# Import custom libraries
+from pipeline.critical_path import summarize
+from pipeline.execution_monitor import TERMINAL_STATUSES, build_step_report, monitor_execution, to_datetime
+from utilities.logger import Logger
+
+HISTORY_DB_ENV = "SMP_HISTORY_DB"
+DEFAULT_HISTORY_DB = os.path.join("~", ".smp", "execution_history.sqlite")
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+DEFAULT_MIN_RUNS = 3
+
+# Approximate on-demand hourly prices in us-east-1, override them with a prices JSON file
+DEFAULT_HOURLY_PRICES = {
+    "ml.m5.large": 0.115, "ml.m5.xlarge": 0.23, "ml.m5.2xlarge": 0.461, "ml.m5.4xlarge": 0.922,
+    "ml.m5.12xlarge": 2.765, "ml.m5.24xlarge": 5.53,
+    "ml.c5.large": 0.102, "ml.c5.xlarge": 0.204, "ml.c5.2xlarge": 0.408, "ml.c5.4xlarge": 0.816,
+    "ml.c5.9xlarge": 1.836, "ml.c5.18xlarge": 3.672,
+    "ml.r5.large": 0.151, "ml.r5.xlarge": 0.302, "ml.r5.2xlarge": 0.605, "ml.r5.4xlarge": 1.21,
+    "ml.r5.12xlarge": 3.629, "ml.r5.24xlarge": 7.258,
+    "ml.g4dn.xlarge": 0.736, "ml.g4dn.2xlarge": 0.94, "ml.g4dn.4xlarge": 1.505, "ml.g4dn.8xlarge": 2.72,
+    "ml.g4dn.12xlarge": 4.89, "ml.g4dn.16xlarge": 5.44,
+    "ml.p3.2xlarge": 3.825, "ml.p3.8xlarge": 14.688, "ml.p3.16xlarge": 28.152,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    execution_arn TEXT PRIMARY KEY,
+    pipeline_name TEXT NOT NULL,
+    status TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    wall_seconds REAL,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    execution_arn TEXT NOT NULL REFERENCES executions (execution_arn),
+    pipeline_name TEXT NOT NULL,
+    step_name TEXT NOT NULL,
+    config_hash TEXT,
+    step_type TEXT,
+    status TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    wall_seconds REAL,
+    queue_seconds REAL,
+    execution_seconds REAL,
+    billable_seconds REAL,
+    cache_hit INTEGER,
+    instance_type TEXT,
+    instance_count INTEGER,
+    input_gb REAL,
+    failure_reason TEXT,
+    PRIMARY KEY (execution_arn, step_name)
+);
+CREATE INDEX IF NOT EXISTS steps_by_config ON steps (pipeline_name, step_name, config_hash);
+"""
+
+STEP_COLUMNS = [
+    "step_name", "config_hash", "step_type", "status", "start_time", "end_time", "wall_seconds", "queue_seconds",
+    "execution_seconds", "billable_seconds", "cache_hit", "instance_type", "instance_count", "input_gb",
+    "failure_reason",
+]
+
+
+def get_step_config_hashes(definition: dict) -> Dict[str, str]:
+    """
+    Hash the definition of every step of a pipeline definition, branch steps of Condition
+    steps included. Code changes are part of the hash, as uploaded code locations are named
+    after the code content.
+
+    Args:
+        definition (dict): The pipeline definition.
+
+    Returns:
+        Dictionary of step name to config hash.
+    """
+    hashes = {}
+
+    def add_steps(steps: list) -> None:
+        for step in steps:
+            step = dict(step)
+            if step["Type"] == "Condition":
+                arguments = dict(step.get("Arguments", {}))
+                branches = arguments.get("IfSteps", []) + arguments.get("ElseSteps", [])
+                arguments["IfSteps"] = [branch["Name"] for branch in arguments.get("IfSteps", [])]
+                arguments["ElseSteps"] = [branch["Name"] for branch in arguments.get("ElseSteps", [])]
+                step["Arguments"] = arguments
+                add_steps(branches)
+            content = json.dumps(step, sort_keys=True, default=str)
+            hashes[step["Name"]] = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+    add_steps(definition.get("Steps", []))
+    return hashes
+
+
+def get_history_db_path(path: Union[str, None] = None) -> str:
+    return os.path.expanduser(path or os.environ.get(HISTORY_DB_ENV) or DEFAULT_HISTORY_DB)
+
+
+def estimate_step_cost(step: dict, prices: dict) -> Union[float, None]:
+    """
+    Estimate the cost of a step run: billed seconds (or job execution seconds) times the
+    instance count and hourly price. BillableTimeInSeconds is wall-clock time, so it is
+    multiplied by the instance count too. Cached steps and steps without a job cost nothing.
+
+    Returns:
+        The cost, or None when the instance type has no price.
+    """
+    if step.get("cache_hit") or not step.get("instance_type"):
+        return 0.0
+    if step["instance_type"] not in prices:
+        return None
+    seconds = step.get("billable_seconds")
+    if seconds is None:
+        seconds = step.get("execution_seconds") or 0.0
+    return seconds * (step.get("instance_count") or 1) / 3600 * prices[step["instance_type"]]
+
+
+class ExecutionHistory:
+    """
+    SQLite store of pipeline execution reports, keyed by pipeline name, step name and the
+    hash of the step definition.
+
+    Attributes:
+    ----------
+    - db_path (str): SQLite database path, default SMP_HISTORY_DB or ~/.smp/execution_history.sqlite
+    """
+
+    def __init__(self, db_path: Union[str, None] = None) -> "ExecutionHistory":
+        self.db_path = get_history_db_path(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self.logger = Logger()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def record(self, report: dict) -> int:
+        """
+        Record an execution report of the execution monitor, replacing a previous record of
+        the same execution. Steps may carry config_hash and input_gb.
+
+        Returns:
+            The number of recorded steps.
+        """
+        if not report.get("pipeline_name") or not report.get("execution_arn"):
+            raise Exception("Execution reports need a pipeline_name and an execution_arn to be recorded.")
+        with self.connection:
+            self.connection.execute("DELETE FROM steps WHERE execution_arn = ?", (report["execution_arn"],))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report["execution_arn"], report["pipeline_name"], report.get("status"), report.get("start_time"),
+                    report.get("end_time"), report.get("wall_seconds"), datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            self.connection.executemany(
+                f"INSERT INTO steps (execution_arn, pipeline_name, {', '.join(STEP_COLUMNS)}) "
+                f"VALUES ({', '.join(['?'] * (len(STEP_COLUMNS) + 2))})",
+                [
+                    [report["execution_arn"], report["pipeline_name"]] + [step.get(column) for column in STEP_COLUMNS]
+                    for step in report.get("steps", [])
+                ],
+            )
+        return len(report.get("steps", []))
+
+    def import_execution(
+            self,
+            execution: dict,
+            steps: List[dict],
+            jobs: Union[dict, None] = None,
+            config_hashes: Union[dict, None] = None,
+    ) -> dict:
+        """
+        Record an execution from describe_pipeline_execution and list_pipeline_execution_steps
+        outputs. Queue times and instance types are only known for the steps of the jobs dictionary
+        (job name to describe_*_job output).
+
+        Returns:
+            The recorded execution report.
+        """
+        jobs = jobs or {}
+        step_reports = []
+        for step in steps:
+            job_arns = [value.get("Arn", "") for value in (step.get("Metadata") or {}).values() if isinstance(value, dict)]
+            job = next((jobs[arn.split("/")[-1]] for arn in job_arns if arn.split("/")[-1] in jobs), None)
+            step_report = build_step_report(step, job)
+            step_report["config_hash"] = (config_hashes or {}).get(step_report["step_name"])
+            step_reports.append(step_report)
+
+        start_time, end_time = to_datetime(execution.get("CreationTime")), to_datetime(execution.get("LastModifiedTime"))
+        status = execution.get("PipelineExecutionStatus")
+        finished = status in TERMINAL_STATUSES and start_time and end_time
+        report = dict(
+            pipeline_name=execution.get("PipelineArn", "").split("/")[-1] or None,
+            execution_arn=execution.get("PipelineExecutionArn"),
+            status=status,
+            start_time=start_time.isoformat() if start_time else None,
+            end_time=end_time.isoformat() if finished else None,
+            wall_seconds=round((end_time - start_time).total_seconds(), 3) if finished else None,
+            steps=step_reports,
+        )
+        self.record(report)
+        return report
+
+    def get_step_runs(self, pipeline_name: str, step_name: Union[str, None] = None) -> List[dict]:
+        """
+        Get the recorded runs of the steps of a pipeline, oldest execution first.
+        """
+        query = (
+            "SELECT steps.*, executions.start_time AS execution_start_time FROM steps "
+            "JOIN executions USING (execution_arn) WHERE steps.pipeline_name = ?"
+        )
+        parameters = [pipeline_name]
+        if step_name:
+            query += " AND steps.step_name = ?"
+            parameters.append(step_name)
+        query += " ORDER BY executions.start_time, steps.start_time"
+        return [dict(row) for row in self.connection.execute(query, parameters)]
+
+    def get_reports(self, pipeline_name: str, last: Union[int, None] = None) -> List[dict]:
+        """
+        Get recorded executions as execution reports, oldest first, e.g. for the critical path analyzer.
+        """
+        executions = [
+            dict(row) for row in self.connection.execute(
+                "SELECT * FROM executions WHERE pipeline_name = ? ORDER BY start_time", (pipeline_name,)
+            )
+        ][-last if last else None:]
+        runs = self.get_step_runs(pipeline_name)
+        for execution in executions:
+            execution["steps"] = [
+                dict(run, cache_hit=bool(run["cache_hit"])) for run in runs
+                if run["execution_arn"] == execution["execution_arn"]
+            ]
+        return executions
+
+    def step_trends(self, pipeline_name: str, step_name: Union[str, None] = None) -> List[dict]:
+        """
+        Summarize the succeeded, not cached runs of each step and config hash: run count, p50
+        and p95 wall time, mean queue time, cache hit rate, instance types and last input size.
+        """
+        groups, cache_hits = {}, {}
+        for run in self.get_step_runs(pipeline_name, step_name):
+            key = (run["step_name"], run["config_hash"])
+            cache_hits.setdefault(key, []).append(bool(run["cache_hit"]))
+            if run["status"] == "Succeeded" and not run["cache_hit"] and run["wall_seconds"] is not None:
+                groups.setdefault(key, []).append(run)
+
+        trends = []
+        for (name, config_hash), runs in groups.items():
+            wall_seconds = [run["wall_seconds"] for run in runs]
+            queue_seconds = [run["queue_seconds"] for run in runs if run["queue_seconds"] is not None]
+            trends.append(dict(
+                step_name=name,
+                config_hash=config_hash,
+                runs=len(runs),
+                first_run=runs[0]["execution_start_time"],
+                last_run=runs[-1]["execution_start_time"],
+                p50_seconds=round(summarize(wall_seconds, "median"), 3),
+                p95_seconds=round(summarize(wall_seconds, "p95"), 3),
+                mean_queue_seconds=round(statistics.fmean(queue_seconds), 3) if queue_seconds else None,
+                cache_hit_rate=round(sum(cache_hits[(name, config_hash)]) / len(cache_hits[(name, config_hash)]), 3),
+                instance_types=sorted({run["instance_type"] for run in runs if run["instance_type"]}),
+                input_gb=runs[-1]["input_gb"],
+            ))
+        trends.sort(key=lambda trend: (trend["step_name"], trend["first_run"] or ""))
+        return trends
+
+    def detect_regressions(
+            self,
+            pipeline_name: str,
+            threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+            min_runs: int = DEFAULT_MIN_RUNS,
+    ) -> List[dict]:
+        """
+        Find steps that got slower:
+        - config_change: the p50 of the latest config hash of a step is more than threshold
+          above the p50 of its previous config hash, recorded at least min_runs times.
+        - outlier: the latest run of a step is more than threshold above the p95 of the previous
+          runs of the same config hash, recorded at least min_runs times.
+
+        Returns:
+            The regressions, with the step name, kind, baseline and current seconds and ratio.
+        """
+        regressions = []
+        trends_by_step = {}
+        for trend in self.step_trends(pipeline_name):
+            trends_by_step.setdefault(trend["step_name"], []).append(trend)
+
+        for name, trends in trends_by_step.items():
+            trends.sort(key=lambda trend: trend["last_run"] or "")
+            latest = trends[-1]
+            if len(trends) > 1 and trends[-2]["runs"] >= min_runs:
+                baseline = trends[-2]
+                if latest["p50_seconds"] > baseline["p50_seconds"] * (1 + threshold):
+                    regressions.append(dict(
+                        step_name=name,
+                        kind="config_change",
+                        baseline_config_hash=baseline["config_hash"],
+                        config_hash=latest["config_hash"],
+                        baseline_seconds=baseline["p50_seconds"],
+                        current_seconds=latest["p50_seconds"],
+                        ratio=round(latest["p50_seconds"] / baseline["p50_seconds"], 3) if baseline["p50_seconds"] else None,
+                    ))
+
+            runs = [
+                run for run in self.get_step_runs(pipeline_name, name)
+                if run["config_hash"] == latest["config_hash"] and run["status"] == "Succeeded"
+                and not run["cache_hit"] and run["wall_seconds"] is not None
+            ]
+            if len(runs) > min_runs:
+                baseline_p95 = summarize([run["wall_seconds"] for run in runs[:-1]], "p95")
+                if runs[-1]["wall_seconds"] > baseline_p95 * (1 + threshold):
+                    regressions.append(dict(
+                        step_name=name,
+                        kind="outlier",
+                        baseline_config_hash=latest["config_hash"],
+                        config_hash=latest["config_hash"],
+                        baseline_seconds=round(baseline_p95, 3),
+                        current_seconds=runs[-1]["wall_seconds"],
+                        ratio=round(runs[-1]["wall_seconds"] / baseline_p95, 3) if baseline_p95 else None,
+                    ))
+        return regressions
+
+    def cost_per_run(self, pipeline_name: str, prices: Union[dict, None] = None, last: Union[int, None] = None) -> List[dict]:
+        """
+        Estimate the cost of each recorded execution, see estimate_step_cost.
+
+        Returns:
+            Per execution: execution_arn, start_time, status, wall_seconds, cost and the steps
+            without price.
+        """
+        prices = dict(DEFAULT_HOURLY_PRICES, **(prices or {}))
+        costs = []
+        for report in self.get_reports(pipeline_name, last):
+            cost, unpriced = 0.0, []
+            for step in report["steps"]:
+                step_cost = estimate_step_cost(step, prices)
+                if step_cost is None:
+                    unpriced.append(step["step_name"])
+                else:
+                    cost += step_cost
+            costs.append(dict(
+                execution_arn=report["execution_arn"],
+                start_time=report["start_time"],
+                status=report["status"],
+                wall_seconds=report["wall_seconds"],
+                cost=round(cost, 4),
+                unpriced_steps=unpriced,
+            ))
+        return costs
+
+
+def _format_rows(rows: List[dict], columns: List[str]) -> str:
+    if not rows:
+        return "No recorded runs."
+    widths = {column: max(len(column), *(len(str(row.get(column))) for row in rows)) for column in columns}
+    lines = [" ".join(f"{column:<{widths[column]}}" for column in columns)]
+    for row in rows:
+        lines.append(" ".join(f"{str(row.get(column)):<{widths[column]}}" for column in columns))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local history of pipeline executions")
+    parser.add_argument("--db", default=None, help=f"SQLite database, default ${HISTORY_DB_ENV} or {DEFAULT_HISTORY_DB}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Record executions")
+    import_parser.add_argument("--reports", nargs="*", default=[], help="Execution monitor reports")
+    import_parser.add_argument("--describe", default=None, help="describe-pipeline-execution output JSON")
+    import_parser.add_argument("--steps", default=None, help="list-pipeline-execution-steps output JSON")
+    import_parser.add_argument("--execution-arn", default=None, help="Read a finished execution from SageMaker")
+    import_parser.add_argument("--definition", default=None, help="Pipeline definition JSON, for step config hashes")
+
+    for command in ("trends", "regressions", "cost"):
+        command_parser = commands.add_parser(command)
+        command_parser.add_argument("--pipeline", required=True, help="Pipeline name")
+        if command == "trends":
+            command_parser.add_argument("--step", default=None)
+        if command == "regressions":
+            command_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+            command_parser.add_argument("--min-runs", type=int, default=DEFAULT_MIN_RUNS)
+        if command == "cost":
+            command_parser.add_argument("--prices", default=None, help="JSON of instance type to hourly price")
+            command_parser.add_argument("--last", type=int, default=None)
+        command_parser.add_argument("--output", default=None, help="Write the result as JSON")
+    args = parser.parse_args()
+
+    history = ExecutionHistory(args.db)
+    logger = Logger()
+    result = None
+    if args.command == "import":
+        config_hashes = None
+        if args.definition:
+            with open(args.definition, "r") as f:
+                config_hashes = get_step_config_hashes(json.load(f))
+        reports = []
+        for report_path in args.reports:
+            with open(report_path, "r") as f:
+                reports.append(json.load(f))
+        if args.execution_arn:
+            import boto3
+            reports.append(monitor_execution(boto3.client("sagemaker"), args.execution_arn, timeout_seconds=0))
+        for report in reports:
+            for step in report["steps"]:
+                step.setdefault("config_hash", (config_hashes or {}).get(step["step_name"]))
+            history.record(report)
+            logger.log_info(f"Recorded {report['execution_arn']} in {history.db_path}")
+        if args.describe:
+            with open(args.describe, "r") as f:
+                execution = json.load(f)
+            steps = []
+            if args.steps:
+                with open(args.steps, "r") as f:
+                    steps = json.load(f).get("PipelineExecutionSteps", [])
+            report = history.import_execution(execution, steps, config_hashes=config_hashes)
+            logger.log_info(f"Recorded {report['execution_arn']} in {history.db_path}")
+    elif args.command == "trends":
+        result = history.step_trends(args.pipeline, args.step)
+        print(_format_rows(result, [
+            "step_name", "config_hash", "runs", "p50_seconds", "p95_seconds", "mean_queue_seconds", "cache_hit_rate",
+            "instance_types", "input_gb", "last_run",
+        ]))
+    elif args.command == "regressions":
+        result = history.detect_regressions(args.pipeline, args.threshold, args.min_runs)
+        print(_format_rows(result, [
+            "step_name", "kind", "baseline_config_hash", "config_hash", "baseline_seconds", "current_seconds", "ratio",
+        ]) if result else "No regression found.")
+    elif args.command == "cost":
+        prices = None
+        if args.prices:
+            with open(args.prices, "r") as f:
+                prices = json.load(f)
+        result = history.cost_per_run(args.pipeline, prices, args.last)
+        print(_format_rows(result, ["execution_arn", "start_time", "status", "wall_seconds", "cost", "unpriced_steps"]))
+
+    if result is not None and getattr(args, "output", None):
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
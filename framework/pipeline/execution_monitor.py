@@ -0,0 +1,391 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Asynchronous monitor of SageMaker pipeline executions.
+#
+# Usage, from the framework directory:
+#   python -m pipeline.execution_monitor --execution-arn <pipeline-execution-arn> \
+#       --report pipeline_execution_report.json
+
+# Import native libraries
+import argparse
+import asyncio
+import functools
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Union
+
+# Import custom libraries
+from utilities.logger import Logger
+
+TERMINAL_STATUSES = ("Succeeded", "Failed", "Stopped")
+DEFAULT_REPORT_PATH = "pipeline_execution_report.json"
+
+# Metadata key of the step: step type, describe method, job name argument, job start and end fields
+JOB_METADATA = {
+    "TrainingJob": ("Training", "describe_training_job", "TrainingJobName", "TrainingStartTime", "TrainingEndTime"),
+    "ProcessingJob": (
+        "Processing", "describe_processing_job", "ProcessingJobName", "ProcessingStartTime", "ProcessingEndTime"
+    ),
+    "TransformJob": ("Transform", "describe_transform_job", "TransformJobName", "TransformStartTime", "TransformEndTime"),
+}
+
+
+def to_datetime(value) -> Union[datetime, None]:
+    """
+    Read a timestamp of a SageMaker API response: a datetime, an ISO 8601 string or epoch seconds.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _seconds(start, end) -> Union[float, None]:
+    start, end = to_datetime(start), to_datetime(end)
+    if start is None or end is None:
+        return None
+    return round(max((end - start).total_seconds(), 0.0), 3)
+
+
+def _isoformat(value) -> Union[str, None]:
+    value = to_datetime(value)
+    return value.isoformat() if value else None
+
+
+def get_job_resources(job: dict) -> dict:
+    """
+    Get the instance type and count of a training, processing or transform job description.
+    """
+    resources = (
+        job.get("ResourceConfig")
+        or job.get("ProcessingResources", {}).get("ClusterConfig")
+        or job.get("TransformResources")
+        or {}
+    )
+    return dict(instance_type=resources.get("InstanceType"), instance_count=resources.get("InstanceCount"))
+
+
+def build_step_report(step: dict, job: Union[dict, None] = None) -> dict:
+    """
+    Build the report of one step of a pipeline execution.
+
+    The wall time of a step is split into queue time, from the step start to the start of its
+    job (provisioning, image pull and data download included), and execution time of the job.
+    Steps without a job, and cached steps, have no queue time. The queue time of a step whose
+    job is not described is unknown (None).
+
+    Args:
+        step (dict): The step of list_pipeline_execution_steps.
+        job (dict): The describe response of the step job, if any.
+
+    Returns:
+        The step report.
+    """
+    metadata = step.get("Metadata", {}) or {}
+    metadata_key = next(iter(metadata), None)
+    step_type = JOB_METADATA[metadata_key][0] if metadata_key in JOB_METADATA else metadata_key
+    cache_hit = step.get("CacheHitResult") or {}
+    wall_seconds = _seconds(step.get("StartTime"), step.get("EndTime"))
+
+    queue_seconds, execution_seconds = 0.0, wall_seconds
+    if metadata_key in JOB_METADATA and not cache_hit:
+        if job:
+            _, _, _, start_field, end_field = JOB_METADATA[metadata_key]
+            queue_seconds = _seconds(step.get("StartTime"), job.get(start_field))
+            execution_seconds = _seconds(job.get(start_field), job.get(end_field))
+        else:
+            # the job could not be described
+            queue_seconds = None
+
+    failure_reason = step.get("FailureReason") or metadata.get("Fail", {}).get("ErrorMessage")
+    report = dict(
+        step_name=step.get("StepName"),
+        step_type=step_type,
+        status=step.get("StepStatus"),
+        start_time=_isoformat(step.get("StartTime")),
+        end_time=_isoformat(step.get("EndTime")),
+        wall_seconds=wall_seconds,
+        queue_seconds=queue_seconds,
+        execution_seconds=execution_seconds,
+        cache_hit=bool(cache_hit),
+        cache_source_execution_arn=cache_hit.get("SourcePipelineExecutionArn"),
+        attempt_count=step.get("AttemptCount"),
+        failure_reason=failure_reason,
+        job_arn=(metadata.get(metadata_key) or {}).get("Arn") if metadata_key else None,
+        billable_seconds=(job or {}).get("BillableTimeInSeconds"),
+    )
+    report.update(get_job_resources(job or {}))
+    return report
+
+
+def format_report(report: dict) -> str:
+    """
+    Render an execution report as a console table.
+    """
+    columns = [
+        ("step_name", "step", 36), ("step_type", "type", 12), ("status", "status", 10),
+        ("wall_seconds", "wall (s)", 9), ("queue_seconds", "queue (s)", 9), ("execution_seconds", "exec (s)", 9),
+        ("cache_hit", "cached", 6), ("instance_type", "instance", 16),
+    ]
+    lines = [
+        f"Pipeline {report.get('pipeline_name')} execution {report.get('status')} in {report.get('wall_seconds')} s",
+        " ".join(f"{title:<{width}}" for _, title, width in columns),
+    ]
+    for step in report["steps"]:
+        cells = []
+        for key, _, width in columns:
+            value = step.get(key)
+            cells.append(f"{'' if value is None else value!s:<{width}.{width}}")
+        lines.append(" ".join(cells))
+        if step.get("failure_reason"):
+            lines.append(f"    failure: {step['failure_reason']}")
+    return "\n".join(lines)
+
+
+def write_report(report: dict, path: str = DEFAULT_REPORT_PATH) -> str:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+class ExecutionMonitor:
+    """
+    Poll the steps of a pipeline execution with backoff, report status changes and build a
+    per-step timing report once the execution ends.
+
+    The boto3 SageMaker client is called in the default executor, so that job descriptions
+    are fetched concurrently.
+
+    Attributes:
+    ----------
+    - sagemaker_client: boto3 SageMaker client, or a ReplaySageMakerClient
+    - execution_arn (str): The pipeline execution ARN
+    - poll_seconds (float): First polling interval, used again after each status change
+    - max_poll_seconds (float): Longest polling interval
+    - backoff (float): Polling interval growth factor while nothing changes
+    - timeout_seconds (float): Stop monitoring after this duration, None to wait for the end
+    """
+
+    def __init__(
+            self,
+            sagemaker_client,
+            execution_arn: str,
+            poll_seconds: float = 10,
+            max_poll_seconds: float = 60,
+            backoff: float = 2.0,
+            timeout_seconds: Union[float, None] = None,
+    ) -> "ExecutionMonitor":
+        self.sagemaker_client = sagemaker_client
+        self.execution_arn = execution_arn
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.backoff = backoff
+        self.timeout_seconds = timeout_seconds
+        self.logger = Logger()
+        self.execution = {}
+        self.steps = {}
+
+    async def _call(self, method: str, **kwargs) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(getattr(self.sagemaker_client, method), **kwargs))
+
+    async def _list_steps(self) -> List[dict]:
+        steps, kwargs = [], dict(PipelineExecutionArn=self.execution_arn, SortOrder="Ascending")
+        while True:
+            response = await self._call("list_pipeline_execution_steps", **kwargs)
+            steps += response.get("PipelineExecutionSteps", [])
+            if not response.get("NextToken"):
+                return steps
+            kwargs["NextToken"] = response["NextToken"]
+
+    def _update_steps(self, steps: List[dict]) -> List[dict]:
+        changes = []
+        for step in steps:
+            previous = self.steps.get(step["StepName"], {}).get("StepStatus")
+            self.steps[step["StepName"]] = step
+            if step.get("StepStatus") != previous:
+                changes.append(
+                    dict(step_name=step["StepName"], previous_status=previous, status=step.get("StepStatus"))
+                )
+        return changes
+
+    async def watch(self) -> AsyncIterator[dict]:
+        """
+        Poll the execution until it ends or times out, and yield each step status change.
+
+        Yields:
+            Dictionaries with step_name, previous_status and status.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds if self.timeout_seconds is not None else None
+        interval = self.poll_seconds
+        while True:
+            steps, self.execution = await asyncio.gather(
+                self._list_steps(),
+                self._call("describe_pipeline_execution", PipelineExecutionArn=self.execution_arn),
+            )
+            changes = self._update_steps(steps)
+            for change in changes:
+                yield change
+
+            if self.execution.get("PipelineExecutionStatus") in TERMINAL_STATUSES:
+                # the steps listed with the terminal status may predate it, list them once more
+                for change in self._update_steps(await self._list_steps()):
+                    yield change
+                return
+            if deadline is not None and loop.time() >= deadline:
+                self.logger.log_warning(f"Stopped monitoring {self.execution_arn} after {self.timeout_seconds} s.")
+                return
+            interval = self.poll_seconds if changes else min(interval * self.backoff, self.max_poll_seconds)
+            await asyncio.sleep(interval if deadline is None else max(min(interval, deadline - loop.time()), 0))
+
+    async def _describe_job(self, step: dict) -> Union[dict, None]:
+        metadata = step.get("Metadata", {}) or {}
+        for metadata_key, (_, method, name_argument, _, _) in JOB_METADATA.items():
+            if metadata.get(metadata_key, {}).get("Arn") and not step.get("CacheHitResult"):
+                job_name = metadata[metadata_key]["Arn"].split("/")[-1]
+                try:
+                    return await self._call(method, **{name_argument: job_name})
+                except Exception as e:
+                    self.logger.log_warning(f"Failed to describe {job_name} of step {step['StepName']}: {e}")
+        return None
+
+    async def run(self, on_change: Union[Callable[[dict], None], None] = None) -> dict:
+        """
+        Monitor the execution and build its report.
+
+        Args:
+            on_change (Callable): Called with each step status change, logged by default.
+
+        Returns:
+            The execution report.
+        """
+        async for change in self.watch():
+            if on_change:
+                on_change(change)
+            else:
+                self.logger.log_info(
+                    f"Step {change['step_name']}: {change['previous_status'] or 'Pending'} -> {change['status']}"
+                )
+
+        steps = list(self.steps.values())
+        jobs = await asyncio.gather(*[self._describe_job(step) for step in steps])
+        step_reports = [build_step_report(step, job) for step, job in zip(steps, jobs)]
+        step_reports.sort(key=lambda step: (step["start_time"] or "", step["step_name"]))
+
+        pipeline_arn = self.execution.get("PipelineArn", "")
+        start_time = self.execution.get("CreationTime")
+        end_time = self.execution.get("LastModifiedTime")
+        status = self.execution.get("PipelineExecutionStatus")
+        return dict(
+            pipeline_name=pipeline_arn.split("/")[-1] or None,
+            execution_arn=self.execution_arn,
+            status=status,
+            failure_reason=self.execution.get("FailureReason"),
+            start_time=_isoformat(start_time),
+            end_time=_isoformat(end_time) if status in TERMINAL_STATUSES else None,
+            wall_seconds=_seconds(start_time, end_time) if status in TERMINAL_STATUSES else None,
+            steps=step_reports,
+        )
+
+
+def monitor_execution(sagemaker_client, execution_arn: str, **kwargs) -> dict:
+    """
+    Run an ExecutionMonitor to completion, see ExecutionMonitor for the keyword arguments.
+    """
+    return asyncio.run(ExecutionMonitor(sagemaker_client, execution_arn, **kwargs).run())
+
+
+class ReplaySageMakerClient:
+    """
+    Local stand-in of the SageMaker client, replaying recorded execution snapshots: each
+    list_pipeline_execution_steps call moves to the next snapshot, until the last one.
+
+    Attributes:
+    ----------
+    - snapshots (list): Dictionaries with the "execution" (describe_pipeline_execution) and
+      "steps" (PipelineExecutionSteps) of each poll
+    - jobs (dict): Job name to describe_*_job response
+    """
+
+    def __init__(self, snapshots: List[dict], jobs: Union[dict, None] = None) -> "ReplaySageMakerClient":
+        if not snapshots:
+            raise Exception("ReplaySageMakerClient needs at least one snapshot.")
+        self.snapshots = snapshots
+        self.jobs = jobs or {}
+        self.index = -1
+
+    @classmethod
+    def from_file(cls, path: str) -> "ReplaySageMakerClient":
+        with open(path, "r") as f:
+            recording = json.load(f)
+        return cls(recording["snapshots"], recording.get("jobs"))
+
+    def list_pipeline_execution_steps(self, PipelineExecutionArn: str, **kwargs) -> dict:
+        self.index = min(self.index + 1, len(self.snapshots) - 1)
+        return dict(PipelineExecutionSteps=self.snapshots[self.index]["steps"])
+
+    def describe_pipeline_execution(self, PipelineExecutionArn: str) -> dict:
+        return self.snapshots[max(self.index, 0)]["execution"]
+
+    def _describe_job(self, job_name: str) -> dict:
+        if job_name not in self.jobs:
+            raise Exception(f"Job {job_name} not recorded.")
+        return self.jobs[job_name]
+
+    def describe_training_job(self, TrainingJobName: str) -> dict:
+        return self._describe_job(TrainingJobName)
+
+    def describe_processing_job(self, ProcessingJobName: str) -> dict:
+        return self._describe_job(ProcessingJobName)
+
+    def describe_transform_job(self, TransformJobName: str) -> dict:
+        return self._describe_job(TransformJobName)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor a SageMaker pipeline execution and report step timings")
+    parser.add_argument("--execution-arn", required=True)
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help="Execution report JSON path")
+    parser.add_argument("--poll-seconds", type=float, default=10)
+    parser.add_argument("--max-poll-seconds", type=float, default=60)
+    parser.add_argument("--timeout-seconds", type=float, default=None)
+    parser.add_argument("--replay", default=None, help="Replay a recorded execution JSON instead of calling SageMaker")
+    args = parser.parse_args()
+
+    if args.replay:
+        sagemaker_client = ReplaySageMakerClient.from_file(args.replay)
+    else:
+        import boto3
+        sagemaker_client = boto3.client("sagemaker")
+
+    report = monitor_execution(
+        sagemaker_client,
+        args.execution_arn,
+        poll_seconds=args.poll_seconds,
+        max_poll_seconds=args.max_poll_seconds,
+        timeout_seconds=args.timeout_seconds,
+    )
+    print(format_report(report))
+    Logger().log_info(f"Execution report written to {write_report(report, args.report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,11 @@
 
 # Import native libraries
 import re
+from typing import Union
 
+from sagemaker.estimator import EstimatorBase
 from sagemaker.workflow import steps
+from sagemaker.workflow.entities import PipelineVariable
 from sagemaker.workflow.functions import Join
 from ast import literal_eval
 
@@ -55,13 +58,19 @@ def look_up_step_type_from_step_name(source_step_name: str, config: dict) -> str
                     return "train"
                 elif step['step_class'] == 'Transform':
                     return "transform"
+                elif step['step_class'] == 'ProcessingTransform':
+                    return "processing_transform"
                 else:
-                    raise Exception("Only Prcoessing, Training & Transform Step can be used as chain input source.")
+                    raise Exception(
+                        "Only Prcoessing, Training, Transform & ProcessingTransform Step can be used as chain input source."
+                    )
 
 
 def look_up_steps(source_step_name: str, steps_dict: dict) -> steps.Step:
     """
     Look up a step in a dictionary of steps.
+    A step fused with other Processing steps is found by its fused step name too, and
+    steps run by a condition step are found in its branches.
 
     Args:
         source_step_name (str): The name of the step to look up.
@@ -72,8 +81,35 @@ def look_up_steps(source_step_name: str, steps_dict: dict) -> steps.Step:
     """
     for model_name, model_steps in steps_dict.items():
         for step in model_steps:
-            if step.name == source_step_name:
+            if step.name == source_step_name or source_step_name in getattr(step, "fused_step_names", []):
                 return step
+            for branch_step in getattr(step, "if_steps", []) + getattr(step, "else_steps", []):
+                if branch_step.name == source_step_name:
+                    return branch_step
+
+
+def look_up_dependency_steps(step_name: str, steps_dict: dict) -> list:
+    """
+    Look up the steps a dependency refers to: the step found by look_up_steps, or every step
+    registering a variant of a packed model for the name of its RegisterModel step.
+
+    Args:
+        step_name (str): The step name of the dependency.
+        steps_dict (dict): The dictionary of steps.
+
+    Returns:
+        The list of steps, empty when none is found.
+    """
+    variant_steps = []
+    for model_name, model_steps in steps_dict.items():
+        for step in model_steps:
+            for candidate in [step] + getattr(step, "if_steps", []) + getattr(step, "else_steps", []):
+                if getattr(candidate, "variant_of", None) == step_name:
+                    variant_steps.append(candidate)
+    if variant_steps:
+        return variant_steps
+    step = look_up_steps(step_name, steps_dict)
+    return [step] if step is not None else []
 
 
 def look_up_step_config(source_step_name: str, smp_config: dict) -> dict:
@@ -118,6 +154,9 @@ def get_chain_input_file(
         raise ValueError(
             f"Invalid Source Step Type: {source_step.step_type.value}, Valid source step are {allowed_step_types}"
         )
+    if source_step.name != source_step_name:
+        # outputs of fused steps are named {step_name}-{channel}
+        source_output_name = source_step.get_output_name(source_step_name, source_output_name)
     if source_step.step_type.value == "Processing":
         chain_input_file = source_step.properties.ProcessingOutputConfig.Outputs[source_output_name].S3Output.S3Uri
     elif source_step.step_type.value == "Training":
@@ -132,6 +171,46 @@ def get_chain_input_file(
     return chain_input_file
 
 
+def get_estimator(step_train: steps.TrainingStep) -> EstimatorBase:
+    """
+    Get the estimator of a training step, without building the step arguments again.
+
+    Args:
+        step_train (TrainingStep): The training step.
+
+    Returns:
+        The estimator.
+    """
+    return step_train.step_args.func_args[0] if step_train.step_args else step_train.estimator
+
+
+def get_model_data(step_train: steps.TrainingStep, variant_name: str = None) -> Union[PipelineVariable, dict]:
+    """
+    Get the model data of a training step.
+
+    Args:
+        step_train (TrainingStep): The training step.
+        variant_name (str): The model variant of a packed training step.
+
+    Returns:
+        The model.tar.gz artifact, or a ModelDataSource dictionary on the S3 prefix of the
+        model files when the training output is not compressed.
+    """
+    model_artifacts = step_train.properties.ModelArtifacts.S3ModelArtifacts
+    if not get_estimator(step_train).disable_output_compression:
+        if variant_name is not None:
+            raise Exception(f"Model variant {variant_name} needs an uncompressed training output.")
+        return model_artifacts
+    return {
+        "S3DataSource": {
+            # hosting requires a trailing slash on uncompressed model data prefixes
+            "S3Uri": Join(on="", values=[model_artifacts, f"/{variant_name}/" if variant_name else "/"]),
+            "S3DataType": "S3Prefix",
+            "CompressionType": "None",
+        }
+    }
+
+
 def get_cache_flag(step_config: dict) -> bool:
     """
     Get the cache flag for a step configuration.
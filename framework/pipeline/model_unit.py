@@ -17,11 +17,24 @@
 
 # Create individual model units for pipeline
 
+from typing import Union
+
 from createmodel.create_model_service import CreateModelService
 from modelmetrics.model_metrics_service import ModelMetricsService
 from pipeline.helper import get_cache_flag
+from pipeline.packed_variants import VariantModelStep, get_step_variants
+from pipeline.step_fusion import (
+    FusedProcessingStep,
+    get_fused_step_name,
+    is_fusion_enabled,
+    plan_step_fusion
+)
+from processing.fused_processing_service import FusedProcessingService
 from processing.processing_service import ProcessingService
+from processingtransform.processing_transform_service import ProcessingTransformService
+from registermodel.quality_gates import QualityGateService
 from registermodel.register_model_service import RegisterModelService
+from sagemaker.workflow.condition_step import ConditionStep
 from sagemaker.workflow.model_step import ModelStep
 from sagemaker.workflow.properties import PropertyFile
 from sagemaker.workflow.steps import (
@@ -32,8 +45,11 @@ from sagemaker.workflow.steps import (
 )
 from training.training_service import TrainingService
 from transform.transform_service import TransformService
+from utilities.logger import Logger
+from utilities.tracing import trace_methods
 
 
+@trace_methods
 class ModelUnit:
     def __init__(
             self,
@@ -46,6 +62,7 @@ class ModelUnit:
         self.model_name = model_name
         self.model_step_dict = model_step_dict.copy()
         self.model_step_dict[self.model_name] = []
+        self.logger = Logger()
 
     def get_train_pipeline_steps(self) -> list:
         process_step = None
@@ -54,18 +71,40 @@ class ModelUnit:
         transform_step = None
         metrics_step = None
         register_model_step = None
+        packed_variants = []
         model_pipeline_steps = []
 
         step_config_list = self.config.get(f"sagemakerPipeline.models.{self.model_name}.steps")
+        # adjacent compatible Processing steps run in one job, keyed by the first step name
+        fusion_groups = {}
+        if is_fusion_enabled(self.config):
+            fusion_groups = {
+                group[0].get("step_name"): group for group in plan_step_fusion(self.config, self.model_name)
+            }
+        fused_step_names = set()
 
         for step_config in step_config_list:
             step_class = step_config.get("step_class")
-            if step_class == "Processing":
+            if step_config.get("step_name") in fused_step_names:
+                continue
+            fused_step = None
+            if step_config.get("step_name") in fusion_groups:
+                fused_step = self.sagemaker_fused_processing(fusion_groups[step_config.get("step_name")])
+            if fused_step is not None:
+                fused_step_names.update(fused_step.fused_step_names)
+                add_step = fused_step
+            elif step_class == "Processing":
                 preprocess_step = self.sagemaker_processing(step_config)
                 add_step = preprocess_step
             elif step_class == "Training":
                 train_step = self.sagemaker_training(step_config)
+                packed_variants = get_step_variants(train_step)
                 add_step = train_step
+            elif step_class in ["CreateModel", "Transform"] and packed_variants:
+                raise Exception(f"Packed variants of {self.model_name} are scored by a ProcessingTransform step.")
+            elif step_class == "Metrics" and packed_variants:
+                # one evaluation report can't describe the models of several variants
+                raise Exception(f"Packed variants of {self.model_name} can't be evaluated by a Metrics step.")
             elif step_class == "CreateModel":
                 if train_step is None:
                     raise Exception("A training step must be run before a CreateModel step")
@@ -75,16 +114,43 @@ class ModelUnit:
                 sagemaker_model_name = create_model_step.properties.ModelName
                 transform_step = self.sagemaker_transform(step_config, sagemaker_model_name)
                 add_step = transform_step
+            elif step_class == "ProcessingTransform":
+                if train_step is None:
+                    raise Exception("A training step must be run before a ProcessingTransform step")
+                # scores in a processing job, and stands for the transform step of the Metrics step
+                transform_step = self.sagemaker_processing_transform(step_config, train_step)
+                add_step = transform_step
             elif step_class == "Metrics":
                 if transform_step is None:
                     raise Exception("A transform step is required to create a model metrics step.")
-                metrics_step = self.sagemaker_model_metrics(step_config)
+                metrics_shard_step = self.sagemaker_model_metric_shards(step_config)
+                if metrics_shard_step is not None:
+                    # the shards run before the merge step, which keeps the Metrics step name
+                    model_pipeline_steps.append(metrics_shard_step)
+                    self.model_step_dict[self.model_name].append(metrics_shard_step)
+                metrics_step = self.sagemaker_model_metrics(step_config, metrics_shard_step)
                 add_step = metrics_step
             elif step_class == "RegisterModel":
                 if train_step is None:
                     raise Exception("A training step is required to create a register model step.")
-                register_model_step = self.sagemaker_register_model(step_config, metrics_step, train_step)
-                add_step = register_model_step
+                if packed_variants:
+                    register_model_steps = self.sagemaker_register_model_variants(
+                        step_config, train_step, packed_variants
+                    )
+                else:
+                    register_model_steps = [
+                        self.sagemaker_register_model(step_config, metrics_step, train_step, create_model_step)
+                    ]
+                # the register steps run inside the condition step when quality gates are configured
+                quality_gate_step = self.sagemaker_quality_gate(step_config, metrics_step, register_model_steps)
+                if quality_gate_step is not None:
+                    add_step = quality_gate_step
+                else:
+                    # the variants of a packed model are registered by parallel steps
+                    for register_model_step in register_model_steps[:-1]:
+                        model_pipeline_steps.append(register_model_step)
+                        self.model_step_dict[self.model_name].append(register_model_step)
+                    add_step = register_model_steps[-1]
             else:
                 raise Exception("Invalid step_class value.")
 
@@ -108,6 +174,29 @@ class ModelUnit:
         )
         return process_step
 
+    def sagemaker_fused_processing(self, step_configs: list) -> FusedProcessingStep:
+        fused_processing_service = FusedProcessingService(
+            self.config,
+            self.model_name,
+            step_configs,
+            self.model_step_dict,
+        )
+        if not fused_processing_service.is_within_input_limit():
+            return None
+
+        step_names = [step_config.get("step_name") for step_config in step_configs]
+        fused_step_name = get_fused_step_name(step_names)
+        self.logger.log_info(f"Fusing Processing steps {', '.join(step_names)} into {fused_step_name}")
+        step_args = fused_processing_service.fused_processing(fused_step_name)
+        cache_config = CacheConfig(enable_caching=True, expire_after="10d")
+        fused_step = FusedProcessingStep(
+            fused_step_names=step_names,
+            name=fused_step_name,
+            step_args=step_args,
+            cache_config=cache_config,
+        )
+        return fused_step
+
     def sagemaker_training(self, step_config: dict) -> TrainingStep:
 
         training_service = TrainingService(
@@ -159,11 +248,47 @@ class ModelUnit:
         )
         return transform_step
 
-    def sagemaker_model_metrics(self, step_config: dict) -> ProcessingStep:
+    def sagemaker_processing_transform(self, step_config: dict, train_step: TrainingStep) -> ProcessingStep:
+
+        processing_transform_service = ProcessingTransformService(
+            self.config,
+            self.model_name,
+            step_config,
+            self.model_step_dict,
+        )
+        step_args = processing_transform_service.processing_transform(train_step)
+        cache_config = CacheConfig(enable_caching=get_cache_flag(step_config), expire_after="10d")
+        processing_transform_step = ProcessingStep(
+            name=step_config.get("step_name"),
+            step_args=step_args,
+            cache_config=cache_config,
+        )
+        return processing_transform_step
+
+    def sagemaker_model_metric_shards(self, step_config: dict) -> Union[ProcessingStep, None]:
 
         model_metric_service = ModelMetricsService(self.config, self.model_name, step_config, self.model_step_dict)
+        if not model_metric_service.is_sharded():
+            return None
         model_metric_args = model_metric_service.calculate_model_metrics()
 
+        cache_config = CacheConfig(enable_caching=get_cache_flag(step_config), expire_after="10d")
+        metrics_shard_step = ProcessingStep(
+            name=f"{step_config.get('step_name')}-Shard",
+            step_args=model_metric_args,
+            cache_config=cache_config,
+        )
+        return metrics_shard_step
+
+    def sagemaker_model_metrics(self, step_config: dict,
+                                metrics_shard_step: ProcessingStep = None) -> ProcessingStep:
+
+        model_metric_service = ModelMetricsService(self.config, self.model_name, step_config, self.model_step_dict)
+        if metrics_shard_step is not None:
+            model_metric_args = model_metric_service.merge_model_metrics(metrics_shard_step)
+        else:
+            model_metric_args = model_metric_service.calculate_model_metrics()
+
         cache_config = CacheConfig(enable_caching=get_cache_flag(step_config), expire_after="10d")
         evaluation_report = PropertyFile(
             name="EvaluationReport",
@@ -180,12 +305,13 @@ class ModelUnit:
         return metrics_step
 
     def sagemaker_register_model(self, step_config: dict, metrics_step: ProcessingStep,
-                                 train_step: TrainingStep) -> ModelStep:
+                                 train_step: TrainingStep, create_model_step: ModelStep = None) -> ModelStep:
 
         register_model_service = RegisterModelService(self.config, self.model_name)
         register_model_args = register_model_service.register_model(
             metrics_step,
-            train_step
+            train_step,
+            create_model_step,
         )
 
         register_model_step = ModelStep(
@@ -194,3 +320,39 @@ class ModelUnit:
         )
 
         return register_model_step
+
+    def sagemaker_register_model_variants(self, step_config: dict, train_step: TrainingStep,
+                                          packed_variants: list) -> list:
+
+        register_model_service = RegisterModelService(self.config, self.model_name)
+        register_model_steps = []
+        for variant_name in packed_variants:
+            # the variants are registered without model metrics, as no Metrics step evaluates them
+            register_model_args = register_model_service.register_model(
+                None,
+                train_step,
+                variant_name=variant_name,
+            )
+            register_model_steps.append(
+                VariantModelStep(
+                    variant_of=step_config.get("step_name"),
+                    variant_name=variant_name,
+                    name=f"{step_config.get('step_name')}-{variant_name}",
+                    step_args=register_model_args,
+                )
+            )
+        return register_model_steps
+
+    def sagemaker_quality_gate(self, step_config: dict, metrics_step: ProcessingStep,
+                               register_model_steps: list) -> Union[ConditionStep, None]:
+
+        quality_gate_service = QualityGateService(self.config, self.model_name)
+        if not quality_gate_service.is_enabled():
+            return None
+
+        quality_gate_step = quality_gate_service.gate(
+            step_config.get("step_name"),
+            metrics_step,
+            register_model_steps,
+        )
+        return quality_gate_step
@@ -0,0 +1,80 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Packed model variants: several small models trained by one training job
+
+import json
+
+from pipeline.helper import get_estimator
+from sagemaker.workflow.model_step import ModelStep
+from sagemaker.workflow.steps import TrainingStep
+from training.packed_runner import VARIANTS_ENV
+
+
+class VariantModelStep(ModelStep):
+    """
+    Model step registering one variant of a packed training step.
+
+    Dependencies referencing the name of the RegisterModel step resolve to every variant step.
+
+    Attributes:
+    ----------
+    - variant_of: str
+        - Name of the RegisterModel step of the configuration
+    - variant_name: str
+        - Name of the registered variant
+    """
+
+    def __init__(self, variant_of: str, variant_name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.variant_of = variant_of
+        self.variant_name = variant_name
+
+
+def get_packed_variants(config: dict, model_name: str, section: str = "train") -> dict:
+    """
+    Get the packed_variants.variants of a training section.
+
+    Args:
+        config (dict): The configuration.
+        model_name (str): The model in sagemaker pipeline.
+        section (str): The training section.
+
+    Returns:
+        Dictionary of variant name to variant configuration (hyperparams, env), empty when
+        the model is not packed.
+    """
+    variants = config.get(f"models.{model_name}.{section}.packed_variants.variants", {}) or {}
+    if isinstance(variants, list):
+        variants = {variant_name: {} for variant_name in variants}
+    return {str(variant_name): dict(variant or {}) for variant_name, variant in variants.items()}
+
+
+def get_step_variants(step_train: TrainingStep) -> list:
+    """
+    Get the variant names trained by a training step.
+
+    Args:
+        step_train (TrainingStep): The training step.
+
+    Returns:
+        The variant names, empty when the step is not packed.
+    """
+    environment = get_estimator(step_train).environment or {}
+    if VARIANTS_ENV not in environment:
+        return []
+    return list(json.loads(environment[VARIANTS_ENV]).keys())
@@ -1,17 +1,27 @@
+import asyncio
 import json
+import os
 
+from createmodel.create_model_service import CreateModelService
+from pipeline.execution_history import ExecutionHistory, HISTORY_DB_ENV, get_step_config_hashes
+from pipeline.execution_monitor import DEFAULT_REPORT_PATH, ExecutionMonitor, format_report, write_report
+from pipeline.helper import look_up_dependency_steps
 from pipeline.model_unit import ModelUnit
 from sagemaker.workflow.model_step import ModelStep
 from sagemaker.workflow.pipeline import Pipeline
 from sagemaker.workflow.pipeline_context import PipelineSession
 from utilities.configuration import Conf
+from utilities.logger import Logger
+from utilities.sizing import SizingService
+from utilities.tracing import span, trace_methods
 
 
+@trace_methods
 class PipelineService:
 
     def __init__(self) -> "PipelineService":
         self.config = Conf().load_conf()
-        pass
+        self.logger = Logger()
 
     def _add_step_dependencies(self, pipeline_steps: list) -> None:
         step_dependency_config = self.config.get("sagemakerPipeline.dependencies", [])
@@ -20,25 +30,25 @@ class PipelineService:
             for i in range(len(temp_chain) - 1):
                 source_step_name = temp_chain[i]
                 dest_step_name = temp_chain[i + 1]
-                source_step = None
-                dest_step = None
-                for step in pipeline_steps:
-                    step_name = step.name
-                    if step_name == source_step_name:
-                        source_step = step
-                    elif step_name == dest_step_name:
-                        dest_step = step
-                    if source_step is not None and dest_step is not None:
+                source_steps = look_up_dependency_steps(source_step_name, {"pipeline": pipeline_steps})
+                dest_steps = look_up_dependency_steps(dest_step_name, {"pipeline": pipeline_steps})
+                if not source_steps or not dest_steps:
+                    raise Exception(
+                        f"Failed when adding dependency between steps {source_step_name} and {dest_step_name}.")
+                for source_step in source_steps:
+                    for dest_step in dest_steps:
+                        if source_step is dest_step:
+                            # both steps run in the same fused processing job, in configuration order
+                            continue
                         if isinstance(dest_step, ModelStep):
                             dest_step.steps[0].add_depends_on([source_step])
                         else:
                             dest_step.add_depends_on([source_step])
-                        break
-                if source_step is None or dest_step is None:
-                    raise Exception(
-                        f"Failed when adding dependency between steps {source_step_name} and {dest_step_name}.")
 
     def construct_train_pipeline(self):
+        # sizing decisions, S3 listings and SageMaker Models are only valid for one compilation
+        SizingService.reset()
+        CreateModelService.reset()
         model_steps_dict = {}
 
         for model_name in list(self.config.get("sagemakerPipeline.models").keys()):
@@ -57,7 +67,8 @@ class PipelineService:
             steps=pipeline_steps,
             sagemaker_session=PipelineSession(),
         )
-        pipeline_definition = json.loads(pipeline.definition())
+        with span("Pipeline.definition"):
+            pipeline_definition = json.loads(pipeline.definition())
 
         return pipeline, pipeline_definition
 
@@ -68,5 +79,52 @@ class PipelineService:
         with open("pipeline_definition.json", "w") as file:
             json.dump(pipeline_definition, file)
 
-        pipeline.upsert(role_arn=pipeline_role)
-        pipeline.start()
+        with span("Pipeline.upsert"):
+            pipeline.upsert(role_arn=pipeline_role)
+        with span("Pipeline.start"):
+            execution = pipeline.start()
+
+        if self.config.get("sagemakerPipeline.monitor.enabled", False):
+            self.monitor_execution(execution.arn, execution.sagemaker_session.sagemaker_client, pipeline_definition)
+
+    def _get_step_input_sizes(self) -> dict:
+        # static input sizes listed by the sizing rules, by step name
+        sections = {"Training": "train", "Transform": "transform", "Metrics": "evaluate"}
+        input_sizes = {}
+        for model_name, model_conf in self.config.get("sagemakerPipeline.models").items():
+            for step in model_conf.get("steps", []):
+                section = step.get("step_type") or sections.get(step["step_class"])
+                input_gb = SizingService.get_input_size(model_name, section)
+                if input_gb is not None:
+                    input_sizes[step["step_name"]] = input_sizes[f"{step['step_name']}-Shard"] = round(input_gb, 6)
+        return input_sizes
+
+    def monitor_execution(self, execution_arn: str, sagemaker_client, pipeline_definition: dict = None) -> dict:
+        conf = self.config.get("sagemakerPipeline.monitor")
+        monitor = ExecutionMonitor(
+            sagemaker_client,
+            execution_arn,
+            poll_seconds=conf.get("poll_seconds", 10),
+            max_poll_seconds=conf.get("max_poll_seconds", 60),
+            timeout_seconds=conf.get("timeout_seconds", None),
+        )
+        report = asyncio.run(monitor.run())
+        config_hashes = get_step_config_hashes(pipeline_definition) if pipeline_definition else {}
+        input_sizes = self._get_step_input_sizes()
+        for step in report["steps"]:
+            step["config_hash"] = config_hashes.get(step["step_name"])
+            step["input_gb"] = input_sizes.get(step["step_name"])
+        self.logger.log_info(lambda: format_report(report))
+        report_path = write_report(report, conf.get("report_path", DEFAULT_REPORT_PATH))
+        self.logger.log_info(f"Pipeline execution report written to {report_path}")
+
+        history_db = conf.get("history_db", None) or os.environ.get(HISTORY_DB_ENV)
+        if history_db:
+            history = ExecutionHistory(history_db)
+            history.record(report)
+            history.close()
+            self.logger.log_info(f"Pipeline execution recorded in {history.db_path}")
+
+        if report["status"] in ("Failed", "Stopped") and conf.get("fail_on_error", True):
+            raise Exception(f"Pipeline execution {execution_arn} {report['status']}: {report['failure_reason']}")
+        return report
@@ -0,0 +1,177 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Compile-time fusion of adjacent Processing steps of a model unit
+
+import json
+from typing import Union
+
+from processing.processing_service import ProcessingService
+from sagemaker.workflow.steps import ProcessingStep
+
+# Processing step arguments that must be identical for steps to share a job
+FUSION_ARGS = [
+    "image_uri",
+    "framework_version",
+    "instance_type",
+    "instance_count",
+    "source_directory",
+    "role",
+    "kms_key",
+    "s3_data_distribution_type",
+]
+MAX_STEP_NAME_LENGTH = 64
+
+
+class FusedProcessingStep(ProcessingStep):
+    """
+    Processing step running several Processing steps of the configuration in a single job.
+
+    The outputs of each fused step are named {step_name}-{channel}, and chain inputs, dependencies
+    and step lookups referencing a fused step name resolve to this step.
+
+    Attributes:
+    ----------
+    - fused_step_names: list
+        - Names of the fused steps, in run order
+    """
+
+    def __init__(self, fused_step_names: list, **kwargs):
+        super().__init__(**kwargs)
+        self.fused_step_names = fused_step_names
+
+    def get_output_name(self, step_name: str, output_name: str) -> str:
+        return f"{step_name}-{output_name}"
+
+
+def is_fusion_enabled(config: dict) -> bool:
+    return str(config.get("sagemakerPipeline.fuse_processing_steps", False)).lower() == "true"
+
+
+def get_fused_step_name(step_names: list) -> str:
+    """
+    Name of the pipeline step running the fused steps.
+
+    Args:
+        step_names (list): Names of the fused steps, in run order.
+
+    Returns:
+        The step names joined with "-", or "{first step}-and-{n}-more" when too long.
+    """
+    fused_step_name = "-".join(step_names)
+    if len(fused_step_name) <= MAX_STEP_NAME_LENGTH:
+        return fused_step_name
+    suffix = f"-and-{len(step_names) - 1}-more"
+    return step_names[0][:MAX_STEP_NAME_LENGTH - len(suffix)] + suffix
+
+
+def get_fusion_key(config: dict, model_name: str, step_config: dict) -> Union[tuple, None]:
+    """
+    Compute the key identifying the steps that can share a processing job.
+
+    Args:
+        config (dict): The configuration dictionary.
+        model_name (str): The model name.
+        step_config (dict): The step configuration.
+
+    Returns:
+        The key, or None when the step can't be fused: other step classes, steps with
+        "fuse: False", and steps running on several instances.
+    """
+    if step_config.get("step_class") != "Processing":
+        return None
+    if str(step_config.get("fuse", True)).lower() == "false":
+        return None
+
+    processing_service = ProcessingService(config, model_name, step_config, {})
+    args = processing_service._args()
+    if args["instance_count"] != 1:
+        return None
+    network_config = json.dumps(processing_service._get_network_config(), sort_keys=True)
+    return tuple(str(args[key]) for key in FUSION_ARGS) + (network_config,)
+
+
+def get_dependency_edges(config: dict) -> set:
+    """
+    Read the (source, destination) step name pairs of sagemakerPipeline.dependencies.
+    """
+    edges = set()
+    for condition in config.get("sagemakerPipeline.dependencies", []) or []:
+        temp_chain = condition.split(" >> ")
+        for i in range(len(temp_chain) - 1):
+            edges.add((temp_chain[i], temp_chain[i + 1]))
+    return edges
+
+
+def has_outside_path(group: list, step_name: str, edges: set) -> bool:
+    """
+    Check if a dependency path goes from a step of the group to step_name through a step
+    outside the group, in which case fusing step_name into the group would create a cycle.
+
+    Args:
+        group (list): Names of the steps of the group.
+        step_name (str): Name of the step to add to the group.
+        edges (set): Dependency edges.
+
+    Returns:
+        True if such a path exists.
+    """
+    members = set(group) | {step_name}
+    visited = set()
+    pending = [destination for source, destination in edges if source in group and destination not in members]
+    while pending:
+        current = pending.pop()
+        if current in visited:
+            continue
+        visited.add(current)
+        for source, destination in edges:
+            if source != current:
+                continue
+            if destination == step_name:
+                return True
+            if destination not in members:
+                pending.append(destination)
+    return False
+
+
+def plan_step_fusion(config: dict, model_name: str) -> list:
+    """
+    Group the adjacent Processing steps of a model unit that can run in a single job.
+
+    Adjacent steps are fused when they use the same image, framework version, instance type,
+    single instance, source directory, role, KMS key and network configuration.
+
+    Args:
+        config (dict): The configuration dictionary.
+        model_name (str): The model name.
+
+    Returns:
+        The step configuration groups with more than one step, in run order.
+    """
+    edges = get_dependency_edges(config)
+    groups = []
+    previous_key = None
+    for step_config in config.get(f"sagemakerPipeline.models.{model_name}.steps"):
+        key = get_fusion_key(config, model_name, step_config)
+        group_names = [group_step.get("step_name") for group_step in groups[-1]] if groups else []
+        if key is not None and key == previous_key and \
+                not has_outside_path(group_names, step_config.get("step_name"), edges):
+            groups[-1].append(step_config)
+        else:
+            groups.append([step_config])
+        previous_key = key
+    return [group for group in groups if len(group) > 1]
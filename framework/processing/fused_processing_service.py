@@ -0,0 +1,309 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import shutil
+import tempfile
+
+from pipeline.helper import look_up_step_type_from_step_name
+from processing import fused_runner
+from processing.processing_service import ProcessingService
+from sagemaker.network import NetworkConfig
+from sagemaker.processing import (
+    FrameworkProcessor,
+    ProcessingInput,
+    ProcessingOutput
+)
+from sagemaker.sklearn import estimator
+from utilities.logger import Logger
+from utilities.packaging import select_dependencies, stage_files
+from utilities.tracing import trace_methods
+
+PROCESSING_ROOT = "/opt/ml/processing"
+FUSED_ROOT = "/opt/ml/processing/smp-fused"
+RUNNER_FILE_NAME = "smp_fused_runner.py"
+RUN_REPORT_OUTPUT_NAME = "run-report"
+# SageMaker Processing Job API has a limit of 10 ProcessingInputs, 2 are used for code and entrypoint
+MAX_FUSED_DATA_INPUTS = 8
+
+
+@trace_methods
+class FusedProcessingService:
+    """
+    Class to handle the creation of a processing step running the entry points of
+    several Processing steps in sequence, in a single processing job
+
+    Attributes:
+    ----------
+    - config: dict
+        - Configuration dictionary
+    - model_name: str
+        - Model name
+    - step_configs: list
+        - Configuration dictionaries of the fused Processing steps, in run order
+    - model_step_dict: dict
+        - Dictionary of model processing steps
+    """
+
+    def __init__(self, config: dict, model_name: str, step_configs: list, model_step_dict: dict):
+        self.config = config
+        self.model_name = model_name
+        self.step_configs = step_configs
+        self.model_step_dict = model_step_dict
+        self.logger = Logger()
+        self.step_names = [step_config.get("step_name") for step_config in step_configs]
+        self.processing_services = [
+            ProcessingService(config, model_name, step_config, model_step_dict) for step_config in step_configs
+        ]
+
+    @staticmethod
+    def _fused_path(*parts) -> str:
+        return os.path.join(FUSED_ROOT, *parts)
+
+    @staticmethod
+    def _relative_to_processing_root(path: str) -> str:
+        path = os.path.normpath(path)
+        if path.startswith(PROCESSING_ROOT + "/"):
+            return os.path.relpath(path, PROCESSING_ROOT)
+        return os.path.basename(path)
+
+    def _get_step_inputs(self, index: int) -> tuple:
+        """
+        Method to retreive the inputs of one of the fused steps
+
+        Args:
+        ----------
+        - index: int
+            Position of the step in the fused job
+
+        Returns:
+        ----------
+        - SageMaker Processing Inputs list, mounted under the fused step directory
+        - [expected_path, actual_path] links exposing the inputs to the step entry point
+        """
+        step_name = self.step_names[index]
+        processing_service = self.processing_services[index]
+
+        if len(processing_service._get_static_input_list()) >= 7:
+            static_inputs = processing_service._get_static_manifest_input()
+        else:
+            static_inputs = processing_service._get_static_input()
+        external_inputs = static_inputs + processing_service._get_chain_input(exclude_steps=self.step_names)
+
+        processing_inputs = []
+        links = []
+        for position, processing_input in enumerate(external_inputs):
+            fused_input = ProcessingInput(
+                input_name=f"{step_name}-{processing_input.input_name or f'input-{position}'}",
+                source=processing_input.source,
+                destination=self._fused_path(
+                    "inputs", step_name, self._relative_to_processing_root(processing_input.destination)
+                ),
+                s3_data_type=processing_input.s3_data_type,
+                s3_input_mode=processing_input.s3_input_mode,
+                s3_data_distribution_type=processing_input.s3_data_distribution_type,
+            )
+            processing_inputs.append(fused_input)
+            links.append([processing_input.destination, fused_input.destination])
+
+        # chain inputs produced by an earlier step of the same job are read from its local outputs
+        for source_step_name in self.step_configs[index].get("chain_input_source_step", []):
+            if source_step_name not in self.step_names:
+                continue
+            if self.step_names.index(source_step_name) >= index:
+                raise Exception(
+                    f"{step_name} chains input from {source_step_name}, which runs after it in the fused job."
+                )
+            source_step_type = look_up_step_type_from_step_name(source_step_name=source_step_name, config=self.config)
+            for channel in self.config["models"][self.model_name][source_step_type].get("channels", ["train"]):
+                links.append([
+                    os.path.join(PROCESSING_ROOT, "input", f"{source_step_name}-input-{channel}"),
+                    self._fused_path("outputs", source_step_name, channel),
+                ])
+
+        return processing_inputs, links
+
+    def _get_step_outputs(self, index: int) -> tuple:
+        """
+        Method to retreive the outputs of one of the fused steps
+
+        Args:
+        ----------
+        - index: int
+            Position of the step in the fused job
+
+        Returns:
+        ----------
+        - SageMaker Processing Outputs list, named {step_name}-{channel}
+        - [step_output_path, uploaded_path] pairs moved by the runner after the step
+        """
+        step_name = self.step_names[index]
+        processing_outputs = []
+        moves = []
+        for processing_output in self.processing_services[index]._get_processing_outputs():
+            fused_output = ProcessingOutput(
+                output_name=f"{step_name}-{processing_output.output_name}",
+                source=self._fused_path("outputs", step_name, processing_output.output_name),
+                s3_upload_mode=processing_output.s3_upload_mode,
+            )
+            processing_outputs.append(fused_output)
+            moves.append([processing_output.source, fused_output.source])
+        return processing_outputs, moves
+
+    def _get_processing_inputs(self) -> list:
+        """
+        Method to retreive SageMaker processing inputs of all the fused steps
+
+        Returns:
+        ----------
+        - SageMaker Processing Inputs list
+        """
+        processing_inputs = []
+        for index in range(len(self.step_configs)):
+            processing_inputs += self._get_step_inputs(index)[0]
+        return processing_inputs
+
+    def _get_processing_outputs(self) -> list:
+        """
+        Method to retreive SageMaker processing outputs of all the fused steps, and the run report
+
+        Returns:
+        ----------
+        - SageMaker Processing Outputs list
+        """
+        processing_outputs = []
+        for index in range(len(self.step_configs)):
+            processing_outputs += self._get_step_outputs(index)[0]
+        processing_outputs.append(ProcessingOutput(
+            output_name=RUN_REPORT_OUTPUT_NAME,
+            source=self._fused_path("report"),
+            s3_upload_mode="EndOfJob"
+        ))
+        return processing_outputs
+
+    def is_within_input_limit(self) -> bool:
+        """
+        Check that the fused job does not exceed the processing job input limit
+        """
+        number_of_inputs = len(self._get_processing_inputs())
+        if number_of_inputs > MAX_FUSED_DATA_INPUTS:
+            self.logger.log_warning(
+                f"Steps {', '.join(self.step_names)} are not fused: they have {number_of_inputs} inputs, "
+                f"a processing job allows {MAX_FUSED_DATA_INPUTS} besides the code."
+            )
+            return False
+        return True
+
+    def _get_plan(self, fused_step_name: str) -> dict:
+        """
+        Method to build the plan executed by the fused runner
+
+        Args:
+        ----------
+        - fused_step_name: str
+            Name of the fused pipeline step
+
+        Returns:
+        ----------
+        - Plan dictionary
+        """
+        steps = []
+        for index, processing_service in enumerate(self.processing_services):
+            args = processing_service._args()
+            steps.append(dict(
+                step_name=self.step_names[index],
+                entry_point=args["entry_point"],
+                module=args["entry_point"].replace("/", ".").replace(".py", ""),
+                env=args["env"],
+                links=self._get_step_inputs(index)[1],
+                outputs=self._get_step_outputs(index)[1],
+            ))
+        return dict(fused_step_name=fused_step_name, report_path=self._fused_path("report"), steps=steps)
+
+    def _stage_source_directory(self, source_directory: str, plan: dict) -> str:
+        """
+        Copy the model source code with the fused runner and its plan into a staging directory.
+
+        The staging directory is named after the content digest of the code and the plan, so
+        that the fused step definition, and thus its cache key, is stable across compiles.
+        """
+        selected_files, _ = select_dependencies(source_directory=source_directory, max_file_size_mb=None)
+        extras_directory = tempfile.mkdtemp(prefix="smp-fused-extras-")
+        try:
+            shutil.copy2(fused_runner.__file__, os.path.join(extras_directory, RUNNER_FILE_NAME))
+            with open(os.path.join(extras_directory, fused_runner.PLAN_FILE_NAME), "w") as f:
+                json.dump(plan, f, indent=2)
+            return stage_files(
+                source_directory,
+                selected_files,
+                prefix="smp-fused-",
+                extra_files=[
+                    os.path.join(extras_directory, RUNNER_FILE_NAME),
+                    os.path.join(extras_directory, fused_runner.PLAN_FILE_NAME),
+                ],
+            )
+        finally:
+            shutil.rmtree(extras_directory, ignore_errors=True)
+
+    def fused_processing(self, fused_step_name: str) -> dict:
+        """
+        Method to run the fused SageMaker Processing step
+
+        Args:
+        ----------
+        - fused_step_name: str
+            Name of the fused pipeline step
+
+        Returns:
+        ----------
+        - step_process: dict
+            SageMaker Processing step arguments
+        """
+        processing_service = self.processing_services[0]
+        network_config = processing_service._get_network_config()
+        args = processing_service._args()
+        step_args = [service._args() for service in self.processing_services]
+        source_directory = self._stage_source_directory(args["source_directory"], self._get_plan(fused_step_name))
+
+        framework_processor = FrameworkProcessor(
+            image_uri=args["image_uri"],
+            framework_version=args["framework_version"],
+            estimator_cls=estimator.SKLearn,
+            role=args["role"],
+            command=["python", "-m", RUNNER_FILE_NAME.replace(".py", "")],
+            instance_count=args["instance_count"],
+            instance_type=args["instance_type"],
+            volume_size_in_gb=max(step["volume_size_in_gb"] for step in step_args),
+            max_runtime_in_seconds=sum(step["max_runtime_seconds"] for step in step_args),
+            base_job_name=args["base_job_name"],
+            tags=args["tags"],
+            volume_kms_key=args["kms_key"],
+            output_kms_key=args["kms_key"],
+            network_config=NetworkConfig(**network_config),
+            sagemaker_session=processing_service._get_pipeline_session(),
+        )
+
+        step_process = framework_processor.run(
+            inputs=self._get_processing_inputs(),
+            outputs=self._get_processing_outputs(),
+            source_dir=source_directory,
+            code=RUNNER_FILE_NAME,
+            job_name=args["base_job_name"]
+        )
+
+        return step_process
@@ -0,0 +1,140 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Entry point of fused processing jobs. This file is copied next to the model source code
+# as smp_fused_runner.py, with the smp_fused_plan.json plan written by FusedProcessingService,
+# and only depends on the Python standard library.
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+PLAN_FILE_NAME = "smp_fused_plan.json"
+REPORT_FILE_NAME = "run_report.json"
+
+
+def link_inputs(links: list) -> None:
+    """
+    Expose the inputs of a step at the paths its entry point expects.
+
+    Args:
+        links (list): [expected_path, actual_path] pairs.
+    """
+    for expected_path, actual_path in links:
+        if os.path.islink(expected_path):
+            os.unlink(expected_path)
+        os.makedirs(os.path.dirname(expected_path), exist_ok=True)
+        os.makedirs(actual_path, exist_ok=True)
+        os.symlink(actual_path, expected_path)
+
+
+def unlink_inputs(links: list) -> None:
+    """
+    Remove the links created by link_inputs.
+
+    Args:
+        links (list): [expected_path, actual_path] pairs.
+    """
+    for expected_path, _ in links:
+        if os.path.islink(expected_path):
+            os.unlink(expected_path)
+
+
+def collect_outputs(outputs: list) -> None:
+    """
+    Move what a step wrote in its output directories to the directories uploaded for it.
+
+    Args:
+        outputs (list): [step_output_path, uploaded_path] pairs.
+    """
+    for step_output_path, uploaded_path in outputs:
+        os.makedirs(uploaded_path, exist_ok=True)
+        if not os.path.isdir(step_output_path):
+            continue
+        for item in os.listdir(step_output_path):
+            shutil.move(os.path.join(step_output_path, item), os.path.join(uploaded_path, item))
+        shutil.rmtree(step_output_path, ignore_errors=True)
+
+
+def run_step(step: dict, code_directory: str) -> dict:
+    """
+    Run the entry point of one of the fused steps.
+
+    Args:
+        step (dict): The step plan.
+        code_directory (str): The directory holding the model source code.
+
+    Returns:
+        The step run report.
+    """
+    link_inputs(step["links"])
+    for step_output_path, _ in step["outputs"]:
+        os.makedirs(step_output_path, exist_ok=True)
+
+    env = dict(os.environ)
+    env.update({key: str(value) for key, value in (step.get("env") or {}).items()})
+
+    print(f"Running {step['step_name']}: python -m {step['module']}", flush=True)
+    start_time = time.time()
+    exit_code = subprocess.call([sys.executable, "-m", step["module"]], cwd=code_directory, env=env)
+    end_time = time.time()
+
+    collect_outputs(step["outputs"])
+    unlink_inputs(step["links"])
+
+    return dict(
+        step_name=step["step_name"],
+        entry_point=step["entry_point"],
+        status="Succeeded" if exit_code == 0 else "Failed",
+        exit_code=exit_code,
+        start_time=start_time,
+        end_time=end_time,
+        duration_seconds=round(end_time - start_time, 3),
+    )
+
+
+def main() -> int:
+    code_directory = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(code_directory, PLAN_FILE_NAME), "r") as f:
+        plan = json.load(f)
+
+    report = dict(fused_step_name=plan["fused_step_name"], steps=[])
+    exit_code = 0
+    for step in plan["steps"]:
+        if exit_code != 0:
+            # a failed step stops the job, the following steps are reported as not run
+            report["steps"].append(dict(step_name=step["step_name"], entry_point=step["entry_point"],
+                                        status="NotRun"))
+            continue
+        step_report = run_step(step, code_directory)
+        report["steps"].append(step_report)
+        exit_code = step_report["exit_code"]
+
+    report["status"] = "Succeeded" if exit_code == 0 else "Failed"
+    os.makedirs(plan["report_path"], exist_ok=True)
+    with open(os.path.join(plan["report_path"], REPORT_FILE_NAME), "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2), flush=True)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,8 +28,11 @@ from sagemaker.processing import (
 )
 from sagemaker.sklearn import estimator
 from sagemaker.workflow.pipeline_context import PipelineSession
+from utilities.sizing import SizingService
+from utilities.tracing import trace_methods
 
 
+@trace_methods
 class ProcessingService:
     """
     Class to handle the creation of processing steps
@@ -117,7 +120,11 @@ class ProcessingService:
             s3_upload_mode=conf.get("s3_upload_mode", "EndOfJob"),
         )
 
-        return args
+        return SizingService(self.config, self.model_name, self.step_config.get('step_type')).size(
+            args,
+            [self._get_static_input_source(file) for file in self._get_static_input_list()],
+            sharded=args["s3_data_distribution_type"] == "ShardedByS3Key",
+        )
 
     def _get_static_input_list(self) -> list:
         """
@@ -137,6 +144,21 @@ class ProcessingService:
                 input_files_list.append(temp_data_files[0])
         return input_files_list
 
+    def _get_static_input_source(self, file: dict) -> str:
+        """
+        Method to resolve a dataFiles entry into its S3 source
+
+        Returns:
+        ----------
+        - S3 URI of the input
+        """
+        if file.get("fileName").startswith("s3://"):
+            return file.get("fileName")
+        conf = self.config.get(f"models.{self.model_name}.{self.step_config.get('step_type')}")
+        bucket = conf.get("channels.train.s3Bucket")
+        input_prefix = conf.get("channels.train.s3InputPrefix", "")
+        return os.path.join(bucket, input_prefix, file.get("fileName"))
+
     def _get_static_input(self) -> Tuple[list, int]:
         """
         Method to retreive SageMaker static inputs
@@ -146,8 +168,6 @@ class ProcessingService:
         - SageMaker Processing Inputs list
         
         """
-        # parse main conf dictionary
-        conf = self.config.get(f"models.{self.model_name}.{self.step_config.get('step_type')}")
         args = self._args()
         # Get the total number of input files
         input_files_list = self._get_static_input_list()
@@ -155,16 +175,9 @@ class ProcessingService:
         input_local_filepath = "/opt/ml/processing/input/"
 
         for file in input_files_list:
-            if file.get("fileName").startswith("s3://"):
-                _source = file.get("fileName")
-            else:
-                bucket = conf.get("channels.train.s3Bucket")
-                input_prefix = conf.get("channels.train.s3InputPrefix", "")
-                _source = os.path.join(bucket, input_prefix, file.get("fileName"))
-
             temp = ProcessingInput(
                 input_name=file.get("sourceName", ""),
-                source=_source,
+                source=self._get_static_input_source(file),
                 destination=os.path.join(input_local_filepath, file.get("sourceName", "")),
                 s3_data_distribution_type=args.get("s3_data_distribution_type")
             )
@@ -214,10 +227,15 @@ class ProcessingService:
 
         return [manifest_input]
 
-    def _get_chain_input(self):
+    def _get_chain_input(self, exclude_steps: list = None):
         """
         Method to retreive SageMaker chain inputs
 
+        Args:
+        ----------
+        - exclude_steps: list
+            Source steps to skip, used when the source step runs in the same fused job
+
         Returns:
         ----------
         - SageMaker Processing Inputs list
@@ -228,6 +246,8 @@ class ProcessingService:
         args = self._args()
 
         for source_step_name in chain_input_source_step:
+            if source_step_name in (exclude_steps or []):
+                continue
             source_step_type = look_up_step_type_from_step_name(
                 source_step_name=source_step_name,
                 config=self.config
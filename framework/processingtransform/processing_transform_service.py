@@ -0,0 +1,339 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Import native libraries
+import os
+from typing import Union
+
+# Import third-party libraries
+from pipeline.helper import get_chain_input_file, get_model_data
+from pipeline.packed_variants import get_step_variants
+from sagemaker.network import NetworkConfig
+from sagemaker.processing import (
+    FrameworkProcessor,
+    ProcessingInput,
+    ProcessingOutput
+)
+from sagemaker.sklearn import estimator
+from sagemaker.workflow.functions import Join
+from sagemaker.workflow.pipeline_context import PipelineSession
+from sagemaker.workflow.steps import TrainingStep
+# Import custom libraries
+from utilities.logger import Logger
+from utilities.tracing import trace_methods
+
+MODEL_LOCAL_FILEPATH = "/opt/ml/processing/model"
+INPUT_LOCAL_FILEPATH = "/opt/ml/processing/input"
+OUTPUT_LOCAL_FILEPATH = "/opt/ml/processing/output"
+
+
+@trace_methods
+class ProcessingTransformService:
+    """
+    Score a dataset inside a SageMaker Processing job, loading the model artifacts of the
+    training step directly instead of creating a SageMaker Model and a Batch Transform job.
+
+    The outputs are named after the processing_transform channel, so the step can be used as
+    chain input source of a Metrics step in place of a Transform step.
+
+    Attributes:
+    ----------
+    - config: dict
+        - Configuration dictionary
+    - model_name: str
+        - Model name
+    - step_config: dict
+        - Processing transform step configuration dictionary
+    - model_step_dict: dict
+        - Dictionary of model steps
+    """
+
+    def __init__(self, config: dict, model_name: str, step_config: dict, model_step_dict: dict):
+        self.config = config
+        self.model_name = model_name
+        self.step_config = step_config
+        self.model_step_dict = model_step_dict
+        self.logger = Logger()
+
+    def _get_network_config(self) -> dict:
+        """
+        Method to retreive SageMaker network configuration
+
+        Returns:
+        ----------
+        - SageMaker Network Configuration dictionary
+        """
+        network_config_kwargs = dict(
+            enable_network_isolation=False,
+            security_group_ids=self.config.get("sagemakerNetworkSecurity.security_groups_id").split(
+                ",") if self.config.get("sagemakerNetworkSecurity.security_groups_id") else None,
+            subnets=self.config.get("sagemakerNetworkSecurity.subnets", None).split(",") if self.config.get(
+                "sagemakerNetworkSecurity.subnets", None) else None,
+            encrypt_inter_container_traffic=True,
+        )
+
+        return network_config_kwargs
+
+    def _get_pipeline_session(self) -> PipelineSession:
+        """
+        Method to retreive SageMaker pipeline session
+
+        Returns:
+        ----------
+        - SageMaker pipeline session
+        """
+        return PipelineSession(default_bucket=self.config.get("s3Bucket"))
+
+    def _args(self) -> dict:
+        """
+        Parse method to retreive all arguments to be used to create the processing transform step
+
+        Returns:
+        ----------
+        - Processing Transform Step arguments : dict
+        """
+        conf = self.config.get(f"models.{self.model_name}.processing_transform")
+        source_dir = self.config.get(
+            f"models.{self.model_name}.source_directory",
+            os.getenv("SMP_SOURCE_DIR_PATH")
+        )
+        content_type = conf.get("content_type", "text/csv")
+
+        args = dict(
+            image_uri=conf.get("image_uri"),
+            base_job_name=conf.get("base_job_name", "default-processing-transform-job-name"),
+            entry_point=conf.get("entry_point"),
+            instance_count=conf.get("instance_count", 1),
+            instance_type=conf.get("instance_type", "ml.m5.2xlarge"),
+            volume_size_in_gb=conf.get("volume_size_in_gb", 32),
+            max_runtime_seconds=conf.get("max_runtime_seconds", 3000),
+            content_type=content_type,
+            accept=conf.get("accept", content_type),
+            tags=conf.get("tags", None),
+            env=conf.get("env", None),
+            source_directory=source_dir,
+            framework_version=conf.get("framework_version", "0"),
+            role=self.config.get("sagemakerNetworkSecurity.role"),
+            kms_key=self.config.get("sagemakerNetworkSecurity.kms_key", None),
+        )
+
+        return args
+
+    def _get_channel(self) -> str:
+        """
+        Method to retreive the single channel of the processing transform section
+        """
+        channels = list(self.config.get(f"models.{self.model_name}.processing_transform.channels", {}).keys())
+        if len(channels) != 1:
+            raise Exception(f"Only one channel allowed within processing_transform section. {channels} found.")
+        return channels[0]
+
+    def _get_s3_data_distribution_type(self) -> str:
+        """
+        Method to shard the input objects across instances when more than one instance is used
+        """
+        return "ShardedByS3Key" if self._args()["instance_count"] > 1 else "FullyReplicated"
+
+    def _get_s3_uri(self, file_name: str, s3_bucket_name: str, bucket_prefix: str) -> str:
+        """
+        Method to resolve a dataFiles entry into an S3 URI
+        """
+        if file_name.startswith("s3://"):
+            return file_name
+        return f"s3://{s3_bucket_name}/{bucket_prefix}{file_name}"
+
+    def _get_chain_input(self, channel: str) -> Union[list, None]:
+        """
+        Method to retreive SageMaker chain inputs, mounted in the channel input directory
+
+        Returns:
+        ----------
+        - SageMaker Processing Inputs list, or None without chain input
+        """
+        chain_input_source_step = self.step_config.get("chain_input_source_step", [])
+        chain_input_additional_prefix = self.step_config.get("chain_input_additional_prefix", "")
+
+        if len(chain_input_source_step) == 0:
+            self.logger.log_info(
+                "During ProcessingTransformService, no chain input found. Input from processing_transform.dataFiles"
+            )
+            return None
+        if len(chain_input_source_step) > 1:
+            raise Exception(
+                f"Maximum one chain input allowed for ProcessingTransformService. "
+                f"{len(chain_input_source_step)} found."
+            )
+
+        source_step_name = chain_input_source_step[0]
+        self.logger.log_info(f"During ProcessingTransformService, chain input source step {source_step_name} found.")
+        chain_input_path = get_chain_input_file(
+            source_step_name=source_step_name,
+            steps_dict=self.model_step_dict,
+            source_output_name=channel,
+        )
+        return [
+            ProcessingInput(
+                input_name=f"{source_step_name}-input-{channel}",
+                source=Join("/", [chain_input_path, chain_input_additional_prefix]),
+                destination=os.path.join(INPUT_LOCAL_FILEPATH, channel),
+                s3_data_distribution_type=self._get_s3_data_distribution_type(),
+            )
+        ]
+
+    def _get_static_input(self, channel: str) -> list:
+        """
+        Method to retreive the data inputs of the channel
+
+        A channel can reference a manifestFile, a single file or S3 prefix (ending with "/"),
+        or a list of files, each mounted in a sourceName sub-directory of the channel input directory.
+
+        Returns:
+        ----------
+        - SageMaker Processing Inputs list
+        """
+        conf = self.config.get(f"models.{self.model_name}.processing_transform.channels.{channel}")
+        bucket_prefix = conf.get("inputBucketPrefix") + "/" if conf.get("inputBucketPrefix") else ""
+        s3_bucket_name = conf.get("s3BucketName")
+        files = list(conf.get("dataFiles", []))
+        manifest_file = conf.get("manifestFile")
+        distribution_type = self._get_s3_data_distribution_type()
+
+        if manifest_file:
+            if files:
+                raise Exception("Processing transform channel can define either manifestFile or dataFiles, not both.")
+            return [
+                ProcessingInput(
+                    input_name=f"{channel}-manifest",
+                    source=self._get_s3_uri(manifest_file, s3_bucket_name, bucket_prefix),
+                    destination=os.path.join(INPUT_LOCAL_FILEPATH, channel),
+                    s3_data_type="ManifestFile",
+                    s3_data_distribution_type=distribution_type,
+                )
+            ]
+        # The model, code and entrypoint inputs leave 7 of the 10 inputs of a processing job
+        if len(files) > 7:
+            raise Exception("Processing transform dataFiles should not exceed 7, use a prefix or a manifestFile")
+
+        return [
+            ProcessingInput(
+                input_name=file.get("sourceName"),
+                source=self._get_s3_uri(file.get("fileName"), s3_bucket_name, bucket_prefix),
+                destination=os.path.join(INPUT_LOCAL_FILEPATH, channel, file.get("sourceName", "")),
+                s3_data_distribution_type=distribution_type,
+            )
+            for file in files
+        ]
+
+    def _get_processing_outputs(self, channel: str) -> list:
+        """
+        Method to retreive SageMaker processing outputs, named after the channel
+
+        Returns:
+        ----------
+        - SageMaker Processing Outputs list
+        """
+        conf = self.config.get(f"models.{self.model_name}.processing_transform.channels.{channel}")
+        destination = None
+        if conf.get("s3BucketName"):
+            bucket_prefix = conf.get("inputBucketPrefix") + "/" if conf.get("inputBucketPrefix") else ""
+            destination = (
+                f"s3://{conf.get('s3BucketName')}/{bucket_prefix}{self.model_name}/predictions/processing-transform"
+            )
+
+        return [
+            ProcessingOutput(
+                output_name=channel,
+                source=os.path.join(OUTPUT_LOCAL_FILEPATH, channel),
+                destination=destination,
+                s3_upload_mode="EndOfJob",
+            )
+        ]
+
+    def _get_env(self, args: dict, channel: str, packed_variants: list) -> dict:
+        """
+        Method to pass the model, input and output locations to the scoring script, and the
+        variants of a packed model, found in SMP_MODEL_DIR/{variant}
+        """
+        env = dict(
+            SMP_MODEL_DIR=MODEL_LOCAL_FILEPATH,
+            SMP_INPUT_DIR=os.path.join(INPUT_LOCAL_FILEPATH, channel),
+            SMP_OUTPUT_DIR=os.path.join(OUTPUT_LOCAL_FILEPATH, channel),
+            SMP_CONTENT_TYPE=args["content_type"],
+            SMP_ACCEPT=args["accept"],
+        )
+        if packed_variants:
+            env["SMP_MODEL_VARIANTS"] = ",".join(packed_variants)
+        env.update(args["env"] or {})
+        return env
+
+    def processing_transform(self, step_train: TrainingStep) -> dict:
+        """
+        Method to setup the SageMaker ProcessingStep scoring the channel with the trained model
+
+        Args:
+        ----------
+        - step_train (TrainingStep): SageMaker Training Step providing the model artifacts
+
+        Returns:
+        ----------
+        - Processing step arguments
+        """
+        self.logger.log_info(f"{'-' * 40} {self.model_name} {'-' * 40}")
+        self.logger.log_info(f"Starting {self.model_name} processing transform")
+
+        args = self._args()
+        network_config = self._get_network_config()
+        channel = self._get_channel()
+
+        # model.tar.gz archive, or the model files of an uncompressed training output
+        model_data = get_model_data(step_train)
+        model_input = ProcessingInput(
+            input_name="model",
+            source=model_data["S3DataSource"]["S3Uri"] if isinstance(model_data, dict) else model_data,
+            destination=MODEL_LOCAL_FILEPATH,
+        )
+        data_inputs = self._get_chain_input(channel) or self._get_static_input(channel)
+
+        entrypoint_command = args["entry_point"].replace("/", ".").replace(".py", "")
+        framework_processor = FrameworkProcessor(
+            image_uri=args["image_uri"],
+            framework_version=args["framework_version"],
+            estimator_cls=estimator.SKLearn,
+            role=args["role"],
+            command=["python", "-m", entrypoint_command],
+            instance_count=args["instance_count"],
+            instance_type=args["instance_type"],
+            volume_size_in_gb=args["volume_size_in_gb"],
+            max_runtime_in_seconds=args["max_runtime_seconds"],
+            base_job_name=args["base_job_name"],
+            tags=args["tags"],
+            env=self._get_env(args, channel, get_step_variants(step_train)),
+            volume_kms_key=args["kms_key"],
+            output_kms_key=args["kms_key"],
+            network_config=NetworkConfig(**network_config),
+            sagemaker_session=self._get_pipeline_session(),
+        )
+
+        step_process = framework_processor.run(
+            inputs=[model_input] + data_inputs,
+            outputs=self._get_processing_outputs(channel),
+            source_dir=args["source_directory"],
+            code=args["entry_point"],
+            job_name=args["base_job_name"],
+        )
+
+        return step_process
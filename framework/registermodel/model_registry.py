@@ -0,0 +1,119 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Import native libraries
+from typing import Union
+
+# Import third-party libraries
+from botocore.exceptions import ClientError
+
+# Error codes returned when the model package group does not exist
+MISSING_GROUP_ERROR_CODES = ("ValidationException", "ResourceNotFound", "ResourceNotFoundException")
+
+
+def get_model_package_group_name(config: dict, model_name: str, variant_name: str = None) -> str:
+    """
+    Get the model package group name used to register a model.
+
+    Args:
+        config (dict): The configuration.
+        model_name (str): The model in sagemaker pipeline.
+        variant_name (str): The variant of a packed model, registered in its own group.
+
+    Returns:
+        The model package group name.
+    """
+    if variant_name is not None:
+        return f"{config.get('models.projectName')}-{model_name}-{variant_name}"
+    return f"{config.get('models.projectName')}-{model_name}"
+
+
+def get_latest_model_package(
+        sagemaker_client,
+        model_package_group_name: str,
+        approval_status: str = "Approved",
+) -> Union[dict, None]:
+    """
+    Describe the latest model package of a group with the given approval status.
+
+    Args:
+        sagemaker_client: A boto3 SageMaker client.
+        model_package_group_name (str): The model package group name.
+        approval_status (str): The model approval status to filter on.
+
+    Returns:
+        The describe_model_package response, or None when the group has no such package or
+        does not exist. Other errors, such as access denied or throttling, are raised.
+    """
+    try:
+        response = sagemaker_client.list_model_packages(
+            ModelPackageGroupName=model_package_group_name,
+            ModelApprovalStatus=approval_status,
+            SortBy="CreationTime",
+            SortOrder="Descending",
+            MaxResults=1,
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in MISSING_GROUP_ERROR_CODES:
+            return None
+        raise
+
+    model_packages = response.get("ModelPackageSummaryList", [])
+    if not model_packages:
+        return None
+
+    return sagemaker_client.describe_model_package(
+        ModelPackageName=model_packages[0]["ModelPackageArn"]
+    )
+
+
+def get_model_package_data_uri(model_package: dict) -> Union[str, None]:
+    """
+    Get the model artifact location of a described model package.
+
+    Args:
+        model_package (dict): The describe_model_package response.
+
+    Returns:
+        The S3 location of the model artifact.
+    """
+    containers = model_package.get("InferenceSpecification", {}).get("Containers", [])
+    for container in containers:
+        if container.get("ModelDataUrl"):
+            return container["ModelDataUrl"]
+        model_data_source = container.get("ModelDataSource", {}).get("S3DataSource", {})
+        if model_data_source.get("S3Uri"):
+            return model_data_source["S3Uri"]
+    return None
+
+
+def get_model_package_statistics_uri(model_package: dict) -> Union[str, None]:
+    """
+    Get the model quality statistics location of a described model package.
+
+    Args:
+        model_package (dict): The describe_model_package response.
+
+    Returns:
+        The S3 location of the model_evaluation_metrics.json report registered with the package.
+    """
+    return (
+        model_package.get("ModelMetrics", {})
+        .get("ModelQuality", {})
+        .get("Statistics", {})
+        .get("S3Uri")
+    )
@@ -0,0 +1,238 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Import native libraries
+import json
+from typing import Union
+from urllib.parse import urlparse
+
+# Import third-party libraries
+import boto3
+from botocore.exceptions import ClientError
+from sagemaker.workflow.condition_step import ConditionStep
+from sagemaker.workflow.conditions import (
+    ConditionEquals,
+    ConditionGreaterThan,
+    ConditionGreaterThanOrEqualTo,
+    ConditionLessThan,
+    ConditionLessThanOrEqualTo,
+)
+from sagemaker.workflow.fail_step import FailStep
+from sagemaker.workflow.functions import JsonGet
+from sagemaker.workflow.pipeline_context import PipelineSession
+from sagemaker.workflow.steps import ProcessingStep
+
+# Import custom libraries
+from registermodel.model_registry import (
+    get_latest_model_package,
+    get_model_package_group_name,
+    get_model_package_statistics_uri,
+)
+from utilities.logger import Logger
+from utilities.tracing import trace_methods
+
+CONDITIONS = {
+    ">": ConditionGreaterThan,
+    "GreaterThan": ConditionGreaterThan,
+    ">=": ConditionGreaterThanOrEqualTo,
+    "GreaterThanOrEqualTo": ConditionGreaterThanOrEqualTo,
+    "<": ConditionLessThan,
+    "LessThan": ConditionLessThan,
+    "<=": ConditionLessThanOrEqualTo,
+    "LessThanOrEqualTo": ConditionLessThanOrEqualTo,
+    "==": ConditionEquals,
+    "Equals": ConditionEquals,
+}
+
+
+def get_json_value(document: dict, json_path: str) -> Union[float, None]:
+    """
+    Get the value at a dotted path (e.g. regression_metrics.mse.value) of a JSON document.
+
+    Args:
+        document (dict): The JSON document.
+        json_path (str): The dotted path.
+
+    Returns:
+        The value, or None when the path does not exist.
+    """
+    value = document
+    for key in json_path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+@trace_methods
+class QualityGateService:
+    """
+    Compile the registry.QualityGates of a model into a ConditionStep around its register step
+    """
+
+    def __init__(self, config: dict, model_name: str) -> "QualityGateService":
+        """
+        Initialization method to Create QualityGateService
+
+        Args:
+        ----------
+        - config (dict): Application configuration
+        - model_name (str): Name of Model
+        """
+        self.config = config
+        self.model_name = model_name
+        self.logger = Logger()
+        self._approved_report = None
+
+    def is_enabled(self) -> bool:
+        """
+        Method to check whether quality gates are configured for the model
+
+        Returns:
+        ----------
+        - True when registry.QualityGates has conditions
+        """
+        return bool(self.config.get(f"models.{self.model_name}.registry.QualityGates.conditions", []))
+
+    def _get_approved_report(self) -> dict:
+        """
+        Method to read the model_evaluation_metrics.json report of the latest approved model package,
+        at pipeline compile time
+
+        Returns:
+        ----------
+        - The report, empty when no approved package or report exists
+        """
+        if self._approved_report is not None:
+            return self._approved_report
+
+        self._approved_report = {}
+        model_package_group_name = get_model_package_group_name(self.config, self.model_name)
+        model_package = get_latest_model_package(
+            sagemaker_client=PipelineSession().sagemaker_client,
+            model_package_group_name=model_package_group_name,
+        )
+        statistics_uri = get_model_package_statistics_uri(model_package) if model_package else None
+        if statistics_uri is None:
+            self.logger.log_warning(f"No approved model package with statistics found in {model_package_group_name}.")
+            return self._approved_report
+
+        parsed_uri = urlparse(statistics_uri)
+        try:
+            response = boto3.client("s3").get_object(Bucket=parsed_uri.netloc, Key=parsed_uri.path.lstrip("/"))
+            self._approved_report = json.loads(response["Body"].read())
+        except (ClientError, ValueError) as error:
+            self.logger.log_warning(f"Failed to read the approved model statistics {statistics_uri}: {error}")
+            return self._approved_report
+
+        self.logger.log_info(f"Quality gates compare to {model_package['ModelPackageArn']}: {statistics_uri}")
+        return self._approved_report
+
+    def get_conditions(self, metrics_step: ProcessingStep) -> list:
+        """
+        Method to build the conditions on the EvaluationReport of the Metrics step
+
+        Args:
+        ----------
+        - metrics_step (ProcessingStep): The step with the EvaluationReport property file
+
+        Returns:
+        ----------
+        - List of SageMaker conditions
+        """
+        conditions = []
+        for gate in self.config.get(f"models.{self.model_name}.registry.QualityGates.conditions", []):
+            metric = gate.get("metric")
+            operator = gate.get("operator", ">=")
+            if metric is None or operator not in CONDITIONS:
+                raise Exception(
+                    f"Quality gate of {self.model_name} needs a metric and an operator in {list(CONDITIONS)}: {gate}"
+                )
+
+            thresholds = []
+            if gate.get("threshold") is not None:
+                thresholds.append(float(gate.get("threshold")))
+            if gate.get("compare_to_approved", False):
+                approved_value = get_json_value(self._get_approved_report(), metric)
+                if isinstance(approved_value, (int, float)):
+                    thresholds.append(approved_value + float(gate.get("margin", 0.0)))
+                else:
+                    self.logger.log_warning(f"Quality gate on {metric} has no approved value to compare to, skipped.")
+            if not thresholds and not gate.get("compare_to_approved", False):
+                raise Exception(f"Quality gate of {self.model_name} needs a threshold or compare_to_approved: {gate}")
+
+            for threshold in thresholds:
+                self.logger.log_info(f"Quality gate of {self.model_name}: {metric} {operator} {threshold}")
+                conditions.append(
+                    CONDITIONS[operator](
+                        left=JsonGet(
+                            step_name=metrics_step.name,
+                            property_file=metrics_step.property_files[0],
+                            json_path=metric,
+                        ),
+                        right=threshold,
+                    )
+                )
+        return conditions
+
+    def gate(self, step_name: str, metrics_step: ProcessingStep,
+             register_model_steps: list) -> ConditionStep:
+        """
+        Method to run the register steps only when the model passes the quality gates
+
+        Args:
+        ----------
+        - step_name (str): The RegisterModel step name
+        - metrics_step (ProcessingStep): The step with the EvaluationReport property file
+        - register_model_steps (list): The register steps, one per variant of a packed model
+
+        Returns:
+        ----------
+        - ConditionStep around the register steps
+        """
+        if metrics_step is None:
+            raise Exception("Quality gates require a Metrics step before the RegisterModel step.")
+        variant_names = [getattr(step, "variant_name", None) for step in register_model_steps]
+        if any(variant_names):
+            # one evaluation report and one approved package can't gate several model package groups
+            raise Exception(
+                f"Quality gates of {self.model_name} can't be combined with packed variants: {variant_names}"
+            )
+        conditions = self.get_conditions(metrics_step)
+        if not conditions:
+            # an always passing condition keeps the {step_name}-QualityGate step in the pipeline,
+            # it compares to the approved package once one exists
+            self.logger.log_warning(
+                f"Quality gates of {self.model_name} have no condition to check, registration ungated."
+            )
+            conditions = [ConditionEquals(left=1, right=1)]
+
+        else_steps = []
+        if self.config.get(f"models.{self.model_name}.registry.QualityGates.fail_on_reject", True):
+            else_steps.append(
+                FailStep(
+                    name=f"{step_name}-Rejected",
+                    error_message=f"{self.model_name} did not pass the quality gates, it is not registered.",
+                )
+            )
+
+        return ConditionStep(
+            name=f"{step_name}-QualityGate",
+            conditions=conditions,
+            if_steps=register_model_steps,
+            else_steps=else_steps,
+        )
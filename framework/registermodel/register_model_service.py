@@ -17,21 +17,33 @@
 
 from sagemaker.model import ModelPackage
 from sagemaker.workflow.execution_variables import ExecutionVariables
+from sagemaker.workflow.model_step import ModelStep
 from sagemaker.model_metrics import MetricsSource, ModelMetrics
 from sagemaker.workflow.steps import ProcessingStep, TrainingStep
 
 from createmodel.create_model_service import CreateModelService
+from registermodel.model_registry import get_model_package_group_name
+from utilities.tracing import trace_methods
 
 
+@trace_methods
 class RegisterModelService:
     def __init__(self, config: dict, model_name: str):
         self.config = config
         self.model_name = model_name
 
-    def register_model(self, step_metrics: ProcessingStep, step_train: TrainingStep) -> ModelPackage:
+    def register_model(self, step_metrics: ProcessingStep, step_train: TrainingStep,
+                       step_create_model: ModelStep = None, variant_name: str = None) -> ModelPackage:
         create_model_service = CreateModelService(self.config, self.model_name)
         model_package_dict = self.config.get(f"models.{self.model_name}.registry")
-        model = create_model_service.create_model(step_train=step_train)
+        if variant_name is not None:
+            # each variant of a packed model is registered from its own model prefix
+            model = create_model_service.create_model(step_train=step_train, variant_name=variant_name)
+        elif step_create_model is not None:
+            # the model repacked by the CreateModel step is registered as is
+            model = create_model_service.get_repacked_model(step_train, step_create_model)
+        else:
+            model = create_model_service.create_model(step_train=step_train)
 
         if step_metrics:
             model_metrics = ModelMetrics(
@@ -56,7 +68,7 @@ class RegisterModelService:
             response_types=inference_spec_dict.get("supported_response_MIME_types"),
             inference_instances=inference_spec_dict.get("SupportedRealtimeInferenceInstanceTypes", ["ml.m5.2xlarge"]),
             transform_instances=inference_spec_dict.get("SupportedTransformInstanceTypes", ["ml.m5.2xlarge"]),
-            model_package_group_name=f"{self.config.get('models.projectName')}-{self.model_name}",
+            model_package_group_name=get_model_package_group_name(self.config, self.model_name, variant_name),
             marketplace_cert=False,
             description=model_package_dict.get(
                 "ModelPackageDescription",
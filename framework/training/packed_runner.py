@@ -0,0 +1,145 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Entry point of packed training jobs. TrainingService ships this file next to the model
+# source code as packed_runner.py. It trains every model variant with the configured entry
+# point in parallel processes, and only depends on the Python standard library.
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENTRY_POINT_ENV = "SMP_PACKED_ENTRY_POINT"
+VARIANTS_ENV = "SMP_PACKED_VARIANTS"
+MAX_WORKERS_ENV = "SMP_PACKED_MAX_WORKERS"
+VARIANT_NAME_ENV = "SMP_VARIANT_NAME"
+REPORT_FILE_NAME = "packed_report.json"
+
+
+def to_cli_args(hyperparameters: dict) -> list:
+    """
+    Render hyperparameters as the command line arguments SageMaker passes to entry points.
+    """
+    cli_args = []
+    for key, value in sorted(hyperparameters.items()):
+        cli_args += [f"--{key}", value if isinstance(value, str) else json.dumps(value)]
+    return cli_args
+
+
+def get_variant_env(variant_name: str, variant: dict, hyperparameters: dict) -> dict:
+    """
+    Environment of the process training a variant: its own model and output data directories,
+    hyperparameters and variant environment variables.
+
+    Args:
+        variant_name (str): The variant name.
+        variant (dict): The variant configuration, with optional hyperparams and env.
+        hyperparameters (dict): The hyperparameters of the variant.
+
+    Returns:
+        The environment dictionary.
+    """
+    env = dict(os.environ)
+    env.update(
+        SM_MODEL_DIR=os.path.join(os.environ.get("SM_MODEL_DIR", "/opt/ml/model"), variant_name),
+        SM_OUTPUT_DATA_DIR=os.path.join(os.environ.get("SM_OUTPUT_DATA_DIR", "/opt/ml/output/data"), variant_name),
+        SM_HPS=json.dumps(hyperparameters),
+    )
+    env[VARIANT_NAME_ENV] = variant_name
+    for key, value in hyperparameters.items():
+        env[f"SM_HP_{key.upper()}"] = value if isinstance(value, str) else json.dumps(value)
+    env.update({key: str(value) for key, value in (variant.get("env") or {}).items()})
+    return env
+
+
+def run_variant(variant_name: str, variant: dict, entry_point: str, code_directory: str) -> dict:
+    """
+    Train one variant with the entry point, in its own process.
+
+    Args:
+        variant_name (str): The variant name.
+        variant (dict): The variant configuration.
+        entry_point (str): The training entry point, relative to code_directory.
+        code_directory (str): The directory holding the model source code.
+
+    Returns:
+        The variant run report.
+    """
+    hyperparameters = json.loads(os.environ.get("SM_HPS", "{}"))
+    hyperparameters.update(variant.get("hyperparams") or {})
+    env = get_variant_env(variant_name, variant, hyperparameters)
+    os.makedirs(env["SM_MODEL_DIR"], exist_ok=True)
+    os.makedirs(env["SM_OUTPUT_DATA_DIR"], exist_ok=True)
+
+    log_path = os.path.join(env["SM_OUTPUT_DATA_DIR"], "training.log")
+    start_time = time.time()
+    with open(log_path, "w") as log:
+        exit_code = subprocess.call(
+            [sys.executable, entry_point] + to_cli_args(hyperparameters),
+            cwd=code_directory,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    end_time = time.time()
+
+    # logs of parallel variants are printed once each variant ends, to keep them readable
+    with open(log_path, "r") as log:
+        for line in log:
+            print(f"[{variant_name}] {line}", end="", flush=True)
+
+    return dict(
+        variant_name=variant_name,
+        status="Succeeded" if exit_code == 0 else "Failed",
+        exit_code=exit_code,
+        start_time=start_time,
+        end_time=end_time,
+        duration_seconds=round(end_time - start_time, 3),
+    )
+
+
+def main() -> int:
+    code_directory = os.path.dirname(os.path.abspath(__file__))
+    entry_point = os.environ[ENTRY_POINT_ENV]
+    variants = json.loads(os.environ[VARIANTS_ENV])
+    max_workers = int(os.environ.get(MAX_WORKERS_ENV) or os.cpu_count() or 1)
+
+    print(f"Training {len(variants)} variants of {entry_point} with {max_workers} workers", flush=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(run_variant, variant_name, variant, entry_point, code_directory)
+            for variant_name, variant in variants.items()
+        ]
+        reports = [future.result() for future in futures]
+
+    failed = [report["variant_name"] for report in reports if report["exit_code"] != 0]
+    report = dict(entry_point=entry_point, status="Failed" if failed else "Succeeded", variants=reports)
+    with open(os.path.join(os.environ.get("SM_MODEL_DIR", "/opt/ml/model"), REPORT_FILE_NAME), "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2), flush=True)
+
+    if failed:
+        print(f"Variants failed: {failed}", flush=True)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,15 +16,33 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 # Import native libraries
+import json
 import os
 from typing import Tuple
 
 from pipeline.helper import get_chain_input_file, look_up_step_type_from_step_name
+from pipeline.packed_variants import get_packed_variants
+from registermodel.model_registry import (
+    get_latest_model_package,
+    get_model_package_data_uri,
+    get_model_package_group_name
+)
 from sagemaker.estimator import Estimator
 from sagemaker.inputs import TrainingInput
 from sagemaker.workflow.pipeline_context import PipelineSession
-
-
+from training import packed_runner
+from utilities.logger import Logger
+from utilities.sizing import SizingService
+from utilities.packaging import (
+    DEFAULT_MAX_FILE_SIZE_MB,
+    format_dependency_report,
+    select_dependencies,
+    stage_files
+)
+from utilities.tracing import trace_methods
+
+
+@trace_methods
 class TrainingService:
     """
     Class to handle SageMaker Training Service
@@ -43,6 +61,7 @@ class TrainingService:
         self.step_config = step_config
         self.domain_section = self.step_config.get("step_type", "train")
         self.model_step_dict = model_step_dict
+        self.logger = Logger()
 
     def _get_network_config(self) -> dict:
         """
@@ -101,13 +120,73 @@ class TrainingService:
             env=conf.get("env", None),
             source_directory=source_dir,
             output_path=conf.get("output_path"),
+            compression_type=conf.get("compression_type", "GZIP"),
+            packed_variants=get_packed_variants(self.config, self.model_name, self.domain_section),
+            packed_max_workers=conf.get("packed_variants.max_workers", None),
             hyperparams=conf.get("hyperparams", None),
             model_data_uri=conf.get("model_data_uri", None),
+            warm_start=conf.get("warm_start.enabled", False),
+            warm_start_approval_status=conf.get("warm_start.approval_status", "Approved"),
+            dependencies_include=conf.get("dependencies.include", None),
+            dependencies_exclude=conf.get("dependencies.exclude", None),
+            dependencies_max_file_size_mb=conf.get("dependencies.max_file_size_mb", DEFAULT_MAX_FILE_SIZE_MB),
             role=self.config.get("sagemakerNetworkSecurity.role"),
             kms_key=self.config.get("sagemakerNetworkSecurity.kms_key", None)
         )
 
-        return args
+        if args["packed_variants"]:
+            # every variant is registered from its own uncompressed model prefix
+            if conf.get("compression_type", "None") != "None":
+                raise Exception(f"Packed variants of {self.model_name} need compression_type \"None\".")
+            args["compression_type"] = "None"
+            # variants are registered in their own model package groups
+            if args["warm_start"]:
+                raise Exception(f"warm_start is not supported with packed variants of {self.model_name}.")
+
+        static_input_uris = [
+            self._get_static_input_source(conf.get(f"channels.{channel}.dataFiles")[0], channel)
+            for channel in conf.get("channels", {}).keys() if conf.get(f"channels.{channel}.dataFiles", [])
+        ]
+        return SizingService(self.config, self.model_name, self.domain_section).size(
+            args,
+            static_input_uris,
+            sharded=conf.get("distribution", "FullyReplicated") == "ShardedByS3Key",
+        )
+
+    def _get_warm_start_model_uri(self, args: dict) -> str:
+        """
+        Method to resolve the model artifact used to warm start the training job
+
+        When warm_start is enabled, the artifact of the latest package with the configured approval
+        status in the model package group created by RegisterModelService is used. The static
+        model_data_uri is used when warm_start is disabled or when no such package exists yet.
+
+        Returns:
+        ----------
+        - S3 location of the model artifact, or None
+        """
+        if not args["warm_start"]:
+            return args["model_data_uri"]
+
+        model_package_group_name = get_model_package_group_name(self.config, self.model_name)
+        model_package = get_latest_model_package(
+            sagemaker_client=self._get_pipeline_session().sagemaker_client,
+            model_package_group_name=model_package_group_name,
+            approval_status=args["warm_start_approval_status"],
+        )
+        model_data_uri = get_model_package_data_uri(model_package) if model_package else None
+
+        if model_data_uri is None:
+            self.logger.log_warning(
+                f"No {args['warm_start_approval_status']} model package found in {model_package_group_name}. "
+                f"Training {self.model_name} from model_data_uri: {args['model_data_uri']}"
+            )
+            return args["model_data_uri"]
+
+        self.logger.log_info(
+            f"Warm starting {self.model_name} from {model_package['ModelPackageArn']}: {model_data_uri}"
+        )
+        return model_data_uri
 
     def _get_static_input_list(self) -> list:
         """
@@ -125,6 +204,21 @@ class TrainingService:
             conf.get(f"channels.{channel}.dataFiles", [])[0])
         return input_files_list
 
+    def _get_static_input_source(self, file: dict, channel: str) -> str:
+        """
+        Method to resolve a dataFiles entry of a channel into its S3 source
+
+        Returns:
+        ----------
+        - S3 URI of the input
+        """
+        if file.get("fileName").startswith("s3://"):
+            return file.get("fileName")
+        conf = self.config.get(f"models.{self.model_name}.{self.domain_section}")
+        bucket = conf.get("channels.train.s3Bucket")
+        input_prefix = conf.get("channels.train.s3InputPrefix", "")
+        return os.path.join(bucket, input_prefix, "data", channel, file.get("fileName"))
+
     def _get_static_input(self, channel) -> Tuple[list, int]:
         """
         Method to retreive SageMaker static inputs
@@ -146,15 +240,8 @@ class TrainingService:
         distribution = conf.get("distribution", "FullyReplicated")
 
         for file in input_files_list:
-            if file.get("fileName").startswith("s3://"):
-                _source = file.get("fileName")
-            else:
-                bucket = conf.get("channels.train.s3Bucket")
-                input_prefix = conf.get("channels.train.s3InputPrefix", "")
-                _source = os.path.join(bucket, input_prefix, "data", channel, file.get("fileName"))
-
             training_input = TrainingInput(
-                s3_data=_source,
+                s3_data=self._get_static_input_source(file, channel),
                 content_type=content_type,
                 input_mode=input_mode,
                 distribution=distribution,
@@ -207,18 +294,79 @@ class TrainingService:
 
         return training_channel_inputs
 
+    def _get_training_dependencies(self, args: dict, entry_directory: str) -> list:
+        """
+        Method to select the source directory content packaged along the training entry point
+
+        Files are filtered with the dependencies include/exclude globs, the .smpignore file of the
+        source directory and the large file threshold, then staged in a directory named after their
+        content. Files of the entry point directory, uploaded as source_dir, are left out, and so are
+        top-level files with the name of an entry point directory file, which takes precedence.
+
+        Returns:
+        ----------
+        - List of top-level paths to pass as Estimator dependencies
+        """
+        selected_files, report = select_dependencies(
+            source_directory=args["source_directory"],
+            include=args["dependencies_include"],
+            exclude=args["dependencies_exclude"],
+            max_file_size_mb=args["dependencies_max_file_size_mb"],
+        )
+        self.logger.log_info(lambda: format_dependency_report(report))
+
+        entry_prefix = f"{os.path.relpath(entry_directory, args['source_directory'])}/"
+        selected_files = [
+            f for f in selected_files
+            if not f.startswith(entry_prefix) and not ("/" not in f and os.path.isfile(os.path.join(entry_directory, f)))
+        ]
+        if not selected_files:
+            return None
+
+        staging_directory = stage_files(args["source_directory"], selected_files, prefix="smp-train-dependencies-")
+        return [os.path.join(staging_directory, f) for f in sorted(os.listdir(staging_directory))]
+
+    def _stage_packed_source_directory(self, source_directory: str) -> str:
+        """
+        Method to stage the entry point directory with the packed runner
+
+        Returns:
+        ----------
+        - Staging directory path
+        """
+        selected_files, _ = select_dependencies(source_directory=source_directory, max_file_size_mb=None)
+        return stage_files(
+            source_directory, selected_files, prefix="smp-train-packed-", extra_files=[packed_runner.__file__]
+        )
+
     def _run_training_step(self, args: dict):
         if "/" in args["entry_point"]:
             train_source_dir = f"{args['source_directory']}/{args['entry_point'].rsplit('/', 1)[0]}"
             train_entry_point = args["entry_point"].rsplit("/", 1)[1]
-            train_dependencies = [
-                os.path.join(args["source_directory"], f) for f in os.listdir(args["source_directory"])
-            ]
+            train_dependencies = self._get_training_dependencies(args, train_source_dir)
         else:
             train_source_dir = args["source_directory"]
             train_entry_point = args["entry_point"]
             train_dependencies = None
 
+        environment = args["env"]
+        if args["packed_variants"]:
+            # the packed runner trains every variant with the entry point in parallel processes
+            environment = dict(
+                environment or {},
+                **{
+                    packed_runner.ENTRY_POINT_ENV: train_entry_point,
+                    packed_runner.VARIANTS_ENV: json.dumps(args["packed_variants"]),
+                    packed_runner.MAX_WORKERS_ENV: str(args["packed_max_workers"] or ""),
+                }
+            )
+            train_source_dir = self._stage_packed_source_directory(train_source_dir)
+            train_entry_point = os.path.basename(packed_runner.__file__)
+            self.logger.log_info(
+                f"Training {len(args['packed_variants'])} packed variants of {self.model_name}: "
+                f"{list(args['packed_variants'])}"
+            )
+
         estimator = Estimator(
             role=args["role"],
             image_uri=args["image_uri"],
@@ -227,14 +375,16 @@ class TrainingService:
             volume_size=args["volume_size_in_gb"],
             max_run=args["max_runtime_seconds"],
             output_path=args["output_path"],
+            # model files are uploaded under output/model/ instead of a model.tar.gz archive
+            disable_output_compression=args["compression_type"] == "None",
             base_job_name=args["base_job_name"],
             hyperparameters=args["hyperparams"],
             tags=args["tags"],
             model_uri=args["model_data_uri"],
-            environment=args["env"],
+            environment=environment,
             source_dir=train_source_dir,
             entry_point=train_entry_point,
-            dependences=train_dependencies,
+            dependencies=train_dependencies,
             sagemaker_session=self._get_pipeline_session()
         )
 
@@ -252,6 +402,7 @@ class TrainingService:
 
         train_conf = self.config.get(f"models.{self.model_name}.{self.domain_section}")
         args = self._args()
+        args["model_data_uri"] = self._get_warm_start_model_uri(args)
         estimator = self._run_training_step(args)
 
         training_channel_inputs = {}
@@ -16,17 +16,25 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 # Import native libraries
+import hashlib
+import json
+import os
 from typing import Union, Tuple
 
 from pipeline.helper import get_chain_input_file
 # Import third-party libraries
+from sagemaker.s3 import S3Uploader
 from sagemaker.transformer import Transformer
 from sagemaker.workflow.functions import Join
 from sagemaker.workflow.pipeline_context import PipelineSession
 # Import custom libraries
 from utilities.logger import Logger
+from utilities.sizing import SizingService
+from utilities.utils import S3Utilities
+from utilities.tracing import trace_methods
 
 
+@trace_methods
 class TransformService:
     """
     SageMaker Transform Step service.
@@ -69,6 +77,16 @@ class TransformService:
         )
         return network_config_kwargs
 
+    def _get_pipeline_session(self) -> PipelineSession:
+        """
+        Method to retreive SageMaker pipeline session
+
+        Returns:
+        ----------
+        - SageMaker Pipeline Session
+        """
+        return PipelineSession(default_bucket=self.config.get("models.s3Bucket"))
+
     def _args(self) -> dict:
         """
         Parse method to retreive all arguments to be used to create the Model
@@ -91,6 +109,10 @@ class TransformService:
             join_source=conf.get(f"{self.model_name}.transform.join_source", None),
             split_type=conf.get(f"{self.model_name}.transform.split_type", None),
             content_type=conf.get(f"{self.model_name}.transform.content_type", "text/csv"),
+            accept=conf.get(
+                f"{self.model_name}.transform.accept",
+                conf.get(f"{self.model_name}.transform.content_type", "text/csv"),
+            ),
             max_payload=conf.get(f"{self.model_name}.transform.max_payload", None),
             volume_size=conf.get(f"{self.model_name}.transform.volume_size", 50),
             max_runtime_in_seconds=conf.get(f"{self.model_name}.transform.max_runtime_in_seconds", 3600),
@@ -98,22 +120,159 @@ class TransformService:
             output_filter=conf.get(f"{self.model_name}.transform.output_filter", None),
             tags=conf.get(f"{self.model_name}.transform.tags", None),
             env=conf.get(f"{self.model_name}.transform.env", None),
+            max_concurrent_transforms=conf.get(
+                f"{self.model_name}.transform.max_concurrent_transforms",
+                self._get_model_server_workers(conf.get(f"{self.model_name}.transform.env", None)),
+            ),
+        )
+
+        # batch transform distributes the input objects between the instances, and has no volume size
+        return SizingService(self.config, self.model_name, "transform").size(
+            args, self._get_static_input_uris(), sharded=True, volume_field=None
+        )
+
+    def _get_static_input_uris(self) -> list:
+        """
+        Method to retreive the S3 URIs of the dataFiles transformed when no chain input is used
+
+        Returns:
+        ----------
+        - S3 URIs list, empty for chain inputs and manifest files
+        """
+        transform_data = self.config.get(f"models.{self.model_name}.transform")
+        if self.step_config.get("chain_input_source_step") or not isinstance(transform_data.get("channels"), dict):
+            return []
+        channel_full_name = f"channels.{list(transform_data.get('channels').keys())[0]}"
+        bucket_prefix = transform_data.get(f"{channel_full_name}.inputBucketPrefix") + '/' if transform_data.get(
+            f"{channel_full_name}.inputBucketPrefix") else ""
+        s3_bucket_name = transform_data.get(f"{channel_full_name}.s3BucketName")
+        return [
+            self._get_s3_uri(file.get("fileName"), s3_bucket_name, bucket_prefix)
+            for file in transform_data.get(f"{channel_full_name}.dataFiles", None) or []
+        ]
+
+    def _get_model_server_workers(self, env: Union[dict, None]) -> Union[int, None]:
+        """
+        Method to retreive the number of model server workers set in the transform environment
+
+        One concurrent transform per model server worker keeps every worker busy.
+
+        Args:
+        ----------
+        - env (dict): Transform environment variables
+
+        Returns:
+        ----------
+        - Number of workers, or None when not set
+        """
+        workers = (env or {}).get("SAGEMAKER_MODEL_SERVER_WORKERS")
+        return int(workers) if workers else None
+
+    def _get_s3_uri(self, file_name: str, s3_bucket_name: str, bucket_prefix: str) -> str:
+        """
+        Method to resolve a dataFiles entry into an S3 URI
+
+        Args:
+        ----------
+        - file_name (str): fileName entry, either an S3 URI or a key relative to the channel bucket prefix
+        - s3_bucket_name (str): Channel bucket name
+        - bucket_prefix (str): Channel bucket prefix, ending with "/" when not empty
+
+        Return
+        ----------
+        - S3 URI (str)
+        """
+        if file_name.startswith("s3://"):
+            return file_name
+        return f"s3://{s3_bucket_name}/{bucket_prefix}{file_name}"
+
+    def _upload_manifest(self, s3_uris: list, s3_bucket_name: str, bucket_prefix: str) -> str:
+        """
+        Method to create and upload a manifest file referencing several input files
+
+        The manifest is content addressed so that unchanged inputs keep the same
+        TransformStep arguments, and pipeline caching keeps working.
+
+        Args:
+        ----------
+        - s3_uris (list): S3 URIs of the input files
+        - s3_bucket_name (str): Channel bucket name, used to store the manifest
+        - bucket_prefix (str): Channel bucket prefix
+
+        Return
+        ----------
+        - manifest_s3path (str): Manifest file location
+        """
+        prefixes = [uri for uri in s3_uris if uri.endswith("/")]
+        if prefixes:
+            raise Exception(
+                f"S3 prefixes {prefixes} cannot be combined with other dataFiles in the Transform step. "
+                f"Use a single prefix entry or list files only."
+            )
+
+        buckets = {S3Utilities.split_s3_uri(uri)[0] for uri in s3_uris}
+        if len(buckets) != 1:
+            raise Exception(f"All Transform dataFiles must be stored in the same S3 bucket. {buckets} found.")
+
+        common_prefix = os.path.commonprefix(s3_uris)
+        common_prefix = common_prefix[:common_prefix.rindex("/") + 1]
+        manifest_data = [{"prefix": common_prefix}] + [uri[len(common_prefix):] for uri in s3_uris]
+        manifest_body = json.dumps(manifest_data)
+        manifest_hash = hashlib.sha256(manifest_body.encode("utf-8")).hexdigest()[:16]
+
+        manifest_s3path = (
+            f"s3://{s3_bucket_name}/{bucket_prefix}{self.model_name}/manifests/transform/{manifest_hash}.manifest"
+        )
+        S3Uploader.upload_string_as_file_body(
+            body=manifest_body,
+            desired_s3_uri=manifest_s3path,
+            kms_key=self.config.get("sagemakerNetworkSecurity.kms_key"),
+            sagemaker_session=self._get_pipeline_session(),
         )
+        self.logger.log_info(f"During TransformService, manifest of {len(s3_uris)} files uploaded to {manifest_s3path}")
 
-        return args
+        return manifest_s3path
 
-    def _get_train_inputs_outputs(self, transform_data: dict) -> Tuple[str, str]:
+    def _log_sharding(self, number_of_objects: Union[int, None], instance_count: int) -> None:
+        """
+        Method to report how input objects are distributed across the transform instances
+
+        SageMaker Batch Transform distributes input objects, not records, across instances. The
+        report is advisory: the input objects are not split into more objects.
+
+        Args:
+        ----------
+        - number_of_objects (int): Number of input objects, None when unknown at compile time
+        - instance_count (int): Number of transform instances
+        """
+        if number_of_objects is None:
+            self.logger.log_info(
+                f"During TransformService, objects under the input prefix are distributed across "
+                f"{instance_count} instance(s)."
+            )
+        elif isinstance(instance_count, int) and number_of_objects < instance_count:
+            self.logger.log_warning(
+                f"During TransformService, {number_of_objects} input object(s) for {instance_count} instances. "
+                f"Only {number_of_objects} instance(s) will receive data, split the input into more files."
+            )
+
+    def _get_train_inputs_outputs(self, transform_data: dict, instance_count: int) -> Tuple[str, str, str]:
         """
         Method to retreive dynamically the files to be Transformed
 
+        A channel can reference a manifestFile, a single file or S3 prefix (ending with "/"),
+        or a list of files which is turned into a manifest file.
+
         Args:
         ----------
         - transform_data (dict): Dictionary of files
+        - instance_count (int): Number of transform instances
 
         Return
         ----------
         - input_data_file_s3path (str): Input path location
         - output_file_s3path (str): Output path location
+        - data_type (str): Input data type, S3Prefix or ManifestFile
         """
 
         evaluate_channels = list(transform_data.get("channels", "train").keys())
@@ -121,7 +280,7 @@ class TransformService:
             raise Exception(f"Only one channel allowed within Transform evaluate section. {evaluate_channels} found.")
         else:
             channel = evaluate_channels[0]
-            self.logger.log_info("INFO", f"During TransformService, one evaluate channel {channel} found.")
+            self.logger.log_info(f"During TransformService, one evaluate channel {channel} found.")
 
         channel_full_name = f"channels.{channel}"
         bucket_prefix = transform_data.get(f"{channel_full_name}.inputBucketPrefix") + '/' if transform_data.get(
@@ -130,31 +289,51 @@ class TransformService:
 
         # Transform data source
         files = list(transform_data.get(f"{channel_full_name}.dataFiles", ""))
-
-        if len(files) == 1:
+        manifest_file = transform_data.get(f"{channel_full_name}.manifestFile")
+        data_type = "S3Prefix"
+
+        if manifest_file:
+            if files:
+                raise Exception("Transform channel can define either manifestFile or dataFiles, not both.")
+            self.logger.log_info(f"During TransformService, manifest file {manifest_file} found.")
+            input_data_file_s3path = self._get_s3_uri(manifest_file, s3_bucket_name, bucket_prefix)
+            data_type = "ManifestFile"
+            self._log_sharding(None, instance_count)
+
+        elif len(files) == 1:
             file = files[0]
-            self.logger.log_info("During TransformService, one evaluate file {file} found.")
-            file_name = file.get("fileName")
-
-            if file_name.startswith("s3://"):
-                input_data_file_s3path = file_name
-            else:
-                input_data_file_s3path = f"s3://{s3_bucket_name}/{bucket_prefix}/{file_name}"
+            self.logger.log_info(f"During TransformService, one evaluate file {file} found.")
+            input_data_file_s3path = self._get_s3_uri(file.get("fileName"), s3_bucket_name, bucket_prefix)
+            self._log_sharding(None if input_data_file_s3path.endswith("/") else 1, instance_count)
 
         elif len(files) == 0:
-            self.logger.log_info("INFO", "During TransformService, no evaluate file found.")
+            self.logger.log_info("During TransformService, no evaluate file found.")
             input_data_file_s3path = None
         else:
-            raise Exception(f"Maximum one file allowed within evaluation.dataFiles section. {len(files)} found.")
+            self.logger.log_info(f"During TransformService, {len(files)} evaluate files found.")
+            input_data_file_s3path = self._upload_manifest(
+                [self._get_s3_uri(file.get("fileName"), s3_bucket_name, bucket_prefix) for file in files],
+                s3_bucket_name,
+                bucket_prefix,
+            )
+            data_type = "ManifestFile"
+            self._log_sharding(len(files), instance_count)
 
         output_file_s3path = f"s3://{s3_bucket_name}/{bucket_prefix}{self.model_name}/predictions/transform"
 
-        return input_data_file_s3path, output_file_s3path
+        return input_data_file_s3path, output_file_s3path, data_type
 
-    def _get_chain_input(self):
+    def _get_chain_input(self, instance_count: int):
         """
         Method to retreive SageMaker chain inputs
 
+        The chain input is read as an S3 prefix, every object under
+        chain_input_additional_prefix is transformed and distributed across instances.
+
+        Args:
+        ----------
+        - instance_count (int): Number of transform instances
+
         Returns:
         ----------
         - SageMaker Processing Inputs list
@@ -164,14 +343,12 @@ class TransformService:
             raise Exception("Transform step can only have one channel.")
         channel_name = list(channels_conf.keys())[0]
 
-        dynamic_processing_input = []
         chain_input_source_step = self.step_config.get("chain_input_source_step", [])
         chain_input_additional_prefix = self.step_config.get("chain_input_additional_prefix", "")
-        args = self._args()
 
         if len(chain_input_source_step) == 1:
             self.logger.log_info(
-                "INFO", f"During TransformService, chain input source step {chain_input_source_step} found."
+                f"During TransformService, chain input source step {chain_input_source_step} found."
             )
             for source_step_name in chain_input_source_step:
                 chain_input_path = get_chain_input_file(
@@ -181,10 +358,11 @@ class TransformService:
                 )
 
                 input_data_file_s3path = Join("/", [chain_input_path, chain_input_additional_prefix])
+            self._log_sharding(None, instance_count)
 
         elif len(chain_input_source_step) == 0:
             self.logger.log_info(
-                "INFO", "During TransformService, no chain input found. Input from transform.dataFiles"
+                "During TransformService, no chain input found. Input from transform.dataFiles"
             )
             return None
         else:
@@ -201,6 +379,7 @@ class TransformService:
             network_config: dict,
             sagemaker_model_name: str,
             args: dict,
+            data_type: str = "S3Prefix",
     ) -> dict:
         """
         Method to setup a SageMaker Transformer and Transformer arguments
@@ -212,6 +391,7 @@ class TransformService:
         - network_config (dict): SageMaker Network Config
         - sagemaker_model_name (str): SageMaker Model Name
         - args (dict): SageMaker TransformStep arguments
+        - data_type (str): Input data type, S3Prefix or ManifestFile
 
         Return
         ----------
@@ -226,12 +406,11 @@ class TransformService:
             strategy=args["strategy"],
             assemble_with=args["assemble_with"],
             max_payload=args["max_payload"],
+            max_concurrent_transforms=args["max_concurrent_transforms"],
             output_path=output_path,
-            sagemaker_session=PipelineSession(
-                default_bucket=self.config.get("models.s3Bucket"),
-            ),
+            sagemaker_session=self._get_pipeline_session(),
             output_kms_key=network_config["kms_key"],
-            accept=args["content_type"],
+            accept=args["accept"],
             tags=args["tags"],
             env=args["env"],
             base_transform_job_name=args["base_job_name"],
@@ -240,6 +419,7 @@ class TransformService:
 
         step_transform_args = transformer.transform(
             data=input_data,
+            data_type=data_type,
             content_type=args["content_type"],
             split_type=args["split_type"],
             input_filter=args["input_filter"],
@@ -269,17 +449,19 @@ class TransformService:
 
         # Get SageMaker network configuration
         sagemaker_network_config = self._get_network_config()
-        self.logger.log_info(f"SageMaker network config: {sagemaker_network_config}")
+        self.logger.log_info(lambda: f"SageMaker network config: {sagemaker_network_config}")
 
         transform_data = self.config.get(f"models.{self.model_name}.transform")
         sagemaker_config = self._args()
 
-        if self._get_chain_input():
-            input_data_file_s3path = self._get_chain_input()
+        chain_input_s3path = self._get_chain_input(sagemaker_config["instance_count"])
+        if chain_input_s3path:
+            input_data_file_s3path = chain_input_s3path
             output_data_file_s3path = None
+            data_type = "S3Prefix"
         else:
-            input_data_file_s3path, output_data_file_s3path = self._get_train_inputs_outputs(
-                transform_data
+            input_data_file_s3path, output_data_file_s3path, data_type = self._get_train_inputs_outputs(
+                transform_data, sagemaker_config["instance_count"]
             )
 
         step_transform_args = self._run_batch_transform(
@@ -288,6 +470,7 @@ class TransformService:
             network_config=sagemaker_network_config,
             sagemaker_model_name=sagemaker_model_name,
             args=sagemaker_config,
+            data_type=data_type,
         )
 
         return step_transform_args
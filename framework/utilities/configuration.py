@@ -19,6 +19,7 @@ import os
 import glob
 import yaml
 from typing import Any, Dict, Union, List
+from utilities.tracing import traced
 
 
 class Conf:
@@ -29,6 +30,7 @@ class Conf:
     def __init__(self):
         self.path = "framework/conf/conf.yaml"
 
+    @traced("Conf.load_conf")
     def load_conf(self):
         """
         Method to load and merge all Conf files
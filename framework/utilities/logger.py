@@ -15,25 +15,140 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+
+import atexit
+import copy
+import json
 import logging
-from typing import Union, List
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Union, List
+
+LOGGER_NAME = "Logger"
+LEVEL_ENV = "SMP_LOG_LEVEL"
+FORMAT_ENV = "SMP_LOG_FORMAT"
+TEXT_FORMAT = "%(asctime)s :::: [Log %(name)s] :::: [Level: %(levelname)-8s] :::: %(message)s"
+DATE_FORMAT = "[%Y-%m-%d %H:%M:%S %Z%z]"
+
+_lock = threading.Lock()
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter writing one JSON object per record, with the fields passed to the log_* methods
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = dict(
+            time=self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            level=record.levelname,
+            logger=record.name,
+            message=record.getMessage(),
+        )
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting of the records, exceptions included, to the listener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare formats the exception into the message and drops exc_info,
+        # only the message arguments are merged here, in case they change after the call
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _reset_after_fork():
+    # the listener thread isn't copied to forked processes, which configure their own
+    global _listener, _lock
+    _lock = threading.Lock()
+    _listener = None
+    logging.getLogger(LOGGER_NAME).handlers.clear()
+
+
+def configure(level: Union[str, None] = None, log_format: Union[str, None] = None) -> logging.Logger:
+    """
+    Configures the framework logger once per process: records are put on a queue by the caller,
+    and formatted and written to stderr by a listener thread.
+
+    Args:
+    ----------
+    - level:      (str): Logging level, default SMP_LOG_LEVEL or "INFO"
+    - log_format: (str): "text" or "json", default SMP_LOG_FORMAT or "text"
+
+    Returns:
+    ----------
+    - The configured logging.Logger
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _listener is not None and level is None and log_format is None:
+            return logger
+        _stop_listener()
+
+        level = (level or os.environ.get(LEVEL_ENV) or "INFO").upper()
+        log_format = (log_format or os.environ.get(FORMAT_ENV) or "text").lower()
+        if log_format not in ("text", "json"):
+            raise Exception(f"Unsupported {FORMAT_ENV} {log_format}, use \"text\" or \"json\".")
+
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(
+            JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+        )
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, console_handler)
+        _listener.start()
+
+        logger.handlers.clear()
+        logger.addHandler(RecordQueueHandler(log_queue))
+        logger.setLevel(level)
+        logger.propagate = False
+    return logger
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 class Logger:
     """
     Logger class that implement custom formattin messages
 
+    All instances share one logger, configured once with configure(). Messages can be callables
+    returning the message, only called when the level is enabled, so that large arguments are
+    not formatted for disabled levels.
+
     Attibutes:
     ----------
     - logger (logging.Logger): The logger object from the logging module.
 
     Methods:
     ----------
-    - log_debug(*messages: Union[str, List[str]]): Logs debug messages
-    - log_info(*messages: Union[str, List[str]]): Logs informational messages
-    - log_warning(*messages: Union[str, List[str]]): Logs warning messages
-    - log_error(*messages: Union[str, List[str]]): Logs error messages
-    - log_critical(*messages: Union[str, List[str]]): Logs critical messages
+    - log_debug(*messages: Union[str, List[str]], **fields): Logs debug messages
+    - log_info(*messages: Union[str, List[str]], **fields): Logs informational messages
+    - log_warning(*messages: Union[str, List[str]], **fields): Logs warning messages
+    - log_error(*messages: Union[str, List[str]], **fields): Logs error messages
+    - log_critical(*messages: Union[str, List[str]], **fields): Logs critical messages
+    - is_enabled_for(level: int): Whether messages of the level are logged
     """
 
     def __init__(self, config: Union[dict, None] = None):
@@ -44,36 +159,35 @@ class Logger:
         ----------
         - config (dict): Configuration for the logger
         """
-        # Get logger
-        self.logger = logging.getLogger(self.__class__.__name__)
+        # Get the logger, configured by the first instance
+        self.logger = configure()
 
-        # Create the formatter
-        formatter = logging.Formatter(
-            "%(asctime)s :::: [Log %(name)s] :::: %(message)s",
-            datefmt="[%Y-%m-%d %H:%M:%S %Z%z]"
-        )
-
-        # Create the console handler and add formatter
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Whether messages of the level are logged
 
-        # Add handlers to the loger
-        self.logger.addHandler(console_handler)
+        Args:
+        ----------
+        - level: (int): The logging level, e.g. logging.DEBUG
+        """
+        return self.logger.isEnabledFor(level)
 
-    def _log_messages(self, level: str, prefix: str, *messages: Union[str, List[str]]):
+    def _log_messages(self, level: int, *messages: Union[str, Callable[[], str]], **fields):
         """
         Logs messages with the specified level.
 
         Args:
         ----------
-        - level:     (str): The logging level
-        - prefix:    (str): Message prefix to be used
-        - *messages: (Union[str, List[str]]): Single or List of messages
+        - level:     (int): The logging level
+        - *messages: (Union[str, Callable[[], str]]): Single or List of messages, or callables returning them
+        - **fields:  Structured fields, written by the json format
         """
+        if not self.logger.isEnabledFor(level):
+            return
         for msg in messages:
-            level(f"[Level: {prefix}] :::: {msg}")
+            self.logger.log(level, "%s", msg() if callable(msg) else msg, extra=dict(fields=fields), stacklevel=3)
 
-    def log_debug(self, *messages: Union[str, List[str]]):
+    def log_debug(self, *messages: Union[str, List[str]], **fields):
         """
         Logs debug messages
 
@@ -81,10 +195,9 @@ class Logger:
         ----------
         - *messages: (Union[str, List[str]]): Single or List of messages
         """
-        self.logger.setLevel(logging.DEBUG)
-        self._log_messages(self.logger.debug, "DEBUG   ", *messages)
+        self._log_messages(logging.DEBUG, *messages, **fields)
 
-    def log_info(self, *messages: Union[str, List[str]]):
+    def log_info(self, *messages: Union[str, List[str]], **fields):
         """
         Logs informational messages
 
@@ -92,10 +205,9 @@ class Logger:
         ----------
         - *messages: (Union[str, List[str]]): Single or List of messages
         """
-        self.logger.setLevel(logging.INFO)
-        self._log_messages(self.logger.info, "INFO    ", *messages)
+        self._log_messages(logging.INFO, *messages, **fields)
 
-    def log_warning(self, *messages: Union[str, List[str]]):
+    def log_warning(self, *messages: Union[str, List[str]], **fields):
         """
         Logs warining messages
 
@@ -103,10 +215,9 @@ class Logger:
         ----------
         - *messages: (Union[str, List[str]]): Single or List of messages
         """
-        self.logger.setLevel(logging.WARNING)
-        self._log_messages(self.logger.warning, "WARNING ", *messages)
+        self._log_messages(logging.WARNING, *messages, **fields)
 
-    def log_error(self, *messages: Union[str, List[str]]):
+    def log_error(self, *messages: Union[str, List[str]], **fields):
         """
         Logs error messages
 
@@ -114,10 +225,9 @@ class Logger:
         ----------
         - *messages: (Union[str, List[str]]): Single or List of messages
         """
-        self.logger.setLevel(logging.ERROR)
-        self._log_messages(self.logger.error, "ERROR   ", *messages)
+        self._log_messages(logging.ERROR, *messages, **fields)
 
-    def log_critical(self, *messages: Union[str, List[str]]):
+    def log_critical(self, *messages: Union[str, List[str]], **fields):
         """
         Logs critical messages
 
@@ -125,5 +235,4 @@ class Logger:
         ----------
         - *messages: (Union[str, List[str]]): Single or List of messages
         """
-        self.logger.setLevel(logging.CRITICAL)
-        self._log_messages(self.logger.critical, "CRITICAL", *messages)
+        self._log_messages(logging.CRITICAL, *messages, **fields)
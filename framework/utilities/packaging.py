@@ -0,0 +1,278 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Import native libraries
+import atexit
+import fnmatch
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+from typing import List, Tuple
+
+IGNORE_FILE_NAME = ".smpignore"
+DEFAULT_EXCLUDE_PATTERNS = ["__pycache__", "*.pyc", ".git", ".ipynb_checkpoints", IGNORE_FILE_NAME]
+DEFAULT_MAX_FILE_SIZE_MB = 10
+
+
+def read_ignore_file(source_directory: str) -> list:
+    """
+    Read the exclude patterns declared in the .smpignore file of a source directory.
+
+    Args:
+        source_directory (str): The directory holding the .smpignore file.
+
+    Returns:
+        The list of patterns. Empty lines and lines starting with # are skipped.
+    """
+    ignore_file_path = os.path.join(source_directory, IGNORE_FILE_NAME)
+    if not os.path.isfile(ignore_file_path):
+        return []
+
+    with open(ignore_file_path, "r") as f:
+        lines = [line.strip() for line in f.readlines()]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def match_patterns(relative_path: str, patterns: list) -> bool:
+    """
+    Check if a path relative to the source directory matches any glob pattern.
+
+    A pattern matches either the full relative path (e.g. "data/*.csv") or any single
+    component of it (e.g. "*.png" or "data"). A trailing "/" restricts the pattern to directories.
+
+    Args:
+        relative_path (str): Path relative to the source directory, using "/" as separator.
+        patterns (list): The glob patterns.
+
+    Returns:
+        True if the path matches at least one pattern.
+    """
+    components = relative_path.split("/")
+    for pattern in patterns:
+        pattern = pattern.rstrip("/")
+        if fnmatch.fnmatch(relative_path, pattern):
+            return True
+        if "/" not in pattern and any(fnmatch.fnmatch(component, pattern) for component in components):
+            return True
+    return False
+
+
+def select_dependencies(
+        source_directory: str,
+        include: list = None,
+        exclude: list = None,
+        max_file_size_mb: float = DEFAULT_MAX_FILE_SIZE_MB,
+) -> Tuple[List[str], dict]:
+    """
+    Select the files of a source directory that should be packaged with a job.
+
+    A file is packaged when it matches one of the include patterns (or no include pattern
+    is given), does not match the exclude patterns, the .smpignore patterns or the default
+    exclude patterns, and is not larger than max_file_size_mb. Files matching an include
+    pattern explicitly are never dropped because of their size.
+
+    Args:
+        source_directory (str): The directory to package.
+        include (list): Glob patterns of files to keep.
+        exclude (list): Glob patterns of files to drop.
+        max_file_size_mb (float): Size above which files are dropped. None disables the check.
+
+    Returns:
+        The sorted list of selected relative file paths, and a size report dictionary.
+    """
+    include = list(include or [])
+    exclude = list(exclude or []) + read_ignore_file(source_directory) + DEFAULT_EXCLUDE_PATTERNS
+    max_file_size_bytes = max_file_size_mb * 1024 * 1024 if max_file_size_mb is not None else None
+
+    selected_files = []
+    report = dict(
+        source_directory=source_directory,
+        included_files=0,
+        included_bytes=0,
+        excluded_files=0,
+        excluded_bytes=0,
+        large_files=[],
+        largest_included=[],
+    )
+    included_sizes = []
+
+    for root, dirs, files in os.walk(source_directory):
+        relative_root = os.path.relpath(root, source_directory).replace(os.sep, "/")
+        relative_root = "" if relative_root == "." else f"{relative_root}/"
+        # Prune excluded directories so their content is never walked
+        dirs[:] = sorted(d for d in dirs if not match_patterns(f"{relative_root}{d}", exclude))
+
+        for file_name in sorted(files):
+            relative_path = f"{relative_root}{file_name}"
+            file_size = os.path.getsize(os.path.join(root, file_name))
+            explicitly_included = bool(include) and match_patterns(relative_path, include)
+
+            if include and not explicitly_included:
+                keep = False
+            elif match_patterns(relative_path, exclude):
+                keep = False
+            elif max_file_size_bytes is not None and file_size > max_file_size_bytes and not explicitly_included:
+                keep = False
+                report["large_files"].append((relative_path, file_size))
+            else:
+                keep = True
+
+            if keep:
+                selected_files.append(relative_path)
+                included_sizes.append((relative_path, file_size))
+                report["included_files"] += 1
+                report["included_bytes"] += file_size
+            else:
+                report["excluded_files"] += 1
+                report["excluded_bytes"] += file_size
+
+    report["largest_included"] = sorted(included_sizes, key=lambda item: item[1], reverse=True)[:5]
+    return selected_files, report
+
+
+def content_digest(source_directory: str, relative_paths: list, extra_files: list = None) -> str:
+    """
+    Compute the sha256 hex digest of the paths and content of a selection of files.
+
+    Args:
+        source_directory (str): The directory the relative paths refer to.
+        relative_paths (list): The files to hash.
+        extra_files (list): Files hashed under their base name, as staged by stage_files.
+
+    Returns:
+        The hex digest.
+    """
+    entries = [(relative_path, os.path.join(source_directory, relative_path)) for relative_path in relative_paths]
+    entries += [(os.path.basename(path), path) for path in extra_files or []]
+    digest = hashlib.sha256()
+    for relative_path, path in sorted(entries):
+        digest.update(relative_path.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def stage_files(source_directory: str, relative_paths: list, prefix: str = "smp-", extra_files: list = None) -> str:
+    """
+    Copy a selection of files into a staging directory, preserving their layout.
+
+    The staging directory is named after the content digest of the files, so that the same
+    content is always staged at the same path: the SageMaker SDK hashes the paths of the code
+    it uploads, and a new path on every compile would change the step definitions and defeat
+    step caching. It lives until the interpreter exits, because the SageMaker SDK uploads code
+    lazily when the pipeline definition is generated, and is removed at exit by the process
+    that created it.
+
+    Args:
+        source_directory (str): The directory the relative paths refer to.
+        relative_paths (list): The files to copy.
+        prefix (str): Prefix of the staging directory name.
+        extra_files (list): Files copied at the top level of the staging directory.
+
+    Returns:
+        The staging directory path.
+    """
+    digest = content_digest(source_directory, relative_paths, extra_files)
+    staging_directory = os.path.join(tempfile.gettempdir(), f"{prefix}{digest[:16]}")
+    if os.path.isdir(staging_directory):
+        return staging_directory
+
+    # files are copied aside, then moved in place, so that a staging directory is always complete
+    partial_directory = tempfile.mkdtemp(prefix=f"{prefix}partial-")
+    for relative_path in relative_paths:
+        destination = os.path.join(partial_directory, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(os.path.join(source_directory, relative_path), destination)
+    for path in extra_files or []:
+        shutil.copy2(path, partial_directory)
+    try:
+        os.rename(partial_directory, staging_directory)
+        atexit.register(shutil.rmtree, staging_directory, ignore_errors=True)
+    except OSError:
+        # staged by another process meanwhile
+        shutil.rmtree(partial_directory, ignore_errors=True)
+    return staging_directory
+
+
+def build_archive(source_directory: str, relative_paths: list, prefix: str = "smp-") -> Tuple[str, str]:
+    """
+    Build a reproducible sourcedir.tar.gz of a selection of files.
+
+    Entries are sorted, and their timestamps and owners are reset, so that the same content
+    always gives the same archive and digest.
+
+    Args:
+        source_directory (str): The directory the relative paths refer to.
+        relative_paths (list): The files to archive.
+        prefix (str): Prefix of the temporary directory name.
+
+    Returns:
+        The archive path, and the sha256 hex digest of the archive.
+    """
+    archive_directory = tempfile.mkdtemp(prefix=prefix)
+    atexit.register(shutil.rmtree, archive_directory, ignore_errors=True)
+    archive_path = os.path.join(archive_directory, "sourcedir.tar.gz")
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tarfile.PAX_FORMAT) as tar:
+        for relative_path in sorted(relative_paths):
+            tar_info = tar.gettarinfo(os.path.join(source_directory, relative_path), arcname=relative_path)
+            tar_info.mtime = 0
+            tar_info.uid = tar_info.gid = 0
+            tar_info.uname = tar_info.gname = ""
+            tar_info.mode = 0o644
+            with open(os.path.join(source_directory, relative_path), "rb") as f:
+                tar.addfile(tar_info, f)
+
+    with open(archive_path, "wb") as f:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as gz:
+            gz.write(buffer.getvalue())
+
+    with open(archive_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return archive_path, digest
+
+
+def format_size(size_in_bytes: float) -> str:
+    """
+    Format a number of bytes in a human readable way.
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size_in_bytes < 1024:
+            return f"{size_in_bytes:.1f}{unit}"
+        size_in_bytes /= 1024
+    return f"{size_in_bytes:.1f}TB"
+
+
+def format_dependency_report(report: dict) -> str:
+    """
+    Render the size report returned by select_dependencies.
+    """
+    lines = [
+        f"Dependency packaging report for {report['source_directory']}:",
+        f"  included: {report['included_files']} files, {format_size(report['included_bytes'])}",
+        f"  excluded: {report['excluded_files']} files, {format_size(report['excluded_bytes'])}",
+    ]
+    for relative_path, file_size in report["large_files"]:
+        lines.append(f"  dropped large file: {relative_path} ({format_size(file_size)})")
+    for relative_path, file_size in report["largest_included"]:
+        lines.append(f"  largest included: {relative_path} ({format_size(file_size)})")
+    return "\n".join(lines)
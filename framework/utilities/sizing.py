@@ -0,0 +1,347 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Compile-time sizing of instance type, instance count and volume size from static input sizes
+
+# Import native libraries
+import math
+import os
+from typing import Tuple, Union
+
+# Import third-party libraries
+import boto3
+from utilities.logger import Logger
+from utilities.tracing import trace_methods
+
+GB = 1024 ** 3
+
+# Memory in GiB of the instance types that can be picked by the memory rules
+INSTANCE_MEMORY_GIB = {
+    "ml.m5.large": 8, "ml.m5.xlarge": 16, "ml.m5.2xlarge": 32, "ml.m5.4xlarge": 64,
+    "ml.m5.12xlarge": 192, "ml.m5.24xlarge": 384,
+    "ml.c5.large": 4, "ml.c5.xlarge": 8, "ml.c5.2xlarge": 16, "ml.c5.4xlarge": 32,
+    "ml.c5.9xlarge": 72, "ml.c5.18xlarge": 144,
+    "ml.r5.large": 16, "ml.r5.xlarge": 32, "ml.r5.2xlarge": 64, "ml.r5.4xlarge": 128,
+    "ml.r5.12xlarge": 384, "ml.r5.24xlarge": 768,
+    "ml.g4dn.xlarge": 16, "ml.g4dn.2xlarge": 32, "ml.g4dn.4xlarge": 64, "ml.g4dn.8xlarge": 128,
+    "ml.g4dn.12xlarge": 192, "ml.g4dn.16xlarge": 256,
+    "ml.p3.2xlarge": 61, "ml.p3.8xlarge": 244, "ml.p3.16xlarge": 488,
+}
+DEFAULT_INSTANCE_TYPES = [
+    "ml.m5.large", "ml.m5.xlarge", "ml.m5.2xlarge", "ml.m5.4xlarge", "ml.m5.12xlarge", "ml.m5.24xlarge"
+]
+DEFAULT_RULES = dict(
+    gb_per_instance=None,
+    max_instance_count=10,
+    memory_multiple=None,
+    min_memory_gib=0,
+    instance_types=DEFAULT_INSTANCE_TYPES,
+    volume_multiple=None,
+    volume_overhead_gb=10,
+    min_volume_size_in_gb=30,
+    max_volume_size_in_gb=16384,
+)
+
+
+class S3SizeLister:
+    """
+    List the total size of the objects under S3 prefixes, caching the listings for the whole compilation.
+    """
+    _cache = {}
+
+    def __init__(self, s3_client=None):
+        self.s3_client = s3_client
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        cls._cache = {}
+
+    def list_size(self, s3_uri: str) -> Tuple[int, int]:
+        """
+        Total size in bytes and number of the objects matching an S3 URI used as S3Prefix.
+
+        Args:
+            s3_uri (str): The S3 URI.
+
+        Returns:
+            The total size in bytes, and the number of objects.
+        """
+        if s3_uri not in self._cache:
+            if self.s3_client is None:
+                self.s3_client = boto3.client("s3")
+            bucket, prefix = s3_uri[len("s3://"):].split("/", 1)
+            total_size, number_of_objects = 0, 0
+            for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+                for s3_object in page.get("Contents", []):
+                    total_size += s3_object["Size"]
+                    number_of_objects += 1
+            self._cache[s3_uri] = (total_size, number_of_objects)
+        return self._cache[s3_uri]
+
+
+class LocalSizeLister:
+    """
+    Local stand-in for S3SizeLister: s3://{bucket}/{key} is read from {root}/{bucket}/{key},
+    and a key matches the local files starting with it, like an S3 prefix.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def list_size(self, s3_uri: str) -> Tuple[int, int]:
+        local_prefix = os.path.join(self.root, s3_uri[len("s3://"):])
+        directory = local_prefix if os.path.isdir(local_prefix) else os.path.dirname(local_prefix)
+        total_size, number_of_objects = 0, 0
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                if path.startswith(local_prefix):
+                    total_size += os.path.getsize(path)
+                    number_of_objects += 1
+        return total_size, number_of_objects
+
+
+def get_size_lister() -> Union[S3SizeLister, LocalSizeLister]:
+    """
+    LocalSizeLister under SMP_SIZING_LOCAL_ROOT when set, S3SizeLister otherwise.
+    """
+    local_root = os.getenv("SMP_SIZING_LOCAL_ROOT")
+    return LocalSizeLister(local_root) if local_root else S3SizeLister()
+
+
+@trace_methods
+class SizingService:
+    """
+    Class to pick the instance type, instance count and volume size of a step from the size
+    of its static inputs, following the declarative rules of the sizing section.
+
+    Only the fields that are not set in the step section are sized, and every choice is logged.
+    Sizing is disabled when neither the step section nor sagemakerPipeline defines a sizing section.
+    Decisions, input sizes and S3 listings are kept for one compilation, see reset.
+
+    Attributes:
+    ----------
+    - config: dict
+        - Configuration dictionary
+    - model_name: str
+        - Model name
+    - section: str
+        - Step section of the model configuration, e.g. preprocess, train, transform or evaluate
+    """
+    _decisions = {}
+    _input_sizes = {}
+
+    def __init__(self, config: dict, model_name: str, section: str, size_lister=None):
+        self.config = config
+        self.model_name = model_name
+        self.section = section
+        self.size_lister = size_lister
+        self.logger = Logger()
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Method to forget the decisions, input sizes and S3 listings of the previous compilation,
+        called when a pipeline compilation starts
+        """
+        cls._decisions = {}
+        cls._input_sizes = {}
+        S3SizeLister.clear_cache()
+
+    @classmethod
+    def get_input_size(cls, model_name: str, section: str) -> Union[float, None]:
+        """
+        Method to get the static input size listed when a model step section was sized
+
+        Returns:
+        ----------
+        - Input size in GB, or None when the section was not sized
+        """
+        return cls._input_sizes.get((model_name, section))
+
+    def _rules(self) -> Union[dict, None]:
+        """
+        Method to merge the sagemakerPipeline sizing rules with the step section sizing rules
+
+        Returns:
+        ----------
+        - Sizing rules, or None when sizing is disabled
+        """
+        pipeline_rules = self.config.get("sagemakerPipeline.sizing", None)
+        section_rules = self.config.get(f"models.{self.model_name}.{self.section}.sizing", None)
+        if pipeline_rules is None and section_rules is None:
+            return None
+        rules = dict(DEFAULT_RULES)
+        rules.update(dict(pipeline_rules or {}))
+        rules.update(dict(section_rules or {}))
+        return rules
+
+    def _is_explicit(self, field: str) -> bool:
+        return self.config.get(f"models.{self.model_name}.{self.section}.{field}", None) is not None
+
+    def _list_input_size(self, input_uris: list) -> Union[Tuple[float, int], None]:
+        """
+        Method to list the total size of the static inputs
+
+        Returns:
+        ----------
+        - Total size in GB and number of objects, or None when an input can't be listed
+        """
+        size_lister = self.size_lister or get_size_lister()
+        total_size, number_of_objects = 0, 0
+        for input_uri in input_uris:
+            if not isinstance(input_uri, str) or not input_uri.startswith("s3://"):
+                self.logger.log_warning(f"Sizing {self.model_name}.{self.section}: can't list input {input_uri}.")
+                return None
+            try:
+                size, count = size_lister.list_size(input_uri)
+            except Exception as e:
+                self.logger.log_warning(f"Sizing {self.model_name}.{self.section}: listing {input_uri} failed: {e}")
+                return None
+            total_size += size
+            number_of_objects += count
+        return total_size / GB, number_of_objects
+
+    def _pick_instance_type(self, rules: dict, memory_gib: float) -> Union[str, None]:
+        candidates = sorted(
+            [instance_type for instance_type in rules["instance_types"] if instance_type in INSTANCE_MEMORY_GIB],
+            key=lambda instance_type: INSTANCE_MEMORY_GIB[instance_type],
+        )
+        if not candidates:
+            return None
+        for instance_type in candidates:
+            if INSTANCE_MEMORY_GIB[instance_type] >= memory_gib:
+                return instance_type
+        self.logger.log_warning(
+            f"Sizing {self.model_name}.{self.section}: no instance type has {memory_gib:.1f} GiB of memory, "
+            f"using the largest candidate {candidates[-1]}."
+        )
+        return candidates[-1]
+
+    def _decide(self, args: dict, input_uris: list, sharded: bool, volume_field: Union[str, None]) -> dict:
+        """
+        Method to compute the sized fields of a step
+
+        Args:
+        ----------
+        - args (dict): Step arguments with the configured or default values
+        - input_uris (list): S3 URIs of the static inputs
+        - sharded (bool): Whether the inputs are split between the instances
+        - volume_field (str): Name of the volume size argument, None when the step has no volume
+
+        Returns:
+        ----------
+        - Sized fields dictionary
+        """
+        rules = self._rules()
+        if rules is None:
+            return {}
+        prefix = f"Sizing {self.model_name}.{self.section}:"
+        if not input_uris:
+            self.logger.log_info(f"{prefix} no static input to size from, keeping configured values.")
+            return {}
+        listing = self._list_input_size(input_uris)
+        if listing is None:
+            self.logger.log_warning(f"{prefix} keeping configured values.")
+            return {}
+        input_gb, number_of_objects = listing
+        self._input_sizes[(self.model_name, self.section)] = input_gb
+        self.logger.log_info(f"{prefix} {input_gb:.3f} GB in {number_of_objects} object(s) under {input_uris}.")
+
+        sized = {}
+        instance_count = args["instance_count"]
+        if self._is_explicit("instance_count"):
+            self.logger.log_info(f"{prefix} instance_count={instance_count} set in configuration.")
+        elif not rules["gb_per_instance"]:
+            self.logger.log_info(f"{prefix} instance_count={instance_count}, no gb_per_instance rule.")
+        elif not sharded:
+            self.logger.log_info(
+                f"{prefix} instance_count={instance_count}, inputs are FullyReplicated to every instance."
+            )
+        else:
+            instance_count = min(
+                max(1, math.ceil(input_gb / rules["gb_per_instance"])),
+                rules["max_instance_count"],
+                max(1, number_of_objects),
+            )
+            sized["instance_count"] = instance_count
+            self.logger.log_info(
+                f"{prefix} instance_count={instance_count} for {rules['gb_per_instance']} GB per instance, "
+                f"at most {rules['max_instance_count']} instances and {number_of_objects} object(s)."
+            )
+        gb_per_instance = input_gb / instance_count if sharded else input_gb
+
+        if self._is_explicit("instance_type"):
+            self.logger.log_info(f"{prefix} instance_type={args['instance_type']} set in configuration.")
+        elif not rules["memory_multiple"]:
+            self.logger.log_info(f"{prefix} instance_type={args['instance_type']}, no memory_multiple rule.")
+        else:
+            memory_gib = max(gb_per_instance * rules["memory_multiple"], rules["min_memory_gib"])
+            instance_type = self._pick_instance_type(rules, memory_gib)
+            if instance_type is None:
+                self.logger.log_warning(f"{prefix} no instance_types candidate in the memory catalog.")
+            else:
+                sized["instance_type"] = instance_type
+                self.logger.log_info(
+                    f"{prefix} instance_type={instance_type} ({INSTANCE_MEMORY_GIB[instance_type]} GiB) for "
+                    f"{memory_gib:.1f} GiB = {gb_per_instance:.3f} GB x {rules['memory_multiple']} memory_multiple."
+                )
+
+        if volume_field is None:
+            pass
+        elif self._is_explicit(volume_field):
+            self.logger.log_info(f"{prefix} {volume_field}={args[volume_field]} set in configuration.")
+        elif not rules["volume_multiple"]:
+            self.logger.log_info(f"{prefix} {volume_field}={args[volume_field]}, no volume_multiple rule.")
+        else:
+            volume_size = math.ceil(gb_per_instance * rules["volume_multiple"] + rules["volume_overhead_gb"])
+            volume_size = min(max(volume_size, rules["min_volume_size_in_gb"]), rules["max_volume_size_in_gb"])
+            sized[volume_field] = volume_size
+            self.logger.log_info(
+                f"{prefix} {volume_field}={volume_size} for {gb_per_instance:.3f} GB x {rules['volume_multiple']} "
+                f"volume_multiple + {rules['volume_overhead_gb']} GB."
+            )
+        return sized
+
+    def size(
+            self,
+            args: dict,
+            input_uris: list,
+            sharded: bool = False,
+            volume_field: Union[str, None] = "volume_size_in_gb",
+    ) -> dict:
+        """
+        Method to apply the sizing rules to the arguments of a step.
+        Decisions are computed and logged once per model step section and compilation.
+
+        Args:
+        ----------
+        - args (dict): Step arguments with the configured or default values
+        - input_uris (list): S3 URIs of the static inputs
+        - sharded (bool): Whether the inputs are split between the instances (ShardedByS3Key)
+        - volume_field (str): Name of the volume size argument, None when the step has no volume
+
+        Returns:
+        ----------
+        - Step arguments with the sized fields
+        """
+        key = (self.model_name, self.section)
+        if key not in self._decisions:
+            self._decisions[key] = self._decide(args, input_uris, sharded, volume_field)
+        sized_args = dict(args)
+        sized_args.update(self._decisions[key])
+        return sized_args
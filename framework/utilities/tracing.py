@@ -0,0 +1,280 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Compile time tracing: timing spans around the framework services and ModelUnit step builders,
+# and counters of the AWS API calls they make, exported as a Chrome trace
+# (chrome://tracing or https://ui.perfetto.dev) when SMP_TRACE_PATH is set.
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Union
+
+# imported first so that the log listener is stopped after the trace export at exit
+from utilities.logger import Logger
+
+TRACE_PATH_ENV = "SMP_TRACE_PATH"
+TRACE_TOP_ENV = "SMP_TRACE_TOP"
+DEFAULT_TOP = 15
+UPLOAD_OPERATIONS = ("PutObject", "UploadPart")
+
+
+class Tracer:
+    """
+    Collects complete ("X") events and counters of the Chrome trace event format
+
+    Attributes:
+    ----------
+    - enabled: bool
+        - Whether spans and counters are recorded
+    - events: list
+        - Recorded trace events
+    - counters: dict
+        - Counter name to value
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def span(self, name: str, category: str = "framework", **args):
+        """
+        Record the duration of the block as a span.
+
+        Args:
+        ----------
+        - name (str): The span name
+        - category (str): The span category
+        - **args: Span arguments shown by trace viewers
+        """
+        if not self.enabled:
+            yield
+            return
+        start = self._now_us()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = repr(e)
+            raise
+        finally:
+            event = dict(
+                name=name,
+                cat=category,
+                ph="X",
+                ts=round(start, 3),
+                dur=round(self._now_us() - start, 3),
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+                args={key: str(value) for key, value in args.items()},
+            )
+            with self._lock:
+                self.events.append(event)
+
+    def count(self, name: str, value: Union[int, float] = 1) -> None:
+        """
+        Increase a counter, recorded as a counter ("C") event.
+
+        Args:
+        ----------
+        - name (str): The counter name
+        - value (Union[int, float]): The increment
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append(dict(
+                name=name,
+                ph="C",
+                ts=round(self._now_us(), 3),
+                pid=os.getpid(),
+                args={name: self.counters[name]},
+            ))
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            return dict(traceEvents=list(self.events), displayTimeUnit="ms", otherData=dict(counters=dict(self.counters)))
+
+    def format_summary(self, top: int = DEFAULT_TOP) -> str:
+        """
+        Text summary of the slowest operations, aggregated by span name, and the counters.
+
+        Args:
+        ----------
+        - top (int): The number of operations listed
+
+        Returns:
+        ----------
+        - The summary
+        """
+        with self._lock:
+            spans = [event for event in self.events if event["ph"] == "X"]
+            counters = dict(self.counters)
+        totals = {}
+        for event in spans:
+            calls, total, longest = totals.get(event["name"], (0, 0.0, 0.0))
+            totals[event["name"]] = (calls + 1, total + event["dur"], max(longest, event["dur"]))
+
+        lines = [f"Top {min(top, len(totals))} of {len(totals)} traced operations by total time:"]
+        lines.append(f"  {'total (s)':>10} {'calls':>6} {'max (s)':>9}  operation")
+        for name, (calls, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1])[:top]:
+            lines.append(f"  {total / 1e6:>10.3f} {calls:>6} {longest / 1e6:>9.3f}  {name}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"  counter {name}: {value}")
+        return "\n".join(lines)
+
+    def export(self, path: str) -> str:
+        """
+        Write the Chrome trace JSON file.
+
+        Returns:
+        ----------
+        - The trace path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, category: str = "framework", **args):
+    """
+    Context manager recording a span on the process tracer, see Tracer.span
+    """
+    return _tracer.span(name, category, **args)
+
+
+def count(name: str, value: Union[int, float] = 1) -> None:
+    """
+    Increase a counter of the process tracer, see Tracer.count
+    """
+    _tracer.count(name, value)
+
+
+def traced(name: Union[str, None] = None, category: str = "framework") -> Callable:
+    """
+    Decorator recording every call of the function as a span, named after its qualified name
+    by default. It only checks a flag when tracing is disabled.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return function(*args, **kwargs)
+            with _tracer.span(span_name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls: type) -> type:
+    """
+    Class decorator tracing every method defined by the class, except special methods,
+    static methods and class methods.
+    """
+    category = cls.__module__.split(".")[0]
+    for attribute, value in list(vars(cls).items()):
+        if isinstance(value, (staticmethod, classmethod, type)) or attribute.startswith("__"):
+            continue
+        if callable(value):
+            setattr(cls, attribute, traced(f"{cls.__name__}.{attribute}", category)(value))
+    return cls
+
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def _trace_aws_api_calls() -> None:
+    # every SDK and boto3 call, including code uploads of Estimator.fit and Processor.run,
+    # goes through BaseClient._make_api_call
+    from botocore.client import BaseClient
+
+    make_api_call = BaseClient._make_api_call
+    if getattr(make_api_call, "_smp_traced", False):
+        return
+
+    @functools.wraps(make_api_call)
+    def traced_make_api_call(client, operation_name, api_params):
+        service = client.meta.service_model.service_name
+        count(f"aws.{service}.calls")
+        if service == "s3" and operation_name in UPLOAD_OPERATIONS:
+            count("s3.uploads")
+            count("s3.upload_bytes", _body_size(api_params.get("Body")))
+        with span(f"{service}.{operation_name}", "aws", bucket=api_params.get("Bucket", ""), key=api_params.get("Key", "")):
+            return make_api_call(client, operation_name, api_params)
+
+    traced_make_api_call._smp_traced = True
+    BaseClient._make_api_call = traced_make_api_call
+
+
+def _export_at_exit(path: str) -> None:
+    logger = Logger()
+    logger.log_info(f"Compile trace written to {_tracer.export(path)}")
+    logger.log_info(lambda: _tracer.format_summary(int(os.environ.get(TRACE_TOP_ENV) or DEFAULT_TOP)))
+
+
+def enable(path: Union[str, None] = None) -> bool:
+    """
+    Enable tracing, with the trace exported to path (default SMP_TRACE_PATH) when the process exits.
+
+    Returns:
+    ----------
+    - Whether tracing is enabled
+    """
+    path = path or os.environ.get(TRACE_PATH_ENV)
+    if not path or _tracer.enabled:
+        return _tracer.enabled
+    _tracer.enabled = True
+    _trace_aws_api_calls()
+    atexit.register(_export_at_exit, path)
+    return True
+
+
+enable()
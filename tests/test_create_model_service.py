@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+from sagemaker.estimator import Estimator
+from sagemaker.workflow.pipeline_context import PipelineSession
+from sagemaker.workflow.steps import TrainingStep
+
+from createmodel.create_model_service import CreateModelService
+from pipeline import pipeline_service
+from utilities.configuration import DotDict
+
+ROLE = "arn:aws:iam::123456789012:role/smp"
+
+
+@pytest.fixture(autouse=True)
+def reset_models():
+    CreateModelService.reset()
+    yield
+    CreateModelService.reset()
+
+
+def make_config(image_uri):
+    return DotDict(dict(
+        sagemakerPipeline=dict(pipelineName="smp-test", models=dict(model={})),
+        sagemakerNetworkSecurity=dict(role=ROLE),
+        models=dict(model=dict(registry=dict(ModelRepack="False", InferenceSpecification=dict(image_uri=image_uri)))),
+    ))
+
+
+def make_training_step():
+    estimator = Estimator(
+        image_uri="training-image:1",
+        role=ROLE,
+        instance_count=1,
+        instance_type="ml.m5.large",
+        output_path="s3://bucket/model",
+        sagemaker_session=PipelineSession(),
+    )
+    return TrainingStep(name="model-Training", step_args=estimator.fit())
+
+
+class ModelUnitStub:
+    """
+    Model unit building the SageMaker Model of the CreateModel step only, recording it.
+    """
+    models = []
+
+    def __init__(self, config, model_name, model_steps_dict):
+        self.config = config
+        self.model_name = model_name
+
+    def get_train_pipeline_steps(self):
+        self.models.append(CreateModelService(self.config, self.model_name).create_model(make_training_step()))
+        return []
+
+
+def test_models_are_shared_within_a_compilation():
+    config = make_config("inference-image:1")
+    step_train = make_training_step()
+
+    model = CreateModelService(config, "model").create_model(step_train)
+
+    assert CreateModelService(config, "model").create_model(step_train) is model
+
+
+def test_models_are_rebuilt_by_each_compilation(monkeypatch):
+    monkeypatch.setattr(pipeline_service, "ModelUnit", ModelUnitStub)
+    service = pipeline_service.PipelineService.__new__(pipeline_service.PipelineService)
+    service.logger = None
+    ModelUnitStub.models = []
+
+    service.config = make_config("inference-image:1")
+    service.construct_train_pipeline()
+    service.config = make_config("inference-image:2")
+    service.construct_train_pipeline()
+
+    assert [model.image_uri for model in ModelUnitStub.models] == ["inference-image:1", "inference-image:2"]
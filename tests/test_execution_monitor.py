@@ -0,0 +1,200 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import json
+
+import pytest
+
+from pipeline.execution_monitor import ExecutionMonitor, ReplaySageMakerClient, format_report, monitor_execution
+
+EXECUTION_ARN = "arn:aws:sagemaker:us-east-1:1:pipeline/smp-demo/execution/abc"
+PIPELINE_ARN = "arn:aws:sagemaker:us-east-1:1:pipeline/smp-demo"
+
+TRAINING = dict(
+    StepName="lgbm-Training",
+    StartTime="2026-10-01T10:00:05+00:00",
+    Metadata={"TrainingJob": {"Arn": "arn:aws:sagemaker:us-east-1:1:training-job/pipelines-abc-lgbm-training"}},
+)
+PREPROCESS = dict(
+    StepName="lgbm-Preprocess",
+    StepStatus="Succeeded",
+    StartTime="2026-10-01T10:00:01+00:00",
+    EndTime="2026-10-01T10:00:03+00:00",
+    CacheHitResult={"SourcePipelineExecutionArn": "arn:old"},
+    Metadata={"ProcessingJob": {"Arn": "arn:aws:sagemaker:us-east-1:1:processing-job/old"}},
+)
+TRANSFORM = dict(
+    StepName="lgbm-Transform",
+    StepStatus="Failed",
+    StartTime="2026-10-01T10:07:10+00:00",
+    EndTime="2026-10-01T10:11:50+00:00",
+    FailureReason="ClientError: AlgorithmError",
+    AttemptCount=1,
+    Metadata={"TransformJob": {"Arn": "arn:aws:sagemaker:us-east-1:1:transform-job/pipelines-abc-lgbm-transform"}},
+)
+JOBS = {
+    "pipelines-abc-lgbm-training": dict(
+        TrainingStartTime="2026-10-01T10:02:05+00:00",
+        TrainingEndTime="2026-10-01T10:06:35+00:00",
+        BillableTimeInSeconds=300,
+        ResourceConfig=dict(InstanceType="ml.m5.2xlarge", InstanceCount=1),
+    ),
+    "pipelines-abc-lgbm-transform": dict(
+        TransformStartTime="2026-10-01T10:10:10+00:00",
+        TransformEndTime="2026-10-01T10:11:40+00:00",
+        TransformResources=dict(InstanceType="ml.m5.xlarge", InstanceCount=2),
+    ),
+}
+
+
+def execution(status, last_modified_time, **kwargs):
+    return dict(
+        PipelineArn=PIPELINE_ARN,
+        PipelineExecutionStatus=status,
+        CreationTime="2026-10-01T10:00:00+00:00",
+        LastModifiedTime=last_modified_time,
+        **kwargs,
+    )
+
+
+def training(status):
+    step = dict(TRAINING, StepStatus=status)
+    if status == "Succeeded":
+        step["EndTime"] = "2026-10-01T10:07:05+00:00"
+    return step
+
+
+SNAPSHOTS = [
+    dict(execution=execution("Executing", "2026-10-01T10:01:00+00:00"), steps=[training("Executing")]),
+    dict(execution=execution("Executing", "2026-10-01T10:08:00+00:00"), steps=[training("Succeeded"), PREPROCESS]),
+    dict(
+        execution=execution("Failed", "2026-10-01T10:12:00+00:00", FailureReason="Step failure"),
+        steps=[training("Succeeded"), PREPROCESS, TRANSFORM],
+    ),
+]
+
+
+def replay(snapshots=SNAPSHOTS, jobs=JOBS, **kwargs):
+    return monitor_execution(
+        ReplaySageMakerClient(snapshots, jobs), EXECUTION_ARN, poll_seconds=0, max_poll_seconds=0, **kwargs
+    )
+
+
+def steps_by_name(report):
+    return {step["step_name"]: step for step in report["steps"]}
+
+
+def test_replay_reports_status_changes():
+    changes = []
+    client = ReplaySageMakerClient(SNAPSHOTS, JOBS)
+    monitor = ExecutionMonitor(client, EXECUTION_ARN, poll_seconds=0, max_poll_seconds=0)
+
+    asyncio.run(monitor.run(changes.append))
+
+    assert changes == [
+        dict(step_name="lgbm-Training", previous_status=None, status="Executing"),
+        dict(step_name="lgbm-Training", previous_status="Executing", status="Succeeded"),
+        dict(step_name="lgbm-Preprocess", previous_status=None, status="Succeeded"),
+        dict(step_name="lgbm-Transform", previous_status=None, status="Failed"),
+    ]
+
+
+def test_replay_reports_execution():
+    report = replay()
+
+    assert report["pipeline_name"] == "smp-demo"
+    assert report["status"] == "Failed"
+    assert report["failure_reason"] == "Step failure"
+    assert report["wall_seconds"] == 720
+    assert [step["step_name"] for step in report["steps"]] == ["lgbm-Preprocess", "lgbm-Training", "lgbm-Transform"]
+
+
+def test_replay_splits_queue_and_execution_time():
+    steps = steps_by_name(replay())
+
+    training_step = steps["lgbm-Training"]
+    assert (training_step["wall_seconds"], training_step["queue_seconds"], training_step["execution_seconds"]) == (
+        420, 120, 270
+    )
+    assert training_step["billable_seconds"] == 300
+    assert (training_step["instance_type"], training_step["instance_count"]) == ("ml.m5.2xlarge", 1)
+
+    transform_step = steps["lgbm-Transform"]
+    assert (transform_step["queue_seconds"], transform_step["execution_seconds"]) == (180, 90)
+    assert (transform_step["instance_type"], transform_step["instance_count"]) == ("ml.m5.xlarge", 2)
+
+
+def test_replay_reports_cache_hits_without_describing_the_source_job():
+    preprocess_step = steps_by_name(replay())["lgbm-Preprocess"]
+
+    assert preprocess_step["cache_hit"] is True
+    assert preprocess_step["cache_source_execution_arn"] == "arn:old"
+    assert preprocess_step["queue_seconds"] == 0
+    assert preprocess_step["execution_seconds"] == preprocess_step["wall_seconds"] == 2
+    assert preprocess_step["instance_type"] is None
+
+
+def test_replay_reports_failure_reasons():
+    report = replay()
+    transform_step = steps_by_name(report)["lgbm-Transform"]
+
+    assert transform_step["status"] == "Failed"
+    assert transform_step["failure_reason"] == "ClientError: AlgorithmError"
+    assert transform_step["attempt_count"] == 1
+    assert "failure: ClientError: AlgorithmError" in format_report(report)
+
+
+def test_replay_leaves_queue_time_unknown_for_jobs_not_recorded():
+    transform_step = steps_by_name(replay(jobs={}))["lgbm-Transform"]
+
+    assert transform_step["queue_seconds"] is None
+    assert transform_step["execution_seconds"] == transform_step["wall_seconds"] == 280
+
+
+def test_replay_lists_steps_again_after_the_execution_ends():
+    # the execution is already terminal while the steps listed in the same poll are stale
+    snapshots = [
+        dict(execution=SNAPSHOTS[-1]["execution"], steps=[training("Executing")]),
+        SNAPSHOTS[-1],
+    ]
+
+    report = replay(snapshots=snapshots)
+
+    steps = steps_by_name(report)
+    assert report["status"] == "Failed"
+    assert steps["lgbm-Training"]["status"] == "Succeeded"
+    assert steps["lgbm-Transform"]["status"] == "Failed"
+
+
+def test_replay_stops_at_timeout():
+    report = replay(snapshots=SNAPSHOTS[:1], timeout_seconds=0)
+
+    assert report["status"] == "Executing"
+    assert report["wall_seconds"] is None
+    assert steps_by_name(report)["lgbm-Training"]["status"] == "Executing"
+
+
+def test_replay_client_reads_recordings(tmp_path):
+    path = tmp_path / "recording.json"
+    path.write_text(json.dumps(dict(snapshots=SNAPSHOTS, jobs=JOBS)))
+
+    client = ReplaySageMakerClient.from_file(str(path))
+
+    assert monitor_execution(client, EXECUTION_ARN, poll_seconds=0, max_poll_seconds=0)["status"] == "Failed"
+    with pytest.raises(Exception):
+        ReplaySageMakerClient([])
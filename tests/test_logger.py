@@ -0,0 +1,65 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+
+import pytest
+
+from utilities import logger as logger_module
+
+
+@pytest.fixture(autouse=True)
+def stop_listener():
+    yield
+    logger_module._stop_listener()
+
+
+def log_exception(log_format):
+    logger = logger_module.configure(level="INFO", log_format=log_format)
+    try:
+        raise ValueError("bad value")
+    except ValueError:
+        logger.exception("Step %s failed", "lgbm-Training")
+    # stopping the listener writes the queued records
+    logger_module._stop_listener()
+
+
+def test_json_format_writes_the_exception_field(capsys):
+    log_exception("json")
+
+    entry = json.loads(capsys.readouterr().err)
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "Step lgbm-Training failed"
+    assert entry["exception"].startswith("Traceback")
+    assert "ValueError: bad value" in entry["exception"]
+
+
+def test_text_format_writes_the_exception_once(capsys):
+    log_exception("text")
+
+    output = capsys.readouterr().err
+    assert "Step lgbm-Training failed" in output
+    assert output.count("ValueError: bad value") == 1
+
+
+def test_fields_are_written_by_the_json_format(capsys):
+    logger_module.configure(level="INFO", log_format="json")
+    logger_module.Logger().log_info("Compiled", pipeline_name="smp-demo")
+    logger_module._stop_listener()
+
+    entry = json.loads(capsys.readouterr().err)
+    assert (entry["message"], entry["pipeline_name"], entry["level"]) == ("Compiled", "smp-demo", "INFO")
@@ -0,0 +1,57 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from types import SimpleNamespace
+
+import pytest
+from sagemaker.workflow.fail_step import FailStep
+
+from registermodel.quality_gates import QualityGateService
+from utilities.configuration import DotDict
+
+
+def make_service():
+    config = DotDict(dict(models=dict(model=dict(registry=dict(QualityGates=dict(conditions=[
+        dict(metric="binary_classification_metrics.auc.value", compare_to_approved=True),
+    ]))))))
+    quality_gate_service = QualityGateService(config, "model")
+    # no approved model package in the model package group yet
+    quality_gate_service._approved_report = {}
+    return quality_gate_service
+
+
+def test_gate_without_conditions_passes_registration():
+    register_model_step = FailStep(name="model-Register", error_message="stand-in for the register step")
+
+    quality_gate_step = make_service().gate("model-Register", SimpleNamespace(name="model-Metrics"),
+                                            [register_model_step])
+
+    assert quality_gate_step.name == "model-Register-QualityGate"
+    assert quality_gate_step.if_steps == [register_model_step]
+    assert [condition.to_request() for condition in quality_gate_step.conditions] == [
+        {"Type": "Equals", "LeftValue": 1, "RightValue": 1}
+    ]
+
+
+def test_gate_refuses_packed_variants():
+    register_model_steps = [
+        SimpleNamespace(name=f"model-Register-{variant_name}", variant_name=variant_name)
+        for variant_name in ["segment-a", "segment-b"]
+    ]
+
+    with pytest.raises(Exception, match="packed variants"):
+        make_service().gate("model-Register", SimpleNamespace(name="model-Metrics"), register_model_steps)
@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+from utilities.configuration import DotDict
+from utilities.sizing import GB, LocalSizeLister, S3SizeLister, SizingService
+
+ARGS = dict(instance_count=1, instance_type="ml.m5.large", volume_size_in_gb=30)
+INPUT_URI = "s3://bucket/data/"
+
+
+@pytest.fixture(autouse=True)
+def reset_sizing():
+    SizingService.reset()
+    yield
+    SizingService.reset()
+
+
+def write_objects(root, sizes, prefix="bucket/data"):
+    directory = root / prefix
+    directory.mkdir(parents=True, exist_ok=True)
+    for index, size in enumerate(sizes):
+        (directory / f"part-{index}").write_bytes(b"0" * size)
+
+
+def make_config(rules=None, section_conf=None):
+    return DotDict(dict(
+        sagemakerPipeline=dict(sizing=rules or {}),
+        models=dict(model=dict(train=section_conf or {})),
+    ))
+
+
+def test_local_size_lister_matches_prefixes(tmp_path):
+    write_objects(tmp_path, [100, 200, 300])
+    write_objects(tmp_path, [50], prefix="bucket/other")
+    lister = LocalSizeLister(str(tmp_path))
+
+    assert lister.list_size(INPUT_URI) == (600, 3)
+    assert lister.list_size("s3://bucket/data/part-1") == (200, 1)
+    assert lister.list_size("s3://bucket/") == (650, 4)
+    assert lister.list_size("s3://bucket/missing/") == (0, 0)
+
+
+def test_sizing_service_sizes_unset_fields(tmp_path):
+    write_objects(tmp_path, [1000, 1000, 1000])
+    rules = dict(gb_per_instance=1000 / GB, memory_multiple=1, min_memory_gib=20, volume_multiple=1)
+    service = SizingService(make_config(rules), "model", "train", size_lister=LocalSizeLister(str(tmp_path)))
+
+    sized = service.size(ARGS, [INPUT_URI], sharded=True)
+
+    assert sized == dict(instance_count=3, instance_type="ml.m5.2xlarge", volume_size_in_gb=30)
+    assert SizingService.get_input_size("model", "train") == pytest.approx(3000 / GB)
+
+
+def test_sizing_service_keeps_explicit_fields(tmp_path):
+    write_objects(tmp_path, [1000, 1000, 1000])
+    rules = dict(gb_per_instance=1000 / GB, memory_multiple=1, min_memory_gib=20)
+    config = make_config(rules, section_conf=dict(instance_count=1, instance_type="ml.c5.xlarge"))
+    service = SizingService(config, "model", "train", size_lister=LocalSizeLister(str(tmp_path)))
+
+    assert service.size(dict(ARGS, instance_type="ml.c5.xlarge"), [INPUT_URI], sharded=True) == dict(
+        ARGS, instance_type="ml.c5.xlarge"
+    )
+
+
+def test_sizing_service_is_disabled_without_rules(tmp_path):
+    write_objects(tmp_path, [1000])
+    config = DotDict(dict(models=dict(model=dict(train={}))))
+    service = SizingService(config, "model", "train", size_lister=LocalSizeLister(str(tmp_path)))
+
+    assert service.size(ARGS, [INPUT_URI], sharded=True) == ARGS
+    assert SizingService.get_input_size("model", "train") is None
+
+
+def test_sizing_service_keeps_decisions_for_one_compilation(tmp_path):
+    write_objects(tmp_path, [1000])
+    rules = dict(gb_per_instance=1000 / GB)
+    lister = LocalSizeLister(str(tmp_path))
+
+    assert SizingService(make_config(rules), "model", "train", lister).size(ARGS, [INPUT_URI], True)[
+        "instance_count"] == 1
+    write_objects(tmp_path, [1000, 1000, 1000])
+    assert SizingService(make_config(rules), "model", "train", lister).size(ARGS, [INPUT_URI], True)[
+        "instance_count"] == 1
+
+    SizingService.reset()
+    assert SizingService(make_config(rules), "model", "train", lister).size(ARGS, [INPUT_URI], True)[
+        "instance_count"] == 3
+
+
+class FakeS3Client:
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.listings = 0
+
+    def get_paginator(self, operation_name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                client.listings += 1
+                return [{"Contents": [{"Size": size} for size in client.sizes]}]
+
+        return Paginator()
+
+
+def test_s3_size_lister_cache_is_reset_between_compilations():
+    s3_client = FakeS3Client([10, 20])
+
+    assert S3SizeLister(s3_client).list_size(INPUT_URI) == (30, 2)
+    s3_client.sizes = [10, 20, 30]
+    assert S3SizeLister(s3_client).list_size(INPUT_URI) == (30, 2)
+    assert s3_client.listings == 1
+
+    SizingService.reset()
+    assert S3SizeLister(s3_client).list_size(INPUT_URI) == (60, 3)
+    assert s3_client.listings == 2
@@ -0,0 +1,63 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+
+import numpy as np
+
+from modelmetrics.streaming_metrics import BinaryClassificationState, RegressionState, state_from_dict
+
+
+def make_scores(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.random(rows) < 0.3
+    return y_true, np.clip(rng.normal(0.3 + 0.4 * y_true, 0.2), 0, 1)
+
+
+def test_merged_shard_states_match_one_state():
+    y_true, y_score = make_scores(20000)
+    state = BinaryClassificationState().update(y_true, y_score)
+    shards = [
+        BinaryClassificationState().update(y_true[:5000], y_score[:5000]),
+        BinaryClassificationState().update(y_true[5000:], y_score[5000:]),
+    ]
+
+    merged = state_from_dict(json.loads(json.dumps(shards[0].to_dict())))
+    merged.merge(state_from_dict(json.loads(json.dumps(shards[1].to_dict()))))
+
+    assert merged.result()["auc"]["value"] == state.result()["auc"]["value"]
+    assert merged.result()["confusion_matrix"] == state.result()["confusion_matrix"]
+
+
+def test_default_states_serialize_compactly():
+    y_true, y_score = make_scores(100000)
+    state = BinaryClassificationState().update(y_true, y_score)
+
+    serialized = json.dumps(state.to_dict())
+
+    # the bootstrap histograms of every replicate and bin are kept, in well under a megabyte
+    assert len(serialized) < 1_000_000
+    assert np.array_equal(state_from_dict(json.loads(serialized)).bootstrap_histograms, state.bootstrap_histograms)
+
+
+def test_regression_state_round_trip():
+    rng = np.random.default_rng(0)
+    state = RegressionState().update(rng.random(1000), rng.random(1000))
+
+    restored = state_from_dict(json.loads(json.dumps(state.to_dict())))
+
+    assert restored.result() == state.result()
@@ -0,0 +1,71 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# SPDX-License-Identifier: MIT-0
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+from utilities import tracing
+from utilities.tracing import trace_methods
+
+
+@trace_methods
+class Service:
+    """
+    Service with every kind of attribute trace_methods meets.
+    """
+    prefix = "step"
+
+    class Options:
+        pass
+
+    def __init__(self, name):
+        self.name = name
+
+    def build(self):
+        return f"{self.prefix}-{self.name}"
+
+    @staticmethod
+    def validate(name):
+        return name.isidentifier()
+
+    @classmethod
+    def create(cls, name):
+        return cls(name)
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.get_tracer()
+    enabled, events, counters = tracer.enabled, tracer.events, tracer.counters
+    tracer.enabled, tracer.events, tracer.counters = True, [], {}
+    yield tracer
+    tracer.enabled, tracer.events, tracer.counters = enabled, events, counters
+
+
+def test_static_and_class_methods_keep_working(tracer):
+    assert Service.validate("lgbm") and Service("x").validate("lgbm")
+    assert not Service.validate("lgbm-Training")
+    assert isinstance(Service.create("lgbm"), Service)
+    assert isinstance(Service("x").create("lgbm"), Service)
+    assert isinstance(Service.Options(), Service.Options)
+
+
+def test_only_instance_methods_are_traced(tracer):
+    assert Service.create("lgbm").build() == "step-lgbm"
+    Service.validate("lgbm")
+
+    assert [event["name"] for event in tracer.events] == ["Service.build"]
+    assert tracer.events[0]["cat"] == __name__.split(".")[0]